@@ -1,16 +1,22 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
+import logging
 
 db = SQLAlchemy()
+logger = logging.getLogger(__name__)
 
 def create_app():
     """创建Flask应用"""
     app = Flask(__name__)
     app.config.from_object(Config)
     
-    # 初始化数据库
+    # 初始化数据库：连接池参数和 SQLite 连接参数（WAL、忙等待超时等）
+    from app.engine import engine_options, apply_sqlite_profile
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI']))
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_profile(db.engine, app.config)
     
     # 注册蓝图
     from app.routes.auth import auth_bp
@@ -25,18 +31,67 @@ def create_app():
     app.register_blueprint(analysis_bp, url_prefix='/analysis')
     app.register_blueprint(target_bp, url_prefix='/target')
     
-    # 创建数据库表
+    # 创建数据库表；未在启动时初始化的只检查结构版本，由部署步骤执行 flask init-db
     with app.app_context():
-        # 导入所有模型以确保它们被注册
-        from app.models import User, InvestmentReminder, InvestmentRecord, Target
-        db.create_all()
+        if app.config.get('STARTUP_INIT', True):
+            init_database()
+        else:
+            from app.migrations import pending_migrations
+            pending = pending_migrations(db.engine)
+            if pending:
+                logger.warning(f"数据库结构缺少 {len(pending)} 个迁移，请执行 flask init-db")
+    
+    # 注册命令行命令
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # 初始化分析结果缓存
+    from app.cache import analysis_cache
+    analysis_cache.init_app(app)
+    
+    # 初始化请求性能指标（/metrics）
+    from app.metrics import request_metrics
+    request_metrics.init_app(app)
+    
+    # 初始化列式历史价格存储（依赖 numpy，未配置时不导入）
+    if app.config.get('PRICE_STORE_DIR'):
+        from app.price_store import price_store
+        price_store.init_app(app)
+    
+    # 初始化标的搜索索引
+    from app.search import target_index
+    target_index.init_app(app)
+    
+    # 初始化webhook发送引擎
+    from app.delivery import delivery
+    delivery.init_app(app)
+    
+    # 初始化通知发件箱
+    from app.outbox import outbox
+    outbox.init_app(app)
     
     # 初始化定时任务调度器
     from app.scheduler import scheduler
     scheduler.init_app(app)
     
-    # 同步所有活跃的定投提醒
-    with app.app_context():
-        scheduler.sync_all_reminders()
+    # 同步所有活跃的定投提醒（启用主节点选举时仅由主节点同步）；未在启动时初始化的由 flask sync-reminders 同步
+    if app.config.get('STARTUP_INIT', True) and scheduler.is_leader:
+        with app.app_context():
+            scheduler.sync_all_reminders()
     
     return app
+
+def init_database():
+    """创建数据库表、执行未完成的迁移并生成持仓汇总，需在应用上下文中调用"""
+    # 导入所有模型以确保它们被注册
+    from app.models import User, InvestmentReminder, InvestmentRecord, Target, SchedulerLease, NotificationOutbox, Position, Instrument, PriceHistory, SchedulerStats, RequestStats
+    db.create_all()
+    
+    # 为已有数据库补齐新增的索引等结构变更
+    from app.migrations import upgrade
+    executed = upgrade(db.engine)
+    
+    # 升级后首次启动时根据已有记录生成持仓汇总
+    from app.positions import ensure_positions
+    ensure_positions()
+    return executed
@@ -0,0 +1,267 @@
+"""
+投资分析计算模块
+基于持仓汇总表计算成本分析、收益分析和仪表板页面所需数据
+"""
+
+from sqlalchemy import func, select
+from app import db
+from app.models import InvestmentRecord, InvestmentReminder, Target, Position, Instrument
+from app.instruments import effective_price_columns
+from app.utils.pagination import seek_condition
+
+def positions_query(user_id):
+    """持仓汇总查询，有效价格（共享行情与用户价格中较新的一个）随关联查询一并取出"""
+    current_price, price_date = effective_price_columns()
+    return db.session.query(
+        Position.target_id,
+        Target.code,
+        Target.name,
+        current_price,
+        price_date,
+        Position.total_amount,
+        Position.total_quantity,
+        Position.total_fee,
+        Position.trade_count
+    ).join(Target, Position.target_id == Target.id)\
+        .outerjoin(Instrument, Target.instrument_id == Instrument.id)\
+        .filter(Position.user_id == user_id)\
+        .order_by(Position.id)
+
+def aggregate_positions(user_id):
+    """读取用户的持仓汇总
+
+    持仓表随定投记录写入增量维护，这里只需按标的数量读取。
+    """
+    rows = positions_query(user_id).all()
+
+    positions = []
+    for target_id, code, name, current_price, price_date, amount, quantity, fee, count in rows:
+        positions.append({
+            'target_id': target_id,
+            'stock_code': code,
+            'stock_name': name,
+            'total_amount': float(amount),
+            'total_quantity': float(quantity),
+            'total_fee': float(fee),
+            'trade_count': count,
+            'current_price': float(current_price) if current_price is not None else None,
+            'price_date': price_date
+        })
+    return positions
+
+def records_aggregate_query(user_id):
+    """按标的分组汇总定投记录的查询：投入金额、持有数量、手续费和交易次数"""
+    return db.session.query(
+        InvestmentRecord.target_id,
+        func.sum(InvestmentRecord.amount, type_=db.Float),
+        func.sum(InvestmentRecord.quantity, type_=db.Float),
+        func.sum(InvestmentRecord.fee, type_=db.Float),
+        func.count(InvestmentRecord.id)
+    ).join(Target, InvestmentRecord.target_id == Target.id)\
+        .filter(InvestmentRecord.user_id == user_id)\
+        .group_by(InvestmentRecord.target_id)\
+        .order_by(func.min(InvestmentRecord.id))
+
+def aggregate_records(user_id):
+    """直接从定投记录按标的分组汇总（用于校验持仓表）"""
+    rows = records_aggregate_query(user_id).all()
+
+    return [{
+        'target_id': target_id,
+        'total_amount': amount or 0,
+        'total_quantity': quantity or 0,
+        'total_fee': fee or 0,
+        'trade_count': count
+    } for target_id, amount, quantity, fee, count in rows]
+
+def trade_page_query(user_id, target_id, after=None, limit=50):
+    """某个标的一页交易明细的查询（只查询展示需要的列），多取一条用于判断是否还有下一页"""
+    query = db.session.query(
+        InvestmentRecord.id,
+        InvestmentRecord.buy_date,
+        InvestmentRecord.amount,
+        InvestmentRecord.quantity,
+        InvestmentRecord.price,
+        InvestmentRecord.fee,
+        InvestmentRecord.notes
+    ).filter(
+        InvestmentRecord.user_id == user_id,
+        InvestmentRecord.target_id == target_id
+    )
+
+    if after is not None:
+        query = query.filter(seek_condition([InvestmentRecord.buy_date, InvestmentRecord.id], after))
+
+    return query.order_by(InvestmentRecord.buy_date.desc(), InvestmentRecord.id.desc())\
+        .limit(limit + 1)
+
+def load_trade_page(user_id, target_id, after=None, limit=50):
+    """按买入时间倒序分页加载某个标的的交易明细
+
+    after 为上一页最后一条的 (buy_date, id)。
+    返回 (明细列表, 下一页的排序键或 None)。
+    """
+    rows = trade_page_query(user_id, target_id, after, limit).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    trades = [{
+        'id': record_id,
+        'buy_date': buy_date.isoformat() if buy_date else None,
+        'amount': float(amount),
+        'quantity': float(quantity),
+        'price': float(price),
+        'fee': float(fee or 0),
+        'notes': notes
+    } for record_id, buy_date, amount, quantity, price, fee, notes in rows]
+
+    next_key = (rows[-1].buy_date, rows[-1].id) if has_more else None
+    return trades, next_key
+
+def build_cost_analysis(user_id):
+    """成本分析数据"""
+    positions = aggregate_positions(user_id)
+
+    cost_data = []
+    for data in positions:
+        if data['total_quantity'] > 0:
+            data['avg_cost'] = round(data['total_amount'] / data['total_quantity'], 4)
+            cost_data.append(data)
+
+    return {
+        'cost_data': cost_data,
+        'total_investment': sum(data['total_amount'] for data in positions),
+        'total_fee': sum(data['total_fee'] for data in positions),
+        'total_trades': sum(data['trade_count'] for data in positions)
+    }
+
+def build_profit_analysis(user_id):
+    """收益分析数据"""
+    positions = aggregate_positions(user_id)
+
+    profit_data = []
+    total_cost = 0
+    total_market_value = 0
+    total_profit_loss = 0
+
+    for data in positions:
+        if data['total_quantity'] <= 0:
+            continue
+
+        data['avg_cost'] = round(data['total_amount'] / data['total_quantity'], 4)
+
+        if data['current_price'] is not None:
+            data['latest_price'] = data['current_price']
+            data['current_value'] = data['total_quantity'] * data['latest_price']
+            data['profit_loss'] = data['current_value'] - data['total_amount']
+            data['return_rate'] = (data['profit_loss'] / data['total_amount']) * 100 if data['total_amount'] > 0 else 0
+        else:
+            data['latest_price'] = 0
+            data['current_value'] = 0
+            data['profit_loss'] = 0
+            data['return_rate'] = 0
+            data['price_date'] = None
+
+        # 累计总体数据
+        total_cost += data['total_amount']
+        total_market_value += data['current_value']
+        total_profit_loss += data['profit_loss']
+
+        profit_data.append(data)
+
+    # 计算总体收益率
+    total_profit_rate = (total_profit_loss / total_cost) * 100 if total_cost > 0 else 0
+
+    # 按每笔投入时间计算的年化收益率（百分比）
+    from app.returns import build_xirr
+    target_xirr, total_xirr = build_xirr(user_id, profit_data)
+    for data in profit_data:
+        rate = target_xirr.get(data['target_id'])
+        data['xirr'] = rate * 100 if rate is not None else None
+
+    return {
+        'profit_data': profit_data,
+        'total_cost': total_cost,
+        'total_market_value': total_market_value,
+        'total_profit_loss': total_profit_loss,
+        'total_profit_rate': total_profit_rate,
+        'total_xirr': total_xirr * 100 if total_xirr is not None else None
+    }
+
+def build_dashboard_summary(user_id, recent_limit=5):
+    """仪表板数据
+
+    提醒数量、记录数量和持仓市值通过一条带标量子查询的语句取出（记录数取自持仓表的交易次数），
+    最近记录和活跃提醒各一条关联标的的查询，不再逐行懒加载标的。
+    """
+    reminders = InvestmentReminder.__table__
+    positions = Position.__table__
+    targets = Target.__table__
+    instruments = Instrument.__table__
+    current_price, _ = effective_price_columns(targets, instruments)
+
+    held = select(
+        func.coalesce(func.sum(positions.c.total_amount), 0),
+        func.coalesce(func.sum(positions.c.total_quantity * current_price), 0)
+    ).select_from(
+        positions.join(targets, positions.c.target_id == targets.c.id)
+        .outerjoin(instruments, targets.c.instrument_id == instruments.c.id)
+    )\
+        .where(positions.c.user_id == user_id, positions.c.total_quantity > 0)\
+        .subquery()
+
+    summary = db.session.execute(select(
+        select(func.count()).where(reminders.c.user_id == user_id).scalar_subquery(),
+        select(func.count()).where(reminders.c.user_id == user_id, reminders.c.is_active == True).scalar_subquery(),
+        select(func.coalesce(func.sum(positions.c.trade_count), 0)).where(positions.c.user_id == user_id).scalar_subquery(),
+        held
+    )).one()
+    reminders_count, active_count, records_count, total_invested, current_value = summary
+
+    recent_records = db.session.query(
+        Target.code,
+        InvestmentRecord.buy_date,
+        InvestmentRecord.amount,
+        InvestmentRecord.quantity
+    ).join(Target, InvestmentRecord.target_id == Target.id)\
+        .filter(InvestmentRecord.user_id == user_id)\
+        .order_by(InvestmentRecord.buy_date.desc(), InvestmentRecord.id.desc())\
+        .limit(recent_limit)\
+        .all()
+
+    active_reminders = db.session.query(
+        Target.code,
+        InvestmentReminder.amount,
+        InvestmentReminder.frequency_type,
+        InvestmentReminder.frequency_value
+    ).join(Target, InvestmentReminder.target_id == Target.id)\
+        .filter(InvestmentReminder.user_id == user_id, InvestmentReminder.is_active == True)\
+        .order_by(InvestmentReminder.id)\
+        .limit(recent_limit)\
+        .all()
+
+    total_invested = float(total_invested)
+    current_value = float(current_value)
+    profit_loss = current_value - total_invested
+
+    return {
+        'reminders_count': reminders_count,
+        'active_reminders_count': active_count,
+        'records_count': int(records_count),
+        'total_invested': total_invested,
+        'current_value': current_value,
+        'profit_loss': profit_loss,
+        'profit_rate': profit_loss / total_invested * 100 if total_invested > 0 else 0,
+        'recent_records': [{
+            'stock_code': code,
+            'buy_date': buy_date,
+            'amount': float(amount),
+            'quantity': float(quantity)
+        } for code, buy_date, amount, quantity in recent_records],
+        'active_reminders': [{
+            'stock_code': code,
+            'amount': float(amount),
+            'frequency_type': frequency_type,
+            'frequency_value': frequency_value
+        } for code, amount, frequency_type, frequency_value in active_reminders]
+    }
@@ -0,0 +1,173 @@
+"""
+分析结果缓存模块
+成本分析、收益分析、仪表板等计算结果按 (用户, 名称, 数据版本) 缓存。
+用户的定投记录、标的或价格发生变化时在同一事务中递增 users.data_version，
+旧版本的缓存自然失效，无需逐项清除。
+
+内存中使用有容量上限的LRU；配置 ANALYSIS_CACHE_DIR 后结果同时写入磁盘目录，
+供同一台机器上的多个进程共享。
+"""
+
+from sqlalchemy import update, select
+from collections import OrderedDict
+from app import db
+from app.models import User
+import threading
+import hashlib
+import logging
+import pickle
+import glob
+import os
+
+logger = logging.getLogger(__name__)
+
+def bump_data_version(user_id):
+    """递增用户的数据版本，使其分析缓存失效（在当前会话事务中执行，不提交）"""
+    table = User.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == user_id)
+        # 保持 updated_at 不变，数据版本变化不算用户资料修改
+        .values(data_version=table.c.data_version + 1, updated_at=table.c.updated_at)
+    )
+
+def get_data_version(user_id):
+    """读取用户当前的数据版本"""
+    table = User.__table__
+    return db.session.execute(
+        select(table.c.data_version).where(table.c.id == user_id)
+    ).scalar() or 0
+
+class DiskBackend:
+    """磁盘缓存：每个结果一个文件，文件名包含用户、名称和数据版本"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _prefix(self, user_id, name):
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f'{user_id}_{digest}_')
+
+    def get(self, user_id, name, version):
+        try:
+            with open(f'{self._prefix(user_id, name)}{version}.pkl', 'rb') as f:
+                return True, pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            logger.warning(f"读取分析缓存文件失败: {e}")
+            return False, None
+
+    def set(self, user_id, name, version, value):
+        prefix = self._prefix(user_id, name)
+        path = f'{prefix}{version}.pkl'
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入分析缓存文件失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        # 清理同一结果的旧版本
+        for old_path in glob.glob(f'{glob.escape(prefix)}*.pkl'):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        for path in glob.glob(os.path.join(glob.escape(self.directory), '*.pkl')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class AnalysisCache:
+    """分析结果缓存"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_entries = 1024
+        self.disk = None
+        self._entries = OrderedDict()  # (user_id, name, version) -> value
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """根据应用配置初始化缓存"""
+        self.enabled = app.config.get('ANALYSIS_CACHE', True)
+        self.max_entries = app.config.get('ANALYSIS_CACHE_SIZE', 1024)
+        directory = app.config.get('ANALYSIS_CACHE_DIR')
+        if directory:
+            # 按数据库区分子目录，避免不同数据库的用户ID和数据版本相互混淆
+            database = hashlib.sha1(app.config['SQLALCHEMY_DATABASE_URI'].encode('utf-8')).hexdigest()[:8]
+            self.disk = DiskBackend(os.path.join(directory, database))
+        else:
+            self.disk = None
+        self.clear()
+
+    def get_or_compute(self, user_id, name, compute):
+        """返回缓存的结果；用户数据版本变化或未缓存时调用 compute() 重新计算"""
+        if not self.enabled:
+            return compute()
+
+        # 先读版本再计算：计算期间有写入时，结果存在旧版本下，不会被新版本读到
+        version = get_data_version(user_id)
+        key = (user_id, name, version)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key]
+
+        if self.disk is not None:
+            found, value = self.disk.get(user_id, name, version)
+            if found:
+                self._store(key, value)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        value = compute()
+        self._store(key, value)
+        if self.disk is not None:
+            self.disk.set(user_id, name, version, value)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, disk=False):
+        """清空内存缓存和统计；disk 为 True 时同时清空磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        if disk and self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        """命中统计（仅当前进程）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0
+        return stats
+
+# 全局分析缓存实例
+analysis_cache = AnalysisCache()
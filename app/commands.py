@@ -0,0 +1,122 @@
+"""
+命令行工具
+通过 flask <命令> 执行的运维任务
+"""
+
+import click
+import sys
+
+def register_commands(app):
+    """注册命令行命令"""
+
+    @app.cli.command('rebuild-positions')
+    @click.option('--user-id', type=int, default=None, help='只重建指定用户的持仓')
+    def rebuild_positions_command(user_id):
+        """根据定投记录重建持仓汇总表"""
+        from app.positions import rebuild_positions
+        count = rebuild_positions(user_id)
+        click.echo(f"持仓表重建完成，共 {count} 个持仓")
+
+    @app.cli.command('update-prices')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'file_format', type=click.Choice(['json', 'csv']), default=None,
+                  help='文件格式，默认按扩展名判断')
+    @click.option('--user-id', type=int, default=None, help='只更新指定用户的标的，默认更新共享行情（对所有用户生效）')
+    def update_prices_command(path, file_format, user_id):
+        """从JSON或CSV文件批量更新行情价格"""
+        import json
+        from app.prices import parse_quotes_json, parse_quotes_csv, apply_price_updates
+        file_format = file_format or ('json' if path.lower().endswith('.json') else 'csv')
+        with open(path, encoding='utf-8-sig') as f:
+            quotes = parse_quotes_json(json.load(f)) if file_format == 'json' else parse_quotes_csv(f.read())
+
+        results = apply_price_updates(quotes, user_id=user_id)
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            if result['status'] != 'updated':
+                click.echo(f"{result['code']}: {result['message']}")
+        click.echo(f"共 {len(quotes)} 条行情，更新 {sum(r['updated'] for r in results)} 个{'共享行情' if user_id is None else '标的'}，"
+                   f"各状态代码数: {counts}")
+
+    @app.cli.command('price-store-sync')
+    def price_store_sync_command():
+        """从数据库历史价格表重新生成列式价格存储"""
+        from app.price_store import price_store
+        if not price_store.enabled:
+            click.echo("未配置 PRICE_STORE_DIR，列式价格存储未启用")
+            sys.exit(1)
+        instruments, count = price_store.sync_from_db()
+        click.echo(f"价格存储生成完成，共 {instruments} 个品种 {count} 条价格")
+
+    @app.cli.command('price-store-import')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def price_store_import_command(path):
+        """从CSV导入历史价格（列 code、date、close，market 可选）"""
+        from app.price_store import import_csv
+        try:
+            instruments, count = import_csv(path)
+        except ValueError as e:
+            click.echo(f"导入失败: {e}")
+            sys.exit(1)
+        click.echo(f"导入完成，共 {instruments} 个品种 {count} 条价格")
+
+    @app.cli.command('price-store-export')
+    @click.argument('path', type=click.Path(dir_okay=False, writable=True))
+    def price_store_export_command(path):
+        """把列式价格存储中的历史价格导出为CSV"""
+        from app.price_store import price_store, export_csv
+        if not price_store.enabled:
+            click.echo("未配置 PRICE_STORE_DIR，列式价格存储未启用")
+            sys.exit(1)
+        count = export_csv(path)
+        click.echo(f"导出完成，共 {count} 条价格")
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """创建数据库表、执行未完成的迁移并生成持仓汇总（每次部署执行一次）"""
+        from app import db, init_database
+        from app.migrations import current_version
+        executed = init_database()
+        if executed:
+            click.echo(f"已执行迁移: {', '.join(str(version) for version in executed)}")
+        click.echo(f"数据库初始化完成，当前结构版本: {current_version(db.engine)}")
+
+    @app.cli.command('sync-reminders')
+    def sync_reminders_command():
+        """把提醒表同步到调度器作业存储（每次部署执行一次）"""
+        from app.scheduler import scheduler
+        scheduler.sync_all_reminders()
+        click.echo("定投提醒同步完成")
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """执行未完成的数据库结构迁移"""
+        from app import db
+        from app.migrations import upgrade, current_version
+        executed = upgrade(db.engine)
+        if executed:
+            click.echo(f"已执行迁移: {', '.join(str(version) for version in executed)}")
+        click.echo(f"当前数据库结构版本: {current_version(db.engine)}")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """检查主要查询是否使用了预期的索引（仅SQLite）"""
+        from app import db
+        from app.query_plans import run_checks
+        if db.engine.dialect.name != 'sqlite':
+            click.echo("查询计划检查仅支持SQLite")
+            return
+
+        failed = 0
+        for name, plan, problems in run_checks():
+            click.echo(f"[{'FAIL' if problems else 'OK'}] {name}")
+            for step in plan:
+                click.echo(f"    {step}")
+            for problem in problems:
+                click.echo(f"    ! {problem}")
+            failed += bool(problems)
+
+        if failed:
+            click.echo(f"{failed} 个查询的执行计划不符合预期")
+            sys.exit(1)
@@ -0,0 +1,243 @@
+"""
+Webhook消息发送模块
+使用连接池复用HTTP连接，并提供全局并发上限、按主机限速和熔断保护
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from app.metrics import Histogram
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 发送耗时（秒）的分桶上限
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+class RateLimiter:
+    """按主机的令牌桶限速器"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # host -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if not self.rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """按webhook地址的熔断器
+
+    连续失败达到阈值后熔断，冷却期内直接拒绝发送；冷却结束后放行一次试探请求，
+    成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._states = {}  # url -> [consecutive_failures, opened_at]
+        self._lock = threading.Lock()
+
+    def allow(self, url):
+        """是否允许向该地址发送"""
+        with self._lock:
+            failures, opened_at = self._states.get(url, (0, None))
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.cooldown:
+                # 半开状态：放行一次试探请求，期间其他请求继续被拒绝
+                self._states[url] = (failures, time.monotonic())
+                return True
+            return False
+
+    def record(self, url, success):
+        """记录一次发送结果"""
+        with self._lock:
+            if success:
+                self._states.pop(url, None)
+                return
+
+            failures, opened_at = self._states.get(url, (0, None))
+            failures += 1
+            if failures >= self.threshold:
+                if opened_at is None:
+                    logger.warning(f"webhook连续失败 {failures} 次，暂停发送 {self.cooldown} 秒: {mask_url(url)}")
+                opened_at = time.monotonic()
+            self._states[url] = (failures, opened_at)
+
+    def open_count(self):
+        """当前处于熔断状态的地址数"""
+        with self._lock:
+            return sum(1 for _, opened_at in self._states.values() if opened_at is not None)
+
+def mask_url(url):
+    """隐藏webhook地址中的密钥，用于日志输出"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+class WebhookDelivery:
+    """Webhook发送引擎"""
+
+    def __init__(self, app=None):
+        self.max_concurrency = 50
+        self.pool_size = 10
+        self.timeout = (3, 10)
+        self.rate_limiter = RateLimiter(rate=100, burst=100)
+        self.breaker = CircuitBreaker(threshold=5, cooldown=60)
+        self.session = None
+        self._executor = None
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._stats_lock = threading.Lock()
+        self._stats = {'sent': 0, 'failed': 0, 'rejected': 0, 'latency_total': 0.0}
+        self._latency = Histogram(LATENCY_BUCKETS)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """根据应用配置初始化发送引擎"""
+        self.shutdown()
+
+        self.max_concurrency = app.config.get('WEBHOOK_MAX_CONCURRENCY', 50)
+        self.pool_size = app.config.get('WEBHOOK_POOL_SIZE', 10)
+        self.timeout = (
+            app.config.get('WEBHOOK_CONNECT_TIMEOUT', 3),
+            app.config.get('WEBHOOK_READ_TIMEOUT', 10)
+        )
+        self.rate_limiter = RateLimiter(
+            rate=app.config.get('WEBHOOK_HOST_RATE', 100),
+            burst=app.config.get('WEBHOOK_HOST_BURST', 100)
+        )
+        self.breaker = CircuitBreaker(
+            threshold=app.config.get('WEBHOOK_BREAKER_THRESHOLD', 5),
+            cooldown=app.config.get('WEBHOOK_BREAKER_COOLDOWN', 60)
+        )
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _get_session(self):
+        """获取共享的HTTP会话（按主机保持长连接）"""
+        if self.session is None:
+            # requests 导入较慢，首次发送时再导入
+            import requests
+            from requests.adapters import HTTPAdapter
+            with self._lock:
+                if self.session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=100, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.session = session
+        return self.session
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency,
+                        thread_name_prefix='webhook'
+                    )
+        return self._executor
+
+    def send(self, url, message):
+        """发送一条消息，返回发送结果字典"""
+        if not self.breaker.allow(url):
+            self._record(None, rejected=True)
+            return {'success': False, 'status_code': None, 'error': '该webhook连续发送失败，已暂停发送', 'latency': 0}
+
+        self.rate_limiter.acquire(urlsplit(url).netloc)
+
+        start = time.perf_counter()
+        status_code = None
+        error = None
+        with self._semaphore:
+            try:
+                response = self._get_session().post(url, json=message, timeout=self.timeout)
+                status_code = response.status_code
+                if status_code != 200:
+                    error = f'状态码：{status_code}'
+                else:
+                    error = self._check_errcode(response)
+            except Exception as e:
+                error = str(e)
+        latency = time.perf_counter() - start
+
+        success = error is None
+        self.breaker.record(url, success)
+        self._record(latency, success=success)
+        return {'success': success, 'status_code': status_code, 'error': error, 'latency': latency}
+
+    def send_many(self, items):
+        """并发发送多条消息
+
+        items 为 (url, message) 列表，返回与之一一对应的结果列表
+        """
+        if not items:
+            return []
+        if len(items) == 1:
+            return [self.send(*items[0])]
+
+        executor = self._get_executor()
+        futures = [executor.submit(self.send, url, message) for url, message in items]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        """发送统计"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        completed = stats['sent'] + stats['failed']
+        stats['avg_latency'] = stats['latency_total'] / completed if completed else 0
+        stats['open_circuits'] = self.breaker.open_count()
+        return stats
+
+    def latency_histogram(self):
+        """发送耗时分布（to_dict 格式）"""
+        with self._stats_lock:
+            return self._latency.to_dict()
+
+    def shutdown(self):
+        """关闭线程池和连接池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def _check_errcode(self, response):
+        """企业微信等webhook在HTTP 200时通过errcode返回业务错误"""
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict) and body.get('errcode', 0) != 0:
+            return f"错误码：{body.get('errcode')} {body.get('errmsg', '')}".strip()
+        return None
+
+    def _record(self, latency, success=False, rejected=False):
+        with self._stats_lock:
+            if rejected:
+                self._stats['rejected'] += 1
+                return
+            self._stats['sent' if success else 'failed'] += 1
+            self._stats['latency_total'] += latency
+            self._latency.observe((), latency)
+
+# 全局发送引擎实例
+delivery = WebhookDelivery()
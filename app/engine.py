@@ -0,0 +1,71 @@
+"""
+数据库引擎配置模块
+SQLite 连接建立时按配置设置日志模式（WAL）、同步级别、忙等待超时、内存映射和页缓存大小，
+Web 请求、调度器作业存储和租约共用同一套配置和连接池参数
+"""
+
+from sqlalchemy import event, create_engine
+from sqlalchemy.engine import make_url
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _is_memory_database(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def sqlite_pragmas(config):
+    """根据配置生成连接建立时执行的 PRAGMA 列表，未配置的项保持 SQLite 默认值"""
+    pragmas = []
+    if config.get('SQLITE_JOURNAL_MODE'):
+        pragmas.append(('journal_mode', config['SQLITE_JOURNAL_MODE']))
+    if config.get('SQLITE_SYNCHRONOUS'):
+        pragmas.append(('synchronous', config['SQLITE_SYNCHRONOUS']))
+    if config.get('SQLITE_BUSY_TIMEOUT') is not None:
+        pragmas.append(('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT'])))
+    if config.get('SQLITE_MMAP_SIZE') is not None:
+        pragmas.append(('mmap_size', int(config['SQLITE_MMAP_SIZE'])))
+    if config.get('SQLITE_CACHE_SIZE') is not None:
+        pragmas.append(('cache_size', int(config['SQLITE_CACHE_SIZE'])))
+    return pragmas
+
+def engine_options(config, url):
+    """create_engine 的连接池参数；SQLite 内存数据库使用单连接池，不设置连接池大小"""
+    url = make_url(url)
+    options = {}
+    if not _is_memory_database(url):
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 10),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', -1),
+            pool_pre_ping=config.get('DB_POOL_PRE_PING', False)
+        )
+    if url.get_backend_name() == 'sqlite' and config.get('SQLITE_BUSY_TIMEOUT') is not None:
+        # sqlite3 驱动自身的等待超时（秒），与 busy_timeout 保持一致
+        options['connect_args'] = {'timeout': int(config['SQLITE_BUSY_TIMEOUT']) / 1000}
+    return options
+
+def apply_sqlite_profile(engine, config):
+    """为 SQLite 引擎注册连接建立时的 PRAGMA 设置，其他数据库不做处理"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    logger.debug(f"SQLite 连接参数: {dict(pragmas)}")
+
+def create_profiled_engine(url, config):
+    """按同一套配置创建独立引擎（如单独的作业存储数据库）"""
+    engine = create_engine(url, **engine_options(config, url))
+    apply_sqlite_profile(engine, config)
+    return engine
@@ -0,0 +1,80 @@
+"""
+共享行情模块
+不同用户的同一标的（按市场和代码）关联到同一条 instruments 记录，
+全市场行情更新只需按代码写一次；标的的有效价格取共享行情与用户自行维护价格中日期较新的一个（同一天以用户价格为准）。
+共享行情的每次价格写入同时追加到按品种记录的历史价格表 price_history，用户自行维护的价格不写入
+"""
+
+from sqlalchemy import select, insert, and_, or_, case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from app import db
+from app.models import Instrument, Target, PriceHistory
+
+def effective_price_columns(targets=None, instruments=None):
+    """有效价格和价格日期的SQL表达式，查询时需外连接 instruments
+
+    按日期（不含时间）比较，共享行情的日期更晚时才取共享行情，同一天以用户价格为准。
+    """
+    targets = targets if targets is not None else Target.__table__
+    instruments = instruments if instruments is not None else Instrument.__table__
+    newer = and_(instruments.c.price_date.isnot(None),
+                 or_(targets.c.price_date.is_(None),
+                     func.date(instruments.c.price_date) > func.date(targets.c.price_date)))
+    return (
+        case((newer, instruments.c.current_price), else_=targets.c.current_price),
+        case((newer, instruments.c.price_date), else_=targets.c.price_date)
+    )
+
+def get_or_create_instrument(market, code, name=None):
+    """按市场和代码获取共享行情品种，不存在时创建（不提交），返回ID"""
+    table = Instrument.__table__
+    market = market or ''
+    lookup = select(table.c.id).where(table.c.market == market, table.c.code == code)
+
+    instrument_id = db.session.execute(lookup).scalar()
+    if instrument_id is not None:
+        return instrument_id
+
+    try:
+        # 并发创建同一品种时唯一约束冲突，回退到保存点后重新查询
+        with db.session.begin_nested():
+            db.session.execute(insert(table).values(market=market, code=code, name=name))
+    except IntegrityError:
+        pass
+    return db.session.execute(lookup).scalar()
+
+def link_instrument(target):
+    """新增或修改标的后关联对应的共享行情品种（不提交）"""
+    target.instrument_id = get_or_create_instrument(target.market, target.code, target.name)
+
+def record_price_history(prices, to_store=True):
+    """追加历史价格（不提交）
+
+    prices 为 (instrument_id, 日期, 价格) 列表，没有关联品种的条目跳过；
+    同一品种同一天已有价格时以本次为准。启用列式存储且 to_store 为真时，提交后同时追加到存储。
+    """
+    params = [
+        {'instrument_id': instrument_id,
+         'date': price_date.date() if hasattr(price_date, 'date') else price_date,
+         'close': float(price)}
+        for instrument_id, price_date, price in prices
+        if instrument_id is not None and price_date is not None and price is not None
+    ]
+    if not params:
+        return 0
+
+    statement = sqlite_insert(PriceHistory.__table__)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=['instrument_id', 'date'],
+            set_={'close': statement.excluded.close}
+        ),
+        params
+    )
+    if to_store and current_app.config.get('PRICE_STORE_DIR'):
+        # 列式存储依赖 numpy，只在启用时导入
+        from app.price_store import PENDING_KEY
+        db.session.info.setdefault(PENDING_KEY, []).extend(params)
+    return len(params)
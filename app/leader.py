@@ -0,0 +1,166 @@
+"""
+主节点选举模块
+基于数据库租约保证多进程（如gunicorn多worker）部署时只有一个进程运行调度器
+"""
+
+from sqlalchemy import update, insert, or_
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import threading
+import socket
+import time
+import uuid
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    """数据库租约
+
+    持有者每隔 renew_interval 秒续约一次，租约有效期为 ttl 秒。
+    持有者进程退出或失联后，其他进程最迟在 ttl + renew_interval 秒内接管。
+    """
+
+    def __init__(self, engine, name, ttl=10, renew_interval=3,
+                 on_acquired=None, on_lost=None, on_renewed=None):
+        from app.models import SchedulerLease
+
+        self.engine = engine
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        self.on_renewed = on_renewed
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+        self._table = SchedulerLease.__table__
+        self._last_renewed = None  # 最近一次成功续约的单调时钟时间
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        """尝试获取或续约租约，返回是否持有租约"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        table = self._table
+
+        with self.engine.begin() as conn:
+            # 自己持有或已过期的租约可以直接接管
+            result = conn.execute(
+                update(table)
+                .where(table.c.name == self.name)
+                .where(or_(table.c.holder == self.holder_id, table.c.expires_at < now))
+                .values(holder=self.holder_id, expires_at=expires_at, updated_at=now)
+            )
+            if result.rowcount == 1:
+                return True
+
+        # 租约记录不存在时插入，并发插入失败说明已被其他进程抢到
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    insert(table).values(
+                        name=self.name,
+                        holder=self.holder_id,
+                        expires_at=expires_at,
+                        updated_at=now
+                    )
+                )
+            return True
+        except IntegrityError:
+            return False
+
+    def acquire(self):
+        """在当前线程尝试获取租约（不触发回调），返回是否成功"""
+        if self.try_acquire():
+            self._last_renewed = time.monotonic()
+            self.is_leader = True
+        return self.is_leader
+
+    def release(self):
+        """主动释放租约，便于其他进程立即接管"""
+        if not self.is_leader:
+            return
+
+        table = self._table
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.name == self.name)
+                    .where(table.c.holder == self.holder_id)
+                    .values(expires_at=datetime.utcnow())
+                )
+        except Exception as e:
+            logger.error(f"释放租约失败: {e}")
+        self.is_leader = False
+        logger.info(f"已释放租约 {self.name}: {self.holder_id}")
+
+    def tick(self):
+        """执行一次获取/续约，并根据结果切换主节点状态"""
+        try:
+            acquired = self.try_acquire()
+        except Exception as e:
+            logger.error(f"续约租约失败: {e}")
+            # 数据库不可用时，在租约可能过期前主动让出，避免出现两个主节点
+            if self.is_leader and time.monotonic() - self._last_renewed >= self.ttl - self.renew_interval:
+                self._set_leader(False)
+            return self.is_leader
+
+        if acquired:
+            self._last_renewed = time.monotonic()
+            if self.is_leader:
+                if self.on_renewed:
+                    self.on_renewed()
+            else:
+                self._set_leader(True)
+        elif self.is_leader:
+            self._set_leader(False)
+
+        return self.is_leader
+
+    def start(self):
+        """启动后台续约线程"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"lease-{self.name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, release=True):
+        """停止续约线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.renew_interval + 1)
+            self._thread = None
+        if release:
+            self.release()
+
+    def _run(self):
+        while not self._stop_event.wait(self.renew_interval):
+            self.tick()
+
+    def _set_leader(self, is_leader):
+        if is_leader == self.is_leader:
+            return
+
+        self.is_leader = is_leader
+        callback = self.on_acquired if is_leader else self.on_lost
+        if is_leader:
+            logger.info(f"已获得租约 {self.name}: {self.holder_id}")
+        else:
+            logger.warning(f"已失去租约 {self.name}: {self.holder_id}")
+
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"租约状态回调执行失败: {e}")
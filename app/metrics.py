@@ -0,0 +1,359 @@
+"""
+请求性能指标模块
+按端点记录请求耗时分布、每个请求执行的SQL语句数和SQL耗时，
+SQL 通过引擎的 before/after_cursor_execute 事件计数，只统计请求线程中执行的语句。
+单个请求的语句数超过 METRICS_QUERY_BUDGET 时输出警告日志，并附上重复次数最多的语句，便于发现 N+1 查询。
+gunicorn 多进程部署时每个工作进程定期把指标快照写入 request_stats 表，/metrics 汇总所有工作进程后
+以 Prometheus 文本格式输出；设置了 METRICS_TOKEN 时需携带令牌访问，否则只允许本机访问。
+"""
+
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event, select, update, insert, delete
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app import db
+from app.utils.decorators import metrics_access_required
+import threading
+import socket
+import json
+import os
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时（秒）、每个请求的SQL语句数和SQL耗时（秒）的分桶上限
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 超过一天未更新的进程快照（已退出的工作进程）直接删除
+EXPIRE_AFTER = timedelta(days=1)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """把标签元组 ((名称, 值), ...) 格式化为 {a="1",b="2"}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """固定分桶的直方图，按标签分别计数（调用方负责加锁）"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._series = {}  # 标签 -> [各分桶计数, 总和, 次数]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def samples(self, name):
+        """生成 Prometheus 样本 (样本名, 标签, 值)，分桶计数为累计值"""
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{name}_bucket', labels + (('le', format_value(float(bound))),), cumulative
+            yield f'{name}_bucket', labels + (('le', '+Inf'),), count
+            yield f'{name}_sum', labels, total
+            yield f'{name}_count', labels, count
+
+    def to_dict(self):
+        """转换为可序列化为JSON的字典"""
+        return {
+            'buckets': list(self.buckets),
+            'series': [[[list(pair) for pair in labels], list(counts), total, count]
+                       for labels, (counts, total, count) in self._series.items()]
+        }
+
+    def merge(self, data):
+        """合并 to_dict() 输出的另一个直方图，分桶不同时忽略"""
+        if not data or tuple(data['buckets']) != self.buckets:
+            return
+        for labels, counts, total, count in data['series']:
+            labels = tuple(tuple(pair) for pair in labels)
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+            series[2] += count
+
+    def summary(self, labels=()):
+        """次数、平均值和按分桶上限估算的分位数（超出最大分桶时为 '+Inf'）"""
+        counts, total, count = self._series.get(labels, ([0] * len(self.buckets), 0.0, 0))
+        result = {'count': count, 'avg': total / count if count else None}
+        for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            result[name] = None
+            if not count:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                if cumulative >= count * fraction:
+                    result[name] = bound
+                    break
+            else:
+                # 落在最大分桶之外
+                result[name] = '+Inf'
+        return result
+
+    def label_sets(self):
+        return sorted(self._series)
+
+def render_metric(name, metric_type, help_text, samples):
+    """输出一个指标的 HELP、TYPE 和样本行"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for sample_name, labels, value in samples:
+        lines.append(f'{sample_name}{format_labels(labels)} {format_value(value)}')
+    return lines
+
+class RequestMetrics:
+    """请求性能指标"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.query_budget = 0
+        self.interval = 15
+        self.engine = None
+        self.holder_id = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._collectors = []
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        """清空已记录的指标"""
+        with self._lock:
+            self._requests = defaultdict(int)  # (端点, 方法, 状态码) -> 次数
+            self._latency = Histogram(LATENCY_BUCKETS)
+            self._queries = Histogram(QUERY_COUNT_BUCKETS)
+            self._sql_time = Histogram(SQL_TIME_BUCKETS)
+            self._budget_exceeded = defaultdict(int)
+
+    def init_app(self, app):
+        """根据应用配置注册请求钩子、SQL事件和 /metrics 端点"""
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.query_budget = app.config.get('METRICS_QUERY_BUDGET', 30)
+        self.interval = app.config.get('METRICS_SNAPSHOT_INTERVAL', 15)
+        self.reset()
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            engine = db.engine
+        self.engine = engine
+        if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', metrics_access_required(self._metrics_view))
+
+    def register_collector(self, collector):
+        """注册额外的指标来源：collector() 返回 [(指标名, 类型, 说明, [(样本名, 标签, 值), ...]), ...]"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def _ensure_persister(self):
+        """本进程首次处理请求时启动定期写入快照的线程
+
+        gunicorn 预加载时应用在主进程中初始化，fork前启动的线程不会带到工作进程，
+        因此按进程号在工作进程中启动；进程号变化时丢弃从主进程继承的计数。
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self.reset()
+            self.holder_id = f"{socket.gethostname()}:{pid}"
+            self._pid = pid
+            if self.interval:
+                self._stop_event = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='request-metrics', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.persist()
+
+    def _before_request(self):
+        self._ensure_persister()
+        g.metrics_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_statements = defaultdict(int)
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return response
+
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        sql_count = g.get('sql_count', 0)
+        sql_time = g.get('sql_time', 0.0)
+        labels = (('endpoint', endpoint),)
+        over_budget = self.query_budget and sql_count > self.query_budget
+
+        with self._lock:
+            self._requests[(endpoint, request.method, str(response.status_code))] += 1
+            self._latency.observe(labels, elapsed)
+            self._queries.observe(labels, sql_count)
+            self._sql_time.observe(labels, sql_time)
+            if over_budget:
+                self._budget_exceeded[endpoint] += 1
+
+        if over_budget:
+            statement, repeats = max(g.sql_statements.items(), key=lambda item: item[1])
+            logger.warning(
+                f"请求执行了 {sql_count} 条SQL（预算 {self.query_budget}）: {request.method} {request.path} "
+                f"[{endpoint}]，耗时 {elapsed * 1000:.1f}ms，其中SQL {sql_time * 1000:.1f}ms；"
+                f"重复最多的语句执行 {repeats} 次: {' '.join(statement.split())[:200]}"
+            )
+        return response
+
+    def _metrics_view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+    def snapshot(self):
+        """本进程的指标快照（可序列化为JSON）"""
+        with self._lock:
+            return {
+                'holder': self.holder_id,
+                'requests': [[endpoint, method, status, count]
+                             for (endpoint, method, status), count in self._requests.items()],
+                'latency': self._latency.to_dict(),
+                'queries': self._queries.to_dict(),
+                'sql_time': self._sql_time.to_dict(),
+                'budget_exceeded': [[endpoint, count] for endpoint, count in self._budget_exceeded.items()],
+            }
+
+    def persist(self):
+        """把本进程的快照写入 request_stats 表"""
+        from app.models import RequestStats
+        table = RequestStats.__table__
+        now = datetime.utcnow()
+        payload = json.dumps(self.snapshot(), ensure_ascii=False)
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(
+                    update(table).where(table.c.holder == self.holder_id).values(data=payload, updated_at=now)
+                )
+                if result.rowcount == 0:
+                    conn.execute(insert(table).values(holder=self.holder_id, data=payload, updated_at=now))
+                conn.execute(delete(table).where(table.c.updated_at < now - EXPIRE_AFTER))
+        except Exception as e:
+            logger.warning(f"写入请求指标快照失败: {e}")
+
+    def load_snapshots(self):
+        """读取各工作进程的快照，本进程使用实时快照；未启用快照写入时只有本进程"""
+        snapshots = {}
+        if self.interval and self.engine is not None:
+            from app.models import RequestStats
+            table = RequestStats.__table__
+            try:
+                with self.engine.connect() as conn:
+                    rows = conn.execute(select(table.c.holder, table.c.data)).all()
+            except Exception as e:
+                logger.warning(f"读取请求指标快照失败: {e}")
+                rows = []
+            for holder, data in rows:
+                try:
+                    snapshots[holder] = json.loads(data)
+                except ValueError:
+                    logger.warning(f"无法解析请求指标快照: {holder}")
+        snapshots[self.holder_id] = self.snapshot()
+        return list(snapshots.values())
+
+    def render(self):
+        """以 Prometheus 文本格式输出所有指标
+
+        请求指标为各工作进程（包括最近一天内已退出的）累计值之和，其他进程的数据最多滞后
+        METRICS_SNAPSHOT_INTERVAL 秒。
+        """
+        requests = defaultdict(int)
+        latency = Histogram(LATENCY_BUCKETS)
+        queries = Histogram(QUERY_COUNT_BUCKETS)
+        sql_time = Histogram(SQL_TIME_BUCKETS)
+        budget_exceeded = defaultdict(int)
+        for data in self.load_snapshots():
+            for endpoint, method, status, count in data.get('requests', []):
+                requests[(endpoint, method, status)] += count
+            latency.merge(data.get('latency'))
+            queries.merge(data.get('queries'))
+            sql_time.merge(data.get('sql_time'))
+            for endpoint, count in data.get('budget_exceeded', []):
+                budget_exceeded[endpoint] += count
+
+        lines = render_metric(
+            'drip_http_requests_total', 'counter', '按端点、方法和状态码统计的请求数',
+            [('drip_http_requests_total', (('endpoint', endpoint), ('method', method), ('status', status)), count)
+             for (endpoint, method, status), count in sorted(requests.items())]
+        )
+        lines += render_metric(
+            'drip_http_request_duration_seconds', 'histogram', '请求耗时（秒）',
+            latency.samples('drip_http_request_duration_seconds')
+        )
+        lines += render_metric(
+            'drip_http_request_sql_queries', 'histogram', '每个请求执行的SQL语句数',
+            queries.samples('drip_http_request_sql_queries')
+        )
+        lines += render_metric(
+            'drip_http_request_sql_seconds', 'histogram', '每个请求的SQL执行总耗时（秒）',
+            sql_time.samples('drip_http_request_sql_seconds')
+        )
+        lines += render_metric(
+            'drip_http_query_budget_exceeded_total', 'counter', 'SQL语句数超过预算的请求数',
+            [('drip_http_query_budget_exceeded_total', (('endpoint', endpoint),), count)
+             for endpoint, count in sorted(budget_exceeded.items())]
+        )
+
+        for collector in self._collectors:
+            try:
+                for name, metric_type, help_text, samples in collector():
+                    lines += render_metric(name, metric_type, help_text, samples)
+            except Exception as e:
+                logger.error(f"采集指标失败: {e}")
+        return '\n'.join(lines) + '\n'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_count' in g:
+        conn.info['metrics_started'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_started', None)
+    if started is None or not has_request_context() or 'sql_count' not in g:
+        return
+    g.sql_time += time.perf_counter() - started
+    g.sql_count += 1
+    g.sql_statements[statement] += 1
+
+# 全局请求指标实例
+request_metrics = RequestMetrics()
@@ -0,0 +1,206 @@
+"""
+数据库结构迁移模块
+db.create_all() 只会创建缺失的表，已有表上新增的索引和列由这里的版本化迁移补齐。
+迁移按版本号顺序执行，已执行的版本记录在 schema_migrations 表中。
+"""
+
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, select, insert, text
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# (版本号, 说明, 执行函数)，按版本号升序执行
+MIGRATIONS = []
+
+def migration(version, name):
+    """注册一个迁移，函数接收当前事务的数据库连接"""
+    def decorator(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+def _create_index(connection, name, table, columns):
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+def _add_column(connection, table, column, ddl):
+    columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+@migration(1, '为常用查询添加索引')
+def add_hot_query_indexes(connection):
+    _create_index(connection, 'ix_records_user_date', 'investment_records', ['user_id', 'buy_date'])
+    _create_index(connection, 'ix_records_user_target_date', 'investment_records', ['user_id', 'target_id', 'buy_date'])
+    _create_index(connection, 'ix_records_target', 'investment_records', ['target_id'])
+    _create_index(connection, 'ix_targets_user_code', 'targets', ['user_id', 'code'])
+    _create_index(connection, 'ix_reminders_slot', 'investment_reminders',
+                  ['is_active', 'reminder_time', 'frequency_type', 'frequency_value'])
+    _create_index(connection, 'ix_reminders_user_created', 'investment_reminders', ['user_id', 'created_at'])
+    _create_index(connection, 'ix_outbox_status_next', 'notification_outbox', ['status', 'next_attempt_at'])
+
+@migration(2, '标的列表分页索引')
+def add_target_list_index(connection):
+    _create_index(connection, 'ix_targets_user_created', 'targets', ['user_id', 'created_at'])
+
+@migration(3, '用户数据版本（分析缓存失效）')
+def add_user_data_version(connection):
+    _add_column(connection, 'users', 'data_version', 'INTEGER NOT NULL DEFAULT 0')
+
+@migration(4, '共享行情品种表并关联已有标的')
+def add_instruments(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS instruments (
+            id INTEGER NOT NULL PRIMARY KEY,
+            market VARCHAR(20) NOT NULL,
+            code VARCHAR(20) NOT NULL,
+            name VARCHAR(100),
+            current_price NUMERIC(10, 4),
+            price_date DATETIME,
+            updated_at DATETIME,
+            CONSTRAINT uq_instruments_market_code UNIQUE (market, code)
+        )
+    """))
+    _create_index(connection, 'ix_instruments_code', 'instruments', ['code'])
+    _add_column(connection, 'targets', 'instrument_id', 'INTEGER REFERENCES instruments (id)')
+    _create_index(connection, 'ix_targets_instrument', 'targets', ['instrument_id'])
+
+    # 每个 (市场, 代码) 建一个品种；各用户标的上的价格是用户自己维护的，不作为共享行情，
+    # 行情和日期留空，等全市场行情通过 flask update-prices 写入
+    connection.execute(text("""
+        INSERT OR IGNORE INTO instruments (market, code, updated_at)
+        SELECT DISTINCT COALESCE(market, ''), code, CURRENT_TIMESTAMP FROM targets
+    """))
+    connection.execute(text("""
+        UPDATE targets SET instrument_id = (
+            SELECT i.id FROM instruments i
+            WHERE i.market = COALESCE(targets.market, '') AND i.code = targets.code
+        )
+        WHERE instrument_id IS NULL
+    """))
+
+@migration(5, '历史价格表')
+def add_price_history(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS price_history (
+            instrument_id INTEGER NOT NULL REFERENCES instruments (id),
+            date DATE NOT NULL,
+            close FLOAT NOT NULL,
+            PRIMARY KEY (instrument_id, date)
+        ) WITHOUT ROWID
+    """))
+    # 历史只记录全市场行情，从空表开始，由之后的共享行情写入追加
+
+@migration(6, '调度器运行统计表')
+def add_scheduler_stats(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS scheduler_stats (
+            holder VARCHAR(100) NOT NULL PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """))
+
+@migration(7, '租约记录批量调度进度')
+def add_dispatched_slot(connection):
+    _add_column(connection, 'scheduler_leases', 'dispatched_slot', 'DATETIME')
+
+@migration(8, '发件箱去重键')
+def add_outbox_dedupe_key(connection):
+    _add_column(connection, 'notification_outbox', 'dedupe_key', 'VARCHAR(100)')
+    connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_outbox_dedupe_key ON notification_outbox (dedupe_key)"))
+
+@migration(9, '请求性能指标快照表')
+def add_request_stats(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS request_stats (
+            holder VARCHAR(100) NOT NULL PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """))
+
+@migration(10, '规范提醒时间为HH:MM')
+def normalize_reminder_times(connection):
+    # 批量调度按 HH:MM 字符串精确匹配时间槽，9:00、09:00:00 等写法统一改写后才能被查到
+    from app.models import normalize_reminder_time
+    rows = connection.execute(text("SELECT id, reminder_time FROM investment_reminders WHERE reminder_time IS NOT NULL"))
+    for reminder_id, reminder_time in rows.all():
+        try:
+            normalized = normalize_reminder_time(reminder_time)
+        except ValueError:
+            logger.warning(f"定投提醒 {reminder_id} 的提醒时间无效，未改写: {reminder_time}")
+            continue
+        if normalized != reminder_time:
+            connection.execute(text("UPDATE investment_reminders SET reminder_time = :value WHERE id = :id"),
+                               {'value': normalized, 'id': reminder_id})
+
+@migration(11, '补齐分页排序列的空值')
+def fill_sort_keys(connection):
+    # 键集分页按 (买入日期/创建时间, ID) 比较，排序列为 NULL 的旧数据在第一页之后会丢失；
+    # 创建时间补为修改时间，都没有的取最早的时间，排在列表最后
+    epoch = '1970-01-01 00:00:00.000000'
+    for table in ('targets', 'investment_reminders'):
+        connection.execute(text(f"UPDATE {table} SET created_at = COALESCE(updated_at, :epoch) WHERE created_at IS NULL"),
+                           {'epoch': epoch})
+    connection.execute(text("UPDATE investment_records SET buy_date = COALESCE(created_at, :epoch) WHERE buy_date IS NULL"),
+                       {'epoch': epoch})
+
+def applied_versions(engine):
+    """已执行的迁移版本
+
+    只读查询：Web进程启动时用它检查结构版本，不能执行建表等需要写锁的语句；
+    schema_migrations 表由 upgrade（flask init-db）创建，不存在时视为没有执行过迁移。
+    """
+    with engine.connect() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+        )).first()
+        if not exists:
+            return set()
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+def pending_migrations(engine):
+    """尚未执行的迁移"""
+    applied = applied_versions(engine)
+    return [item for item in MIGRATIONS if item[0] not in applied]
+
+def upgrade(engine):
+    """依次执行所有未执行的迁移，返回本次执行的版本号列表
+
+    每个迁移与其版本记录在同一事务中提交；多个进程同时启动时，
+    版本记录写入冲突的一方视为该迁移已由其他进程完成。
+    """
+    metadata.create_all(engine, tables=[schema_migrations])
+    executed = []
+    for version, name, func in pending_migrations(engine):
+        try:
+            with engine.begin() as connection:
+                func(connection)
+                connection.execute(insert(schema_migrations).values(
+                    version=version,
+                    name=name,
+                    applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            logger.info(f"数据库迁移 {version} 已由其他进程执行")
+            continue
+
+        logger.info(f"数据库迁移完成: {version} {name}")
+        executed.append(version)
+    return executed
+
+def current_version(engine):
+    """当前数据库结构版本（未执行任何迁移时为0）"""
+    return max(applied_versions(engine), default=0)
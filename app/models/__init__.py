@@ -12,6 +12,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(128), nullable=False)
     webhook_url = db.Column(db.String(500), nullable=True)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 记录、标的或价格变化时递增，用于分析缓存失效
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -39,9 +40,25 @@ class User(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+def normalize_reminder_time(value):
+    """把提醒时间规范为 HH:MM（接受 9:00、09:00:00 等写法），空值按默认9点，格式无效时抛出 ValueError"""
+    parts = (value or '09:00').strip().split(':')
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f'无效的提醒时间: {value}')
+    hour, minute = int(parts[0]), int(parts[1])
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f'无效的提醒时间: {value}')
+    return f'{hour:02d}:{minute:02d}'
+
 class InvestmentReminder(db.Model):
     """定投提醒模型"""
     __tablename__ = 'investment_reminders'
+    __table_args__ = (
+        # 批量调度按时间槽查询到期提醒
+        db.Index('ix_reminders_slot', 'is_active', 'reminder_time', 'frequency_type', 'frequency_value'),
+        # 提醒列表按用户筛选、按创建时间排序
+        db.Index('ix_reminders_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -77,6 +94,14 @@ class InvestmentReminder(db.Model):
 class InvestmentRecord(db.Model):
     """定投记录模型"""
     __tablename__ = 'investment_records'
+    __table_args__ = (
+        # 记录列表按用户筛选、按买入日期排序
+        db.Index('ix_records_user_date', 'user_id', 'buy_date'),
+        # 分析汇总和单个标的交易明细
+        db.Index('ix_records_user_target_date', 'user_id', 'target_id', 'buy_date'),
+        # 删除标的时检查关联记录
+        db.Index('ix_records_target', 'target_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -112,6 +137,14 @@ class InvestmentRecord(db.Model):
 class Target(db.Model):
     """投资标的管理模型"""
     __tablename__ = 'targets'
+    __table_args__ = (
+        # 按用户和代码查找标的
+        db.Index('ix_targets_user_code', 'user_id', 'code'),
+        # 标的列表按用户筛选、按创建时间分页
+        db.Index('ix_targets_user_created', 'user_id', 'created_at'),
+        # 按共享行情查找持有该品种的标的
+        db.Index('ix_targets_instrument', 'instrument_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -123,9 +156,31 @@ class Target(db.Model):
     sector = db.Column(db.String(50), nullable=True)  # 行业板块
     notes = db.Column(db.Text, nullable=True)  # 备注
     is_active = db.Column(db.Boolean, default=True)  # 是否启用
+    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id'), nullable=True)  # 共享行情品种
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # 关系
+    instrument = db.relationship('Instrument')
+    
+    @property
+    def effective_price(self):
+        """有效价格：共享行情和用户自行维护的价格中日期较新的一个"""
+        return self._effective_quote()[0]
+    
+    @property
+    def effective_price_date(self):
+        """有效价格对应的日期"""
+        return self._effective_quote()[1]
+    
+    def _effective_quote(self):
+        # 与 app.instruments.effective_price_columns 相同：按日期比较，同一天以用户价格为准
+        instrument = self.instrument
+        if instrument is not None and instrument.price_date is not None and \
+                (self.price_date is None or instrument.price_date.date() > self.price_date.date()):
+            return instrument.current_price, instrument.price_date
+        return self.current_price, self.price_date
+    
     def to_dict(self):
         """转换为字典"""
         return {
@@ -141,4 +196,161 @@ class Target(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+
+class Instrument(db.Model):
+    """共享行情品种模型（按市场和代码唯一，所有用户的同一标的共用一份行情价格）"""
+    __tablename__ = 'instruments'
+    __table_args__ = (
+        db.UniqueConstraint('market', 'code', name='uq_instruments_market_code'),
+        # 全市场行情更新只按代码匹配
+        db.Index('ix_instruments_code', 'code'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    market = db.Column(db.String(20), nullable=False, default='')  # 市场类型，未填写时为空字符串
+    code = db.Column(db.String(20), nullable=False)
+    name = db.Column(db.String(100), nullable=True)
+    current_price = db.Column(db.Numeric(10, 4), nullable=True)  # 最新行情价格
+    price_date = db.Column(db.DateTime, nullable=True)  # 行情日期
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'market': self.market,
+            'code': self.code,
+            'name': self.name,
+            'current_price': float(self.current_price) if self.current_price is not None else None,
+            'price_date': self.price_date.isoformat() if self.price_date else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class PriceHistory(db.Model):
+    """历史价格模型（按品种和日期每天一条收盘价，只追加）
+
+    主键 (instrument_id, date) 即聚簇索引，表不带 rowid，按品种读取一段日期的价格只需一次有序范围扫描
+    """
+    __tablename__ = 'price_history'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    instrument_id = db.Column(db.Integer, db.ForeignKey('instruments.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)  # 行情日期
+    close = db.Column(db.Float, nullable=False)  # 当日价格，同一天多次更新时保留最后一次
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'instrument_id': self.instrument_id,
+            'date': self.date.isoformat(),
+            'close': self.close
+        }
+
+class SchedulerLease(db.Model):
+    """调度器主节点租约模型（多进程部署时保证只有一个进程运行调度器）"""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)  # 租约名称
+    holder = db.Column(db.String(100), nullable=False)  # 当前持有者标识
+    expires_at = db.Column(db.DateTime, nullable=False)  # 租约到期时间(UTC)
+    dispatched_slot = db.Column(db.DateTime, nullable=True)  # 批量调度最近处理完的时间槽(UTC)，主节点切换后从这里继续补发
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'dispatched_slot': self.dispatched_slot.isoformat() if self.dispatched_slot else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class SchedulerStats(db.Model):
+    """调度器运行统计快照（执行定时任务的进程定期写入，Web进程汇总查询）"""
+    __tablename__ = 'scheduler_stats'
+    
+    holder = db.Column(db.String(100), primary_key=True)  # 进程标识
+    data = db.Column(db.Text, nullable=False)  # 统计快照(JSON)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 写入时间(UTC)
+
+class RequestStats(db.Model):
+    """请求性能指标快照（每个Web工作进程定期写入，/metrics 汇总各进程）"""
+    __tablename__ = 'request_stats'
+    
+    holder = db.Column(db.String(100), primary_key=True)  # 进程标识
+    data = db.Column(db.Text, nullable=False)  # 指标快照(JSON)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 写入时间(UTC)
+
+class NotificationOutbox(db.Model):
+    """待发送通知模型（发件箱），记录每条通知的投递状态"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        # 发送线程按状态和下次尝试时间批量领取
+        db.Index('ix_outbox_status_next', 'status', 'next_attempt_at'),
+        # 同一条通知只写入一次（如同一时间槽的汇总消息）
+        db.Index('ux_outbox_dedupe_key', 'dedupe_key', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    reminder_ids = db.Column(db.String(500), nullable=True)  # 关联的提醒ID，汇总消息为逗号分隔
+    dedupe_key = db.Column(db.String(100), nullable=True)  # 去重键，相同键的通知只保留先写入的一条
+    webhook_url = db.Column(db.String(500), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # 消息内容(JSON)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending/sending/sent/dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # 已尝试次数
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 下次尝试时间(UTC)
+    last_error = db.Column(db.Text, nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=True)  # 最近一次发送耗时(毫秒)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'reminder_ids': self.reminder_ids,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'latency_ms': self.latency_ms,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+class Position(db.Model):
+    """持仓汇总模型（按用户、标的维护，随定投记录的增删改同步更新）"""
+    __tablename__ = 'positions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'target_id', name='uq_positions_user_target'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    target_id = db.Column(db.Integer, db.ForeignKey('targets.id'), nullable=False)
+    total_amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 累计投入金额
+    total_quantity = db.Column(db.Numeric(18, 4), nullable=False, default=0)  # 累计持有数量
+    total_fee = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 累计手续费
+    trade_count = db.Column(db.Integer, nullable=False, default=0)  # 交易次数
+    avg_cost = db.Column(db.Numeric(18, 4), nullable=False, default=0)  # 平均成本
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    target = db.relationship('Target')
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'target_id': self.target_id,
+            'total_amount': float(self.total_amount),
+            'total_quantity': float(self.total_quantity),
+            'total_fee': float(self.total_fee),
+            'trade_count': self.trade_count,
+            'avg_cost': float(self.avg_cost),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,201 @@
+"""
+通知发件箱模块
+待发送的通知先持久化到 notification_outbox 表，再由发送线程批量领取发送，
+失败时按带抖动的指数退避重试，并记录投递状态和耗时
+"""
+
+from sqlalchemy import select, update, delete, insert, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import NotificationOutbox
+from app.delivery import delivery
+from datetime import datetime, timedelta
+import threading
+import random
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Outbox:
+    """通知发件箱"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.batch_size = 100
+        self.max_attempts = 8
+        self.backoff_base = 5
+        self.backoff_max = 3600
+        self.visibility_timeout = 120
+        self.retention_days = 30
+        self._drain_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """根据应用配置初始化发件箱"""
+        self.enabled = app.config.get('NOTIFICATION_OUTBOX', True)
+        self.batch_size = app.config.get('OUTBOX_BATCH_SIZE', 100)
+        self.max_attempts = app.config.get('OUTBOX_MAX_ATTEMPTS', 8)
+        self.backoff_base = app.config.get('OUTBOX_BACKOFF_BASE', 5)
+        self.backoff_max = app.config.get('OUTBOX_BACKOFF_MAX', 3600)
+        self.retention_days = app.config.get('OUTBOX_RETENTION_DAYS', 30)
+        # 领取后超过该时间仍未回写结果（如进程崩溃）的通知会被重新领取
+        self.visibility_timeout = app.config.get('WEBHOOK_CONNECT_TIMEOUT', 3) + \
+            app.config.get('WEBHOOK_READ_TIMEOUT', 10) + 60
+
+    def enqueue(self, items, dedupe_keys=None):
+        """批量写入待发送通知，返回实际写入的条数
+
+        items 为 (reminder_ids, webhook_url, message) 列表；dedupe_keys 为与 items 对应的去重键，
+        已存在相同去重键的通知不再写入（多个进程或任务并发写入同一条通知时只有一个生效）
+        """
+        if not items:
+            return 0
+
+        now = datetime.utcnow()
+        keys = dedupe_keys or [None] * len(items)
+        table = NotificationOutbox.__table__
+        statement = insert(table)
+        if dedupe_keys:
+            statement = sqlite_insert(table).on_conflict_do_nothing(index_elements=['dedupe_key'])
+        result = db.session.execute(statement, [{
+            'reminder_ids': str(reminder_ids) if reminder_ids is not None else None,
+            'dedupe_key': key,
+            'webhook_url': webhook_url,
+            'payload': json.dumps(message, ensure_ascii=False),
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now
+        } for (reminder_ids, webhook_url, message), key in zip(items, keys)])
+        db.session.commit()
+        return result.rowcount
+
+    def drain(self):
+        """批量发送所有到期的通知，直到没有可领取的为止
+
+        同一进程内只允许一个线程发送；其他线程调用时直接返回，
+        新写入的通知会被正在运行的发送循环领取。
+        """
+        if not self._drain_lock.acquire(blocking=False):
+            return 0
+
+        sent = 0
+        try:
+            while True:
+                batch = self._claim_batch()
+                if not batch:
+                    break
+                sent += self._send_batch(batch)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"发送发件箱通知失败: {e}")
+        finally:
+            self._drain_lock.release()
+        return sent
+
+    def purge(self):
+        """清理超过保留期的已发送通知"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        table = NotificationOutbox.__table__
+        result = db.session.execute(
+            delete(table).where(table.c.status == 'sent').where(table.c.sent_at < cutoff)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def stats(self):
+        """按状态统计通知数量"""
+        table = NotificationOutbox.__table__
+        rows = db.session.execute(
+            select(table.c.status, db.func.count()).group_by(table.c.status)
+        ).all()
+        return {status: count for status, count in rows}
+
+    def claim_query(self, now):
+        """到期可领取的一批通知的ID"""
+        table = NotificationOutbox.__table__
+        return select(table.c.id)\
+            .where(table.c.status.in_(('pending', 'sending')))\
+            .where(table.c.next_attempt_at <= now)\
+            .order_by(table.c.next_attempt_at)\
+            .limit(self.batch_size)
+
+    def claim_statement(self, now):
+        """领取一批到期通知并标记为发送中的语句，返回被本次更新的行
+
+        领取条件在 UPDATE 中再次检查：多个进程（如主节点切换期间的新旧调度进程）同时领取时，
+        同一条通知只会被其中一个更新并返回。
+        """
+        table = NotificationOutbox.__table__
+        return update(table)\
+            .where(table.c.id.in_(self.claim_query(now)))\
+            .where(table.c.status.in_(('pending', 'sending')))\
+            .where(table.c.next_attempt_at <= now)\
+            .values(status='sending', next_attempt_at=now + timedelta(seconds=self.visibility_timeout))\
+            .returning(table.c.id, table.c.webhook_url, table.c.payload, table.c.attempts, table.c.reminder_ids)
+
+    def _claim_batch(self):
+        """领取一批到期通知，只发送本进程领到的"""
+        rows = db.session.execute(self.claim_statement(datetime.utcnow())).all()
+        db.session.commit()
+        return rows
+
+    def _send_batch(self, rows):
+        """发送一批通知并回写结果，返回成功数量"""
+        results = delivery.send_many([(row.webhook_url, json.loads(row.payload)) for row in rows])
+        now = datetime.utcnow()
+
+        succeeded = []
+        failed = []
+        for row, result in zip(rows, results):
+            attempts = row.attempts + 1
+            latency_ms = int(result['latency'] * 1000)
+            if result['success']:
+                succeeded.append({'_id': row.id, 'attempts': attempts, 'latency_ms': latency_ms, 'sent_at': now})
+                logger.info(f"定投提醒发送成功: {row.reminder_ids}")
+            elif attempts >= self.max_attempts:
+                failed.append({'_id': row.id, 'status': 'dead', 'attempts': attempts, 'latency_ms': latency_ms,
+                               'next_attempt_at': now, 'last_error': result['error']})
+                logger.error(f"定投提醒发送失败且不再重试: {row.reminder_ids}, {result['error']}")
+            else:
+                failed.append({'_id': row.id, 'status': 'pending', 'attempts': attempts, 'latency_ms': latency_ms,
+                               'next_attempt_at': now + timedelta(seconds=self._backoff(attempts)),
+                               'last_error': result['error']})
+                logger.warning(f"定投提醒发送失败，稍后重试（第{attempts}次）: {row.reminder_ids}, {result['error']}")
+
+        table = NotificationOutbox.__table__
+        connection = db.session.connection()
+        if succeeded:
+            connection.execute(
+                update(table).where(table.c.id == bindparam('_id')).values(
+                    status='sent',
+                    attempts=bindparam('attempts'),
+                    latency_ms=bindparam('latency_ms'),
+                    sent_at=bindparam('sent_at'),
+                    last_error=None
+                ),
+                succeeded
+            )
+        if failed:
+            connection.execute(
+                update(table).where(table.c.id == bindparam('_id')).values(
+                    status=bindparam('status'),
+                    attempts=bindparam('attempts'),
+                    latency_ms=bindparam('latency_ms'),
+                    next_attempt_at=bindparam('next_attempt_at'),
+                    last_error=bindparam('last_error')
+                ),
+                failed
+            )
+        db.session.commit()
+        return len(succeeded)
+
+    def _backoff(self, attempts):
+        """第 attempts 次失败后的等待秒数：指数退避，取上限后在 [1/2, 1] 区间内随机抖动"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+# 全局发件箱实例
+outbox = Outbox()
@@ -0,0 +1,180 @@
+"""
+组合市值曲线模块
+根据定投记录和历史价格，用 NumPy 按天向量化计算组合的持有市值和累计投入成本曲线
+"""
+
+from sqlalchemy import select, func, type_coerce, String, Float
+from app import db
+from app.models import InvestmentRecord, Target, Instrument, PriceHistory
+from app.instruments import effective_price_columns
+from app.price_store import price_store
+from datetime import date
+import numpy as np
+
+# 同一天有多个价格来源时的优先级：历史收盘价优先于成交价，当前有效价格最优先
+_PRIORITY_TRADE, _PRIORITY_HISTORY, _PRIORITY_CURRENT = 0, 1, 2
+
+def _day(column):
+    """取日期部分的 'YYYY-MM-DD' 字符串，交给 NumPy 批量解析"""
+    return type_coerce(func.date(column), String)
+
+def _to_days(values):
+    return np.array(values, dtype='datetime64[D]')
+
+def load_price_history(instrument_ids, start=None, end=None):
+    """读取多个品种的历史价格，返回按品种ID、日期排序的 (品种ID数组, 日期数组, 价格数组)
+
+    启用列式存储时从内存映射文件读取，存储中没有的品种再查询数据库。
+    """
+    instrument_ids = sorted(instrument_ids)
+    stored = [instrument_id for instrument_id in instrument_ids if price_store.contains(instrument_id)]
+    missing = sorted(set(instrument_ids) - set(stored))
+
+    parts = [_load_from_store(stored, start, end)] if stored else []
+    if missing:
+        parts.append(_load_from_db(missing, start, end))
+    if not parts:
+        return np.array([], dtype=np.int64), _to_days([]), np.array([], dtype=np.float64)
+    if len(parts) == 1:
+        return parts[0]
+
+    instruments, days, closes = (np.concatenate(columns) for columns in zip(*parts))
+    order = np.argsort(instruments, kind='stable')
+    return instruments[order], days[order], closes[order]
+
+def _load_from_store(instrument_ids, start, end):
+    lower = np.datetime64(start, 'D') if start is not None else None
+    upper = np.datetime64(end, 'D') if end is not None else None
+    instruments, days, closes = [], [], []
+    for instrument_id in instrument_ids:
+        stored_days, stored_closes = price_store.read(instrument_id)
+        lo = np.searchsorted(stored_days, lower, side='left') if lower is not None else 0
+        hi = np.searchsorted(stored_days, upper, side='right') if upper is not None else len(stored_days)
+        instruments.append(np.full(hi - lo, instrument_id, dtype=np.int64))
+        days.append(stored_days[lo:hi])
+        closes.append(stored_closes[lo:hi])
+    return np.concatenate(instruments), np.concatenate(days), np.concatenate(closes)
+
+def price_history_query(instrument_ids, start=None, end=None):
+    """按品种和日期范围读取历史价格，按 (品种, 日期) 排序"""
+    table = PriceHistory.__table__
+    query = select(table.c.instrument_id, type_coerce(table.c.date, String), table.c.close)\
+        .where(table.c.instrument_id.in_(instrument_ids))\
+        .order_by(table.c.instrument_id, table.c.date)
+    if start is not None:
+        query = query.where(table.c.date >= start)
+    if end is not None:
+        query = query.where(table.c.date <= end)
+    return query
+
+def _load_from_db(instrument_ids, start, end):
+    rows = db.session.execute(price_history_query(instrument_ids, start, end)).all()
+    if not rows:
+        return np.array([], dtype=np.int64), _to_days([]), np.array([], dtype=np.float64)
+    instrument_column, date_column, close_column = zip(*rows)
+    return (np.array(instrument_column, dtype=np.int64),
+            _to_days(date_column),
+            np.array(close_column, dtype=np.float64))
+
+def _forward_fill(obs_days, obs_prices, obs_priority, grid):
+    """把不规则日期的价格观测按日期向前填充到每天，返回与 grid 等长的价格数组"""
+    order = np.lexsort((obs_priority, obs_days))
+    obs_days = obs_days[order]
+    obs_prices = obs_prices[order]
+    # 同一天多个观测时 side='right' 取排序后的最后一个，即优先级最高的来源
+    index = np.searchsorted(obs_days, grid, side='right') - 1
+    return np.where(index >= 0, obs_prices[np.maximum(index, 0)], 0.0)
+
+def build_value_curve(user_id, start=None, end=None):
+    """计算用户组合每天的持有市值和累计投入成本
+
+    每个标的每天的价格取当天及之前最近的一次价格观测：历史价格表、定投成交价和当前有效价格。
+    返回 {'dates', 'value', 'cost', 'profit'}，日期从 start（默认首次定投日）到 end（默认今天）。
+    """
+    records = db.session.execute(
+        select(
+            InvestmentRecord.target_id,
+            _day(InvestmentRecord.buy_date),
+            type_coerce(InvestmentRecord.amount, Float),
+            type_coerce(InvestmentRecord.quantity, Float),
+            type_coerce(InvestmentRecord.price, Float)
+        )
+        .where(InvestmentRecord.user_id == user_id)
+        .order_by(InvestmentRecord.buy_date)
+    ).all()
+    if not records:
+        return {'dates': [], 'value': [], 'cost': [], 'profit': []}
+
+    record_targets, record_days, amounts, quantities, trade_prices = (np.array(column) for column in zip(*records))
+    record_targets = record_targets.astype(np.int64)
+    record_days = record_days.astype('datetime64[D]')
+    amounts = amounts.astype(np.float64)
+    quantities = quantities.astype(np.float64)
+    trade_prices = trade_prices.astype(np.float64)
+
+    first = record_days.min()
+    last = np.datetime64(end or date.today(), 'D')
+    begin = max(np.datetime64(start, 'D'), first) if start else first
+    if last < begin:
+        return {'dates': [], 'value': [], 'cost': [], 'profit': []}
+
+    # 从首次定投日开始累计，最后再截取请求的区间
+    grid = np.arange(first, last + 1)
+    target_ids = np.unique(record_targets)
+    rows = np.searchsorted(target_ids, record_targets)
+    columns = (record_days - first).astype(np.int64)
+    in_range = columns < len(grid)
+
+    holdings = np.zeros((len(target_ids), len(grid)))
+    np.add.at(holdings, (rows[in_range], columns[in_range]), quantities[in_range])
+    np.cumsum(holdings, axis=1, out=holdings)
+    cost = np.cumsum(np.bincount(columns[in_range], weights=amounts[in_range], minlength=len(grid)))
+
+    # 各标的关联的品种和当前有效价格
+    targets_table = Target.__table__
+    instruments_table = Instrument.__table__
+    price_column, price_date_column = effective_price_columns(targets_table, instruments_table)
+    target_rows = db.session.execute(
+        select(targets_table.c.id, targets_table.c.instrument_id,
+               type_coerce(price_column, Float), _day(price_date_column))
+        .select_from(targets_table.outerjoin(instruments_table, targets_table.c.instrument_id == instruments_table.c.id))
+        .where(targets_table.c.id.in_(target_ids.tolist()))
+    ).all()
+    target_info = {row[0]: row[1:] for row in target_rows}
+
+    instrument_ids = {info[0] for info in target_info.values() if info[0] is not None}
+    history_instruments, history_days, history_prices = load_price_history(instrument_ids, end=last.item())
+
+    prices = np.zeros_like(holdings)
+    for i, target_id in enumerate(target_ids.tolist()):
+        instrument_id, current_price, current_day = target_info.get(target_id, (None, None, None))
+
+        trades = rows == i
+        obs_days = [record_days[trades]]
+        obs_prices = [trade_prices[trades]]
+        obs_priority = [np.full(trades.sum(), _PRIORITY_TRADE)]
+
+        if instrument_id is not None:
+            lo, hi = np.searchsorted(history_instruments, [instrument_id, instrument_id + 1])
+            obs_days.append(history_days[lo:hi])
+            obs_prices.append(history_prices[lo:hi])
+            obs_priority.append(np.full(hi - lo, _PRIORITY_HISTORY))
+
+        if current_price is not None and current_day is not None:
+            obs_days.append(_to_days([current_day]))
+            obs_prices.append(np.array([current_price], dtype=np.float64))
+            obs_priority.append(np.array([_PRIORITY_CURRENT]))
+
+        prices[i] = _forward_fill(np.concatenate(obs_days), np.concatenate(obs_prices),
+                                  np.concatenate(obs_priority), grid)
+
+    value = (holdings * prices).sum(axis=0)
+    offset = int((begin - first).astype(np.int64))
+    value = np.round(value[offset:], 2)
+    cost = np.round(cost[offset:], 2)
+    return {
+        'dates': np.datetime_as_string(grid[offset:], unit='D').tolist(),
+        'value': value.tolist(),
+        'cost': cost.tolist(),
+        'profit': np.round(value - cost, 2).tolist()
+    }
@@ -0,0 +1,131 @@
+"""
+持仓汇总维护模块
+定投记录写入时在同一事务中增量更新 positions 表，并提供全量重建
+"""
+
+from sqlalchemy import select, update, insert, delete, func, case
+from app import db
+from app.models import Position, InvestmentRecord, Target
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _avg_cost(total_amount, total_quantity):
+    """平均成本的SQL表达式"""
+    return case((total_quantity > 0, total_amount / total_quantity), else_=0)
+
+def apply_record_delta(user_id, target_id, amount, quantity, fee, trades):
+    """在当前会话事务中累加一个标的的持仓变动（不提交）
+
+    新增记录传入正值、删除记录传入负值；交易次数归零时删除该持仓。
+    """
+    apply_record_deltas([(user_id, target_id, amount, quantity, fee, trades)])
+
+def apply_record_deltas(deltas):
+    """在当前会话事务中批量累加持仓变动（不提交），供批量导入使用
+
+    deltas 为 (user_id, target_id, amount, quantity, fee, trades) 列表，
+    同一标的的多条变动先合并再写入。
+    """
+    merged = {}
+    for user_id, target_id, amount, quantity, fee, trades in deltas:
+        key = (int(user_id), int(target_id))
+        total = merged.setdefault(key, [0.0, 0.0, 0.0, 0])
+        total[0] += float(amount)
+        total[1] += float(quantity)
+        total[2] += float(fee or 0)
+        total[3] += trades
+
+    table = Position.__table__
+    now = datetime.utcnow()
+    for (user_id, target_id), (amount, quantity, fee, trades) in merged.items():
+        new_amount = table.c.total_amount + amount
+        new_quantity = table.c.total_quantity + quantity
+        result = db.session.execute(
+            update(table)
+            .where(table.c.user_id == user_id)
+            .where(table.c.target_id == target_id)
+            .values(
+                total_amount=new_amount,
+                total_quantity=new_quantity,
+                total_fee=table.c.total_fee + fee,
+                trade_count=table.c.trade_count + trades,
+                avg_cost=_avg_cost(new_amount, new_quantity),
+                updated_at=now
+            )
+        )
+        if result.rowcount == 0 and trades > 0:
+            db.session.execute(insert(table).values(
+                user_id=user_id,
+                target_id=target_id,
+                total_amount=amount,
+                total_quantity=quantity,
+                total_fee=fee,
+                trade_count=trades,
+                avg_cost=amount / quantity if quantity > 0 else 0,
+                updated_at=now
+            ))
+
+        if trades < 0:
+            db.session.execute(
+                delete(table)
+                .where(table.c.user_id == user_id)
+                .where(table.c.target_id == target_id)
+                .where(table.c.trade_count <= 0)
+            )
+
+def remove_target_positions(target_id):
+    """删除标的时清理其持仓（不提交）"""
+    table = Position.__table__
+    db.session.execute(delete(table).where(table.c.target_id == target_id))
+
+def rebuild_positions(user_id=None):
+    """根据定投记录全量重建持仓表，返回重建的持仓数"""
+    table = Position.__table__
+    records = InvestmentRecord.__table__
+    targets = Target.__table__
+
+    total_amount = func.sum(records.c.amount)
+    total_quantity = func.sum(records.c.quantity)
+    source = select(
+        records.c.user_id,
+        records.c.target_id,
+        total_amount,
+        total_quantity,
+        func.coalesce(func.sum(records.c.fee), 0),
+        func.count(records.c.id),
+        _avg_cost(total_amount, total_quantity)
+    ).join(targets, records.c.target_id == targets.c.id)\
+        .group_by(records.c.user_id, records.c.target_id)\
+        .order_by(func.min(records.c.id))
+
+    clear = delete(table)
+    if user_id is not None:
+        source = source.where(records.c.user_id == user_id)
+        clear = clear.where(table.c.user_id == user_id)
+
+    rows = db.session.execute(source).all()
+    now = datetime.utcnow()
+    db.session.execute(clear)
+    if rows:
+        db.session.execute(insert(table), [{
+            'user_id': row[0],
+            'target_id': row[1],
+            'total_amount': row[2],
+            'total_quantity': row[3],
+            'total_fee': row[4],
+            'trade_count': row[5],
+            'avg_cost': row[6],
+            'updated_at': now
+        } for row in rows])
+    db.session.commit()
+
+    logger.info(f"持仓表重建完成: {len(rows)} 个持仓")
+    return len(rows)
+
+def ensure_positions():
+    """持仓表为空但已有定投记录时（如升级后首次启动）自动重建"""
+    if db.session.query(Position.id).first() is None and \
+            db.session.query(InvestmentRecord.id).first() is not None:
+        rebuild_positions()
@@ -0,0 +1,293 @@
+"""
+列式历史价格存储模块
+每个品种的历史价格保存为两个定长列文件：{品种ID}.days（int64，距 1970-01-01 的天数）和
+{品种ID}.close（float64）。读取时内存映射文件，直接返回零拷贝的 NumPy 视图，
+分析和模拟读取多年历史价格时无需逐行查询数据库。
+
+数据库的 price_history 表仍是权威数据：价格写入提交后追加到文件末尾（同一天原地覆盖，
+早于最后日期的修正合并后重写该品种）；首次启用时通过 flask price-store-sync 从数据库生成。
+"""
+
+from sqlalchemy import event, select, type_coerce, String
+from app import db
+import numpy as np
+import threading
+import logging
+import csv
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DAY_DTYPE = np.dtype('<i8')
+CLOSE_DTYPE = np.dtype('<f8')
+
+# 待写入存储的价格暂存在会话中，事务提交后再追加，回滚时丢弃
+PENDING_KEY = 'price_store_pending'
+
+def _empty():
+    return np.array([], dtype='datetime64[D]'), np.array([], dtype=CLOSE_DTYPE)
+
+class PriceStore:
+    """内存映射的列式历史价格存储"""
+
+    def __init__(self, app=None):
+        self.directory = None
+        self._maps = {}  # instrument_id -> (条数, 文件标识, 日期视图, 价格视图)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """根据应用配置初始化，未配置 PRICE_STORE_DIR 时不启用"""
+        self.directory = app.config.get('PRICE_STORE_DIR')
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._maps.clear()
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _paths(self, instrument_id):
+        base = os.path.join(self.directory, str(int(instrument_id)))
+        return f'{base}.days', f'{base}.close'
+
+    def _stat(self, instrument_id):
+        """返回 (有效条数, 文件标识)；有效条数取两列中较短的长度（先写价格后写日期，未写完的条目不会被读到）"""
+        days_path, close_path = self._paths(instrument_id)
+        try:
+            days_stat = os.stat(days_path)
+            close_stat = os.stat(close_path)
+        except OSError:
+            return None, None
+        count = min(days_stat.st_size // DAY_DTYPE.itemsize, close_stat.st_size // CLOSE_DTYPE.itemsize)
+        # 重写会替换文件，按 inode 判断内存映射是否仍对应当前文件
+        return count, (days_stat.st_ino, close_stat.st_ino)
+
+    def _count(self, instrument_id):
+        return self._stat(instrument_id)[0]
+
+    def instrument_ids(self):
+        """已存储的品种ID"""
+        if not self.enabled:
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(self.directory)
+                      if name.endswith('.days') and name[:-5].isdigit())
+
+    def contains(self, instrument_id):
+        return self.enabled and self._count(instrument_id) is not None
+
+    def read(self, instrument_id):
+        """返回品种的 (日期, 价格) 只读视图，日期为 datetime64[D] 且递增；未存储时返回空数组"""
+        count, identity = self._stat(instrument_id)
+        if not count:
+            return _empty()
+
+        with self._lock:
+            cached = self._maps.get(instrument_id)
+            if cached is not None and cached[:2] == (count, identity):
+                return cached[2], cached[3]
+
+        days_path, close_path = self._paths(instrument_id)
+        days = np.memmap(days_path, dtype=DAY_DTYPE, mode='r', shape=(count,)).view('datetime64[D]')
+        closes = np.memmap(close_path, dtype=CLOSE_DTYPE, mode='r', shape=(count,))
+        with self._lock:
+            self._maps[instrument_id] = (count, identity, days, closes)
+        return days, closes
+
+    def _write_lock(self):
+        return _DirectoryLock(self.directory)
+
+    def append(self, instrument_id, days, closes):
+        """追加价格：与最后一天相同的原地覆盖；包含早于最后一天的修正时合并后整体重写。返回写入条数"""
+        days, closes = _normalize(days, closes)
+        if not len(days):
+            return 0
+
+        days_path, close_path = self._paths(instrument_id)
+        with self._write_lock():
+            count = self._count(instrument_id) or 0
+            written = 0
+            if count:
+                # 截掉上次中断时多写的半条
+                os.truncate(days_path, count * DAY_DTYPE.itemsize)
+                os.truncate(close_path, count * CLOSE_DTYPE.itemsize)
+                with open(days_path, 'rb') as f:
+                    f.seek((count - 1) * DAY_DTYPE.itemsize)
+                    last = np.frombuffer(f.read(DAY_DTYPE.itemsize), dtype=DAY_DTYPE)[0]
+                if days[0] < last:
+                    existing_days, existing_closes = self.read(instrument_id)
+                    self._replace(instrument_id,
+                                  *_normalize(np.concatenate([existing_days, days.view('datetime64[D]')]),
+                                              np.concatenate([existing_closes, closes])))
+                    return len(days)
+                same = days == last
+                if same.any():
+                    with open(close_path, 'r+b') as f:
+                        f.seek((count - 1) * CLOSE_DTYPE.itemsize)
+                        f.write(closes[same][-1:].tobytes())
+                    written += 1
+                newer = days > last
+                days, closes = days[newer], closes[newer]
+
+            if len(days):
+                with open(close_path, 'ab') as f:
+                    f.write(closes.tobytes())
+                with open(days_path, 'ab') as f:
+                    f.write(days.tobytes())
+                written += len(days)
+        return written
+
+    def write(self, instrument_id, days, closes):
+        """整体重写品种的历史价格（先写临时文件再替换）"""
+        days, closes = _normalize(days, closes)
+        with self._write_lock():
+            self._replace(instrument_id, days, closes)
+        return len(days)
+
+    def _replace(self, instrument_id, days, closes):
+        days_path, close_path = self._paths(instrument_id)
+        for path, values in ((close_path, closes), (days_path, days)):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(values.tobytes())
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._maps.pop(instrument_id, None)
+
+    def append_pending(self, entries):
+        """把 record_price_history 暂存的价格按品种追加"""
+        grouped = {}
+        for entry in entries:
+            grouped.setdefault(entry['instrument_id'], []).append((entry['date'], entry['close']))
+        for instrument_id, prices in grouped.items():
+            dates, closes = zip(*prices)
+            self.append(instrument_id, np.array(dates, dtype='datetime64[D]'), closes)
+
+    def sync_from_db(self, instrument_ids=None):
+        """从 price_history 表重新生成存储，返回 (品种数, 价格条数)"""
+        from app.models import PriceHistory
+        table = PriceHistory.__table__
+        if instrument_ids is None:
+            instrument_ids = db.session.execute(select(table.c.instrument_id).distinct()).scalars().all()
+
+        total = 0
+        for instrument_id in instrument_ids:
+            rows = db.session.execute(
+                select(type_coerce(table.c.date, String), table.c.close)
+                .where(table.c.instrument_id == instrument_id)
+                .order_by(table.c.date)
+            ).all()
+            dates, closes = zip(*rows) if rows else ((), ())
+            total += self.write(instrument_id, np.array(dates, dtype='datetime64[D]'), closes)
+        return len(instrument_ids), total
+
+class _DirectoryLock:
+    """写入锁：进程内线程锁加目录级文件锁，多个进程写同一目录时串行"""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, '.lock')
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+def _normalize(days, closes):
+    """转换为定长类型并按日期排序，同一天保留最后一条"""
+    days = np.asarray(days, dtype='datetime64[D]').astype(DAY_DTYPE)
+    closes = np.asarray(closes, dtype=CLOSE_DTYPE)
+    order = np.argsort(days, kind='stable')
+    days, closes = days[order], closes[order]
+    keep = np.append(days[1:] != days[:-1], True) if len(days) else np.array([], dtype=bool)
+    return days[keep], closes[keep]
+
+def import_csv(path):
+    """从CSV导入历史价格（列 code、date、close，market 可选），写入数据库并重新生成涉及品种的存储
+
+    返回 (品种数, 价格条数)
+    """
+    from app.instruments import get_or_create_instrument, record_price_history
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower() for name in reader.fieldnames or []}
+        if not {'code', 'date', 'close'} <= fields:
+            raise ValueError('CSV需要包含 code、date、close 列')
+        rows = [{key.strip().lower(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+
+    instruments = {}
+    prices = []
+    for line, row in enumerate(rows, start=2):
+        try:
+            price_date = np.datetime64(row['date'][:10], 'D').item()
+            close = float(row['close'])
+        except ValueError:
+            raise ValueError(f'第 {line} 行日期或价格格式错误（日期格式为 YYYY-MM-DD）')
+        key = (row.get('market', ''), row['code'].upper())
+        if key not in instruments:
+            instruments[key] = get_or_create_instrument(*key)
+        prices.append((instruments[key], price_date, close))
+
+    # 导入后整体重新生成，不逐条追加
+    count = record_price_history(prices, to_store=False)
+    db.session.commit()
+    if price_store.enabled:
+        price_store.sync_from_db(sorted(set(instruments.values())))
+    return len(instruments), count
+
+def export_csv(path):
+    """把存储中的全部历史价格导出为CSV（code、market、date、close），返回价格条数"""
+    from app.models import Instrument
+    table = Instrument.__table__
+    names = {row.id: (row.code, row.market)
+             for row in db.session.execute(select(table.c.id, table.c.code, table.c.market))}
+
+    total = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['code', 'market', 'date', 'close'])
+        for instrument_id in price_store.instrument_ids():
+            code, market = names.get(instrument_id, (str(instrument_id), ''))
+            days, closes = price_store.read(instrument_id)
+            writer.writerows(zip([code] * len(days), [market] * len(days),
+                                 np.datetime_as_string(days, unit='D'), closes.tolist()))
+            total += len(days)
+    return total
+
+# 全局历史价格存储实例
+price_store = PriceStore()
+
+@event.listens_for(db.session, 'after_commit')
+def _append_committed_prices(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending and price_store.enabled:
+        try:
+            price_store.append_pending(pending)
+        except Exception as e:
+            # 存储只是数据库的派生副本，写入失败不影响已提交的事务，可通过 sync 重新生成
+            logger.warning(f"追加历史价格存储失败: {e}")
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_pending_prices(session, transaction):
+    # 最外层事务结束时仍未写入的暂存价格属于已回滚的事务
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
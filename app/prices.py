@@ -0,0 +1,180 @@
+"""
+批量价格更新模块
+解析 JSON 或 CSV 格式的行情 (代码, 价格, 日期)，在一个事务中批量更新价格。
+全市场更新写入共享行情表 instruments，同一代码只写一次即对所有持有该标的的用户生效；
+指定用户时更新该用户自己的标的价格（作为用户覆盖价格，与共享行情按日期取较新者）
+"""
+
+from sqlalchemy import select, update, bindparam
+from app import db
+from app.models import Target, User, Instrument
+from app.instruments import record_price_history
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的参数个数有上限，IN 查询分批执行
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_quotes_json(data):
+    """解析JSON行情：列表，或 {"quotes": 列表}；每项为 {"code", "price", "date"} 或 [code, price, date]"""
+    if isinstance(data, dict):
+        data = data.get('quotes')
+    if not isinstance(data, list):
+        raise ValueError('请提供行情列表')
+
+    quotes = []
+    for item in data:
+        if isinstance(item, dict):
+            quotes.append((item.get('code'), item.get('price'), item.get('date')))
+        elif isinstance(item, (list, tuple)):
+            quotes.append(tuple(item[:3]) + (None,) * (3 - len(item[:3])))
+        else:
+            quotes.append((None, None, None))
+    return quotes
+
+def parse_quotes_csv(text):
+    """解析CSV行情：表头包含 code、price 列，date 列可选；没有表头时按 代码,价格,日期 的顺序读取"""
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+
+    header = [column.strip().lower() for column in rows[0]]
+    if 'code' in header and 'price' in header:
+        code_index = header.index('code')
+        price_index = header.index('price')
+        date_index = header.index('date') if 'date' in header else None
+        rows = rows[1:]
+    else:
+        code_index, price_index, date_index = 0, 1, 2
+
+    quotes = []
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        def cell(index):
+            return row[index] if index is not None and index < len(row) else None
+        quotes.append((cell(code_index), cell(price_index), cell(date_index)))
+    return quotes
+
+def _parse_date(value, default):
+    if value is None or str(value).strip() == '':
+        return default
+    value = str(value).strip()
+    for fmt in ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value)
+
+def price_lookup_query(codes, user_id=None):
+    """按代码查找要更新的共享行情（user_id 为 None）或该用户的标的"""
+    if user_id is None:
+        table = Instrument.__table__
+        return select(table.c.id, table.c.code, table.c.price_date).where(table.c.code.in_(codes))
+
+    table = Target.__table__
+    return select(table.c.id, table.c.code, table.c.price_date, table.c.user_id, table.c.instrument_id)\
+        .where(table.c.code.in_(codes))\
+        .where(table.c.user_id == user_id)
+
+def holders_query(instrument_ids):
+    """关联了这些共享行情品种的用户"""
+    targets = Target.__table__
+    return select(targets.c.user_id).where(targets.c.instrument_id.in_(instrument_ids)).distinct()
+
+def apply_price_updates(quotes, user_id=None):
+    """批量更新标的价格并提交
+
+    quotes 为 (code, price, date) 列表，同一代码出现多次时以最后一条为准；
+    user_id 为 None 时按代码更新共享行情表（同一代码在多个市场时都会更新），否则只更新该用户的标的。
+    日期（按天比较）早于现有价格日期的行情不会覆盖，更新的共享行情同时追加到历史价格表。
+    未提供日期的行情使用当前本地时间，与页面上手动更新价格使用同一时钟。
+    返回按代码的结果列表：status 为 updated / stale / not_found / invalid。
+    """
+    now = datetime.now()
+    results = {}
+    valid = {}
+    order = []  # 结果按代码首次出现的顺序返回
+    for code, price, date in quotes:
+        code = str(code or '').strip().upper()
+        if not code:
+            continue
+        if code not in valid and code not in results:
+            order.append(code)
+        try:
+            price = Decimal(str(price).strip())
+            if not price.is_finite() or price <= 0:
+                raise ValueError
+            price_date = _parse_date(date, now)
+        except (InvalidOperation, ValueError, TypeError):
+            results[code] = {'code': code, 'status': 'invalid', 'updated': 0, 'message': '价格或日期格式错误'}
+            valid.pop(code, None)
+            continue
+        valid[code] = (price, price_date)
+        results.pop(code, None)
+
+    codes = list(valid)
+    table = Instrument.__table__ if user_id is None else Target.__table__
+    matched = {code: [] for code in codes}
+    for offset in range(0, len(codes), LOOKUP_CHUNK_SIZE):
+        for row in db.session.execute(price_lookup_query(codes[offset:offset + LOOKUP_CHUNK_SIZE], user_id)):
+            matched[row.code].append(row)
+
+    params = []
+    history = []
+    for code in codes:
+        price, price_date = valid[code]
+        rows = matched[code]
+        # 按日期比较：只有日期的行情解析为当天零点，不应被当天早些时候手动更新的价格挡住
+        fresh = [row for row in rows if row.price_date is None or row.price_date.date() <= price_date.date()]
+        if not rows:
+            results[code] = {'code': code, 'status': 'not_found', 'updated': 0, 'message': '未找到该标的'}
+        elif not fresh:
+            results[code] = {'code': code, 'status': 'stale', 'updated': 0, 'message': '已有更新日期的价格'}
+        else:
+            results[code] = {'code': code, 'status': 'updated', 'updated': len(fresh),
+                             'price': float(price), 'date': price_date.strftime('%Y-%m-%d')}
+        for row in fresh:
+            params.append({'_id': row.id, 'current_price': price, 'price_date': price_date, 'updated_at': now})
+            if user_id is None:
+                # 历史价格表由所有持有该品种的用户共享，只记录共享行情；用户自己的价格只作用于其标的
+                history.append((row.id, price_date, price))
+
+    if params:
+        connection = db.session.connection()
+        connection.execute(
+            update(table).where(table.c.id == bindparam('_id')).values(
+                current_price=bindparam('current_price'),
+                price_date=bindparam('price_date'),
+                updated_at=bindparam('updated_at')
+            ),
+            params
+        )
+        _bump_affected_users(connection, user_id, [item['_id'] for item in params])
+        record_price_history(history)
+    db.session.commit()
+
+    logger.info(f"批量更新价格: {len(quotes)} 条行情，更新 {len(params)} 个{'共享行情' if user_id is None else '标的'}")
+    return [results[code] for code in order]
+
+def _bump_affected_users(connection, user_id, updated_ids):
+    """递增受影响用户的数据版本，使其分析缓存失效"""
+    users_table = User.__table__
+    bump = update(users_table).values(
+        data_version=users_table.c.data_version + 1,
+        updated_at=users_table.c.updated_at
+    )
+    if user_id is not None:
+        connection.execute(bump.where(users_table.c.id == user_id))
+        return
+
+    # 共享行情变化影响所有关联了这些品种的用户
+    for offset in range(0, len(updated_ids), LOOKUP_CHUNK_SIZE):
+        holders = holders_query(updated_ids[offset:offset + LOOKUP_CHUNK_SIZE])
+        connection.execute(bump.where(users_table.c.id.in_(holders)))
@@ -0,0 +1,138 @@
+"""
+查询计划回归检查
+对各页面和后台任务的主要查询执行 EXPLAIN QUERY PLAN（仅SQLite），
+检查是否使用了预期的索引、是否出现全表扫描或额外排序
+"""
+
+from flask import current_app
+from app import db
+from app.utils.pagination import keyset_query
+from app.routes.record import record_list_query, RECORD_LIST_ORDER
+from app.routes.target import target_list_query, latest_target_query, active_targets_query, TARGET_LIST_ORDER
+from app.routes.reminder import reminder_list_query, REMINDER_LIST_ORDER
+from app.analytics import positions_query, records_aggregate_query, trade_page_query
+from app.prices import price_lookup_query, holders_query
+from app.portfolio import price_history_query
+from app.scheduler import due_reminders_query
+from app.outbox import outbox
+from datetime import datetime
+import re
+
+# (名称, 语句构造函数, 期望使用的索引, 是否允许临时排序)
+QUERY_PLAN_CHECKS = []
+
+def plan_check(name, index=None, sort=False):
+    """注册一个需要检查的查询；index 为 None 时只要求不出现全表扫描，取决于配置时可传入函数
+
+    语句构造函数调用页面和后台任务实际使用的查询函数，以示例参数生成语句，
+    查询条件改动后检查随之生效。
+    """
+    def decorator(func):
+        QUERY_PLAN_CHECKS.append((name, func, index, sort))
+        return func
+    return decorator
+
+@plan_check('record.index', index='ix_records_user_date')
+def record_list():
+    return keyset_query(record_list_query(1), RECORD_LIST_ORDER,
+                        after_key=(datetime(2024, 6, 1), 100)).statement
+
+@plan_check('analysis.target_trades', index='ix_records_user_target_date')
+def target_trades():
+    return trade_page_query(1, 1, after=(datetime(2024, 1, 1), 100)).statement
+
+@plan_check('analytics.aggregate_records', index='ix_records_user_target_date', sort=True)
+def aggregate_records():
+    return records_aggregate_query(1).statement
+
+@plan_check('analytics.aggregate_positions', sort=True)
+def aggregate_positions():
+    return positions_query(1).statement
+
+@plan_check('target.get_latest', index='ix_targets_user_code', sort=True)
+def target_by_code():
+    return latest_target_query(1, '510300').limit(1).statement
+
+@plan_check('target.list_targets', index='ix_targets_user_code')
+def active_targets():
+    return active_targets_query(1).statement
+
+@plan_check('target.index', index='ix_targets_user_created')
+def target_list():
+    return keyset_query(target_list_query(1), TARGET_LIST_ORDER,
+                        after_key=(datetime(2024, 6, 1), 100)).statement
+
+def _code_filter_index():
+    # 前缀匹配按 (user_id, code) 索引定位；任意位置匹配只能按分页顺序逐行过滤
+    if current_app.config.get('TARGET_CODE_SEARCH', 'contains') == 'prefix':
+        return 'ix_targets_user_code'
+    return 'ix_targets_user_created'
+
+@plan_check('target.index(代码筛选)', index=_code_filter_index, sort=True)
+def target_list_by_code():
+    return keyset_query(target_list_query(1, code='5103'), TARGET_LIST_ORDER).statement
+
+@plan_check('prices.instrument_lookup', index='ix_instruments_code')
+def instrument_lookup():
+    return price_lookup_query(['510300', '159915'])
+
+@plan_check('prices.target_lookup', index='ix_targets_user_code')
+def target_price_lookup():
+    return price_lookup_query(['510300', '159915'], user_id=1)
+
+@plan_check('prices.affected_users', index='ix_targets_instrument', sort=True)
+def affected_users():
+    return holders_query([1, 2])
+
+@plan_check('portfolio.price_history', index='PRIMARY KEY')
+def price_history_range():
+    return price_history_query([1, 2], end=datetime(2024, 1, 1).date())
+
+@plan_check('reminder.index', index='ix_reminders_user_created')
+def reminder_list():
+    return keyset_query(reminder_list_query(1), REMINDER_LIST_ORDER,
+                        after_key=(datetime(2024, 6, 1), 100)).statement
+
+@plan_check('scheduler.query_due_reminders', index='ix_reminders_slot', sort=True)
+def due_reminders():
+    return due_reminders_query(datetime(2024, 1, 5, 9, 30)).statement
+
+@plan_check('outbox.claim_batch', index='ix_outbox_status_next', sort=True)
+def outbox_claim():
+    return outbox.claim_statement(datetime(2024, 1, 1))
+
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+def explain(connection, statement):
+    """返回语句的查询计划（每个步骤一行）"""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(
+        value.isoformat(' ') if isinstance(value, datetime) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return [row[-1] for row in rows]
+
+def check_plan(plan, index=None, sort=False):
+    """检查查询计划，返回发现的问题列表"""
+    problems = []
+    for step in plan:
+        match = _SCAN.match(step)
+        if match and 'USING' not in step:
+            problems.append(f'全表扫描 {match.group(1)}')
+        if not sort and 'USE TEMP B-TREE' in step:
+            problems.append('需要额外排序')
+    if index and not any(re.search(rf'\b{index}\b', step) for step in plan):
+        problems.append(f'未使用索引 {index}')
+    return problems
+
+def run_checks():
+    """执行所有查询计划检查，返回 (名称, 查询计划, 问题列表) 列表"""
+    results = []
+    with db.engine.connect() as connection:
+        for name, build, index, sort in QUERY_PLAN_CHECKS:
+            plan = explain(connection, build())
+            if callable(index):
+                index = index()
+            results.append((name, plan, check_plan(plan, index, sort)))
+    return results
@@ -0,0 +1,179 @@
+"""
+资金加权收益率模块
+定投的资金分多年陆续投入，简单的 盈亏/总投入 会低估早期投入的占用时间。
+这里把每笔定投（金额+手续费）作为流出、当前市值作为流入，求解年化内部收益率（XIRR），
+所有标的的现金流补齐为同一矩阵，用牛顿法同时迭代，不收敛的再用二分法求解。
+"""
+
+from sqlalchemy import select, func, type_coerce, String, Float
+from app import db
+from app.models import InvestmentRecord
+from datetime import date
+import numpy as np
+
+DAYS_PER_YEAR = 365.0
+
+# 二分法的收益率搜索区间
+BISECT_LOWER = -0.9999
+BISECT_UPPER = 100.0
+
+def pad_cash_flows(groups, days, amounts):
+    """把按组排列的现金流补齐为矩阵
+
+    groups 为每笔现金流所属的行号（需已按行号排序），days 为 datetime64[D] 日期，amounts 为金额。
+    返回 (年数矩阵, 金额矩阵)，年数从每行最早一笔现金流算起，补齐位置的金额为 0。
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    rows = int(groups.max()) + 1 if len(groups) else 0
+    counts = np.bincount(groups, minlength=rows)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    columns = np.arange(len(groups)) - starts[groups]
+
+    width = int(counts.max()) if rows else 0
+    day_numbers = np.asarray(days, dtype='datetime64[D]').astype(np.int64)
+    first = np.zeros(rows, dtype=np.int64)
+    present = counts > 0
+    if present.any():
+        first[present] = np.minimum.reduceat(day_numbers, starts[present])
+
+    times = np.zeros((rows, width))
+    values = np.zeros((rows, width))
+    times[groups, columns] = (day_numbers - first[groups]) / DAYS_PER_YEAR
+    values[groups, columns] = amounts
+    return times, values
+
+def _npv(times, amounts, rates):
+    """净现值及其对收益率的导数"""
+    discount = np.exp(-times * np.log1p(rates)[:, None])
+    weighted = amounts * discount
+    npv = weighted.sum(axis=1)
+    derivative = -(weighted * times).sum(axis=1) / (1 + rates)
+    return npv, derivative
+
+def initial_guess(times, amounts):
+    """初始值：回收/投入 的倍数按投入资金的加权平均持有年数折算为年化收益率"""
+    outflows = np.where(amounts < 0, -amounts, 0.0)
+    inflows = np.where(amounts > 0, amounts, 0.0)
+    invested = outflows.sum(axis=1)
+    returned = inflows.sum(axis=1)
+    horizon = np.where(inflows > 0, times, 0.0).max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = (outflows * (horizon[:, None] - times)).sum(axis=1) / invested
+        guess = np.power(returned / invested, 1 / duration) - 1
+    guess = np.where(np.isfinite(guess) & (duration > 1e-3), guess, 0.1)
+    return np.clip(guess, -0.9, 10.0)
+
+def xirr(times, amounts, tol=1e-9, max_iterations=50, bisect_iterations=100):
+    """按行求解年化内部收益率
+
+    times 为距该行首笔现金流的年数，amounts 为现金流（投入为负、回收为正），两者形状相同。
+    返回每行的收益率（0.1 表示 10%），现金流没有正负变化等无解的行为 nan。
+    """
+    times = np.asarray(times, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    result = np.full(amounts.shape[0], np.nan)
+    solvable = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+
+    active = np.flatnonzero(solvable)
+    if active.size == amounts.shape[0]:
+        rates = initial_guess(times, amounts)
+    else:
+        rates = initial_guess(times[active], amounts[active])
+    fallback = []
+    for _ in range(max_iterations):
+        if not active.size:
+            break
+        # 所有行都未收敛时直接使用原矩阵，避免每次迭代复制
+        if active.size == amounts.shape[0]:
+            npv, derivative = _npv(times, amounts, rates)
+        else:
+            npv, derivative = _npv(times[active], amounts[active], rates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = npv / derivative
+        updated = rates - step
+        valid = np.isfinite(updated) & (updated > -1)
+        converged = valid & (np.abs(step) <= tol * np.maximum(1.0, np.abs(updated)))
+
+        result[active[converged]] = updated[converged]
+        fallback.append(active[~valid])
+        keep = valid & ~converged
+        active, rates = active[keep], updated[keep]
+
+    # 牛顿法发散或迭代次数用尽的行改用二分法
+    fallback.append(active)
+    remaining = np.concatenate(fallback)
+    if remaining.size:
+        result[remaining] = _bisect(times[remaining], amounts[remaining], tol, bisect_iterations)
+    return result
+
+def _bisect(times, amounts, tol, iterations):
+    lower = np.full(amounts.shape[0], BISECT_LOWER)
+    upper = np.full(amounts.shape[0], BISECT_UPPER)
+    npv_lower, _ = _npv(times, amounts, lower)
+    npv_upper, _ = _npv(times, amounts, upper)
+    bracketed = np.sign(npv_lower) != np.sign(npv_upper)
+
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        npv_middle, _ = _npv(times, amounts, middle)
+        same_side = np.sign(npv_middle) == np.sign(npv_lower)
+        lower = np.where(same_side, middle, lower)
+        npv_lower = np.where(same_side, npv_middle, npv_lower)
+        upper = np.where(same_side, upper, middle)
+        if (upper - lower).max() <= tol:
+            break
+    return np.where(bracketed, (lower + upper) / 2, np.nan)
+
+def build_xirr(user_id, positions, valuation_date=None):
+    """计算用户各标的及整个组合的年化收益率
+
+    positions 为收益分析中的持仓（需包含 target_id 和 current_value），返回
+    ({target_id: 收益率}, 组合收益率)，无法计算的为 None。
+    """
+    valuation_date = valuation_date or date.today()
+    values = {data['target_id']: data['current_value'] for data in positions}
+    if not values:
+        return {}, None
+
+    rows = db.session.execute(
+        select(
+            InvestmentRecord.target_id,
+            type_coerce(func.date(InvestmentRecord.buy_date), String),
+            type_coerce(InvestmentRecord.amount + func.coalesce(InvestmentRecord.fee, 0), Float)
+        )
+        .where(InvestmentRecord.user_id == user_id, InvestmentRecord.target_id.in_(list(values)))
+        .order_by(InvestmentRecord.target_id)
+    ).all()
+    if not rows:
+        return {}, None
+
+    target_column, day_column, outflow_column = zip(*rows)
+    record_targets = np.array(target_column, dtype=np.int64)
+    record_days = np.array(day_column, dtype='datetime64[D]')
+    outflows = -np.array(outflow_column, dtype=np.float64)
+
+    target_ids = np.unique(record_targets)
+    terminal_values = np.array([values[target_id] for target_id in target_ids.tolist()], dtype=np.float64)
+    valuation_day = np.datetime64(valuation_date, 'D')
+
+    # 每个标的一行，最后一行为整个组合；每行末尾追加估值日的当前市值
+    portfolio_row = len(target_ids)
+    groups = np.concatenate([
+        np.searchsorted(target_ids, record_targets), np.arange(len(target_ids)),
+        np.full(len(record_targets) + 1, portfolio_row)
+    ])
+    days = np.concatenate([
+        record_days, np.full(len(target_ids), valuation_day),
+        record_days, [valuation_day]
+    ])
+    amounts = np.concatenate([outflows, terminal_values, outflows, [terminal_values.sum()]])
+
+    order = np.argsort(groups, kind='stable')
+    times, flows = pad_cash_flows(groups[order], days[order], amounts[order])
+    rates = xirr(times, flows)
+
+    def to_value(rate):
+        return None if np.isnan(rate) else float(rate)
+
+    per_target = {target_id: to_value(rate) for target_id, rate in zip(target_ids.tolist(), rates[:-1])}
+    return per_target, to_value(rates[-1])
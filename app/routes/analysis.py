@@ -1,9 +1,12 @@
 from flask import Blueprint, render_template, request, session, jsonify
 from app import db
 from app.models import InvestmentRecord, Target
-from app.utils.decorators import login_required
+from app.utils.decorators import login_required, metrics_access_required
+from app.analytics import build_cost_analysis, build_profit_analysis, load_trade_page
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from app.cache import analysis_cache, bump_data_version
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, date
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -11,139 +14,65 @@ analysis_bp = Blueprint('analysis', __name__)
 @login_required
 def cost_analysis():
     """成本分析"""
-    # 获取所有定投记录
-    records = InvestmentRecord.query.filter_by(user_id=session['user_id']).all()
-    
-    if not records:
-        return render_template('analysis/cost.html', 
-                              cost_data=[], 
-                              total_investment=0, 
-                              total_fee=0, 
-                              total_trades=0)
-    
-    # 按标的代码分组计算
-    cost_data = []
-    stock_groups = {}
-    total_investment = 0
-    total_fee = 0
-    total_trades = len(records)
-    
-    for record in records:
-        stock_code = record.target.code if record.target else 'Unknown'
-        if stock_code not in stock_groups:
-            stock_groups[stock_code] = {
-                'stock_code': stock_code,
-                'stock_name': record.target.name if record.target else 'Unknown',
-                'records': [],
-                'total_amount': 0,
-                'total_quantity': 0,
-                'total_fee': 0,
-                'trade_count': 0
-            }
-        
-        stock_groups[stock_code]['records'].append(record.to_dict())
-        stock_groups[stock_code]['total_amount'] += float(record.amount)
-        stock_groups[stock_code]['total_quantity'] += float(record.quantity)
-        stock_groups[stock_code]['total_fee'] += float(record.fee)
-        stock_groups[stock_code]['trade_count'] += 1
-        
-        # 累计总体数据
-        total_investment += float(record.amount)
-        total_fee += float(record.fee)
-    
-    # 计算平均成本
-    for stock_code, data in stock_groups.items():
-        if data['total_quantity'] > 0:
-            avg_cost = data['total_amount'] / data['total_quantity']
-            data['avg_cost'] = round(avg_cost, 4)
-            cost_data.append(data)
-    
-    return render_template('analysis/cost.html', 
-                          cost_data=cost_data, 
-                          total_investment=total_investment, 
-                          total_fee=total_fee, 
-                          total_trades=total_trades)
+    user_id = session['user_id']
+    # 数据未变化时直接使用缓存的汇总结果
+    data = analysis_cache.get_or_compute(user_id, 'cost', lambda: build_cost_analysis(user_id))
+    return render_template('analysis/cost.html', **data)
 
 @analysis_bp.route('/profit')
 @login_required
 def profit_analysis():
     """收益分析"""
-    # 获取所有定投记录
-    records = InvestmentRecord.query.filter_by(user_id=session['user_id']).all()
-    
-    if not records:
-        return render_template('analysis/profit.html', 
-                              profit_data=[], 
-                              total_cost=0, 
-                              total_market_value=0, 
-                              total_profit_loss=0, 
-                              total_profit_rate=0)
-    
-    # 按标的代码分组计算
-    profit_data = []
-    stock_groups = {}
-    total_cost = 0
-    total_market_value = 0
-    total_profit_loss = 0
-    
-    for record in records:
-        stock_code = record.target.code if record.target else 'Unknown'
-        if stock_code not in stock_groups:
-            stock_groups[stock_code] = {
-                'stock_code': stock_code,
-                'stock_name': record.target.name if record.target else 'Unknown',
-                'records': [],
-                'total_amount': 0,
-                'total_quantity': 0,
-                'total_fee': 0
-            }
-        
-        stock_groups[stock_code]['records'].append(record.to_dict())
-        stock_groups[stock_code]['total_amount'] += float(record.amount)
-        stock_groups[stock_code]['total_quantity'] += float(record.quantity)
-        stock_groups[stock_code]['total_fee'] += float(record.fee)
-    
-    # 计算平均成本和收益
-    for stock_code, data in stock_groups.items():
-        if data['total_quantity'] > 0:
-            avg_cost = data['total_amount'] / data['total_quantity']
-            data['avg_cost'] = round(avg_cost, 4)
-            
-            # 获取最新价格
-            latest_target = Target.query.filter_by(
-                user_id=session['user_id'],
-                code=stock_code
-            ).order_by(Target.price_date.desc()).first()
-            
-            if latest_target:
-                data['latest_price'] = float(latest_target.current_price)
-                data['current_value'] = data['total_quantity'] * data['latest_price']
-                data['profit_loss'] = data['current_value'] - data['total_amount']
-                data['return_rate'] = (data['profit_loss'] / data['total_amount']) * 100 if data['total_amount'] > 0 else 0
-                data['price_date'] = latest_target.price_date
-            else:
-                data['latest_price'] = 0
-                data['current_value'] = 0
-                data['profit_loss'] = 0
-                data['return_rate'] = 0
-                data['price_date'] = None
-            
-            # 累计总体数据
-            total_cost += data['total_amount']
-            total_market_value += data['current_value']
-            total_profit_loss += data['profit_loss']
-            
-            profit_data.append(data)
-    
-    # 计算总体收益率
-    total_profit_rate = (total_profit_loss / total_cost) * 100 if total_cost > 0 else 0
-    
-    return render_template('analysis/profit.html', 
-                          profit_data=profit_data, 
-                          total_cost=total_cost, 
-                          total_market_value=total_market_value, 
-                          total_profit_loss=total_profit_loss, 
-                          total_profit_rate=total_profit_rate)
+    user_id = session['user_id']
+    # 年化收益率按当天估值，缓存按日期区分
+    data = analysis_cache.get_or_compute(user_id, f'profit:{date.today()}', lambda: build_profit_analysis(user_id))
+    return render_template('analysis/profit.html', **data)
+
+@analysis_bp.route('/value-curve')
+@login_required
+def value_curve():
+    """组合每日市值和累计投入曲线（JSON），可选 start、end 参数（YYYY-MM-DD）"""
+    user_id = session['user_id']
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else date.today()
+    except ValueError:
+        return jsonify({'success': False, 'message': '日期格式错误，请使用 YYYY-MM-DD'}), 400
+
+    # 市值曲线依赖 numpy，首次请求时再导入
+    from app.portfolio import build_value_curve
+    curve = analysis_cache.get_or_compute(
+        user_id, f'value_curve:{start}:{end}', lambda: build_value_curve(user_id, start, end)
+    )
+    return jsonify({'success': True, **curve})
+
+@analysis_bp.route('/targets/<int:target_id>/trades')
+@login_required
+def target_trades(target_id):
+    """标的交易明细（分页JSON，供详情弹窗按需加载）"""
+    target = Target.query.filter_by(id=target_id, user_id=session['user_id']).first()
+    if not target:
+        return jsonify({'success': False, 'message': '标的不存在'}), 404
+
+    try:
+        after = decode_cursor(request.args.get('cursor'), datetime, int)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    limit = parse_limit(request.args.get('limit'))
+    trades, next_key = load_trade_page(session['user_id'], target_id, after, limit)
+
+    return jsonify({
+        'success': True,
+        'trades': trades,
+        'next_cursor': encode_cursor(*next_key) if next_key else None
+    })
+
+@analysis_bp.route('/cache-stats')
+@metrics_access_required
+def cache_stats():
+    """分析缓存命中统计（当前进程），与 /metrics 相同只允许本机或携带 METRICS_TOKEN 访问"""
+    return jsonify({'success': True, 'stats': analysis_cache.stats()})
 
 @analysis_bp.route('/update-price', methods=['POST'])
 @login_required
@@ -177,6 +106,7 @@ def update_price():
     target.price_date = datetime.now()
     
     try:
+        bump_data_version(session['user_id'])
         db.session.commit()
         return jsonify({
             'success': True, 
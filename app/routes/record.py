@@ -1,45 +1,70 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, abort
+from sqlalchemy.orm import contains_eager
 from app import db
 from app.models import InvestmentRecord, Target
 from app.utils.decorators import login_required
+from app.positions import apply_record_delta, apply_record_deltas
+from app.utils.pagination import keyset_paginate
+from app.search import code_filter
+from app.cache import bump_data_version
 from datetime import datetime
 
 record_bp = Blueprint('record', __name__)
 
+# 记录列表按 (买入日期, ID) 键集分页
+RECORD_LIST_ORDER = [InvestmentRecord.buy_date, InvestmentRecord.id]
+
+def record_list_query(user_id, stock_code='', start_date=None, end_date=None):
+    """记录列表的筛选查询（查询计划检查也使用该查询）"""
+    # 标的随记录一起取出，模板中访问 record.target 不再逐条查询
+    query = InvestmentRecord.query.filter_by(user_id=user_id).join(Target)\
+        .options(contains_eager(InvestmentRecord.target))
+    
+    if stock_code:
+        query = query.filter(code_filter(Target.code, stock_code))
+    
+    if start_date:
+        query = query.filter(InvestmentRecord.buy_date >= start_date)
+    
+    if end_date:
+        query = query.filter(InvestmentRecord.buy_date <= end_date)
+    
+    return query
+
 @record_bp.route('/')
 @login_required
 def index():
     """定投记录列表"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    
     # 筛选条件
     stock_code = request.args.get('stock_code', '').strip()
     start_date = request.args.get('start_date', '').strip()
     end_date = request.args.get('end_date', '').strip()
     
-    query = InvestmentRecord.query.filter_by(user_id=session['user_id']).join(Target)
-    
-    if stock_code:
-        query = query.filter(Target.code.like(f'%{stock_code}%'))
-    
+    start_date_obj = end_date_obj = None
     if start_date:
         try:
             start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(InvestmentRecord.buy_date >= start_date_obj)
         except ValueError:
             pass
     
     if end_date:
         try:
             end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-            query = query.filter(InvestmentRecord.buy_date <= end_date_obj)
         except ValueError:
             pass
     
-    records = query.order_by(InvestmentRecord.buy_date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    query = record_list_query(session['user_id'], stock_code, start_date_obj, end_date_obj)
+    
+    # 按 (买入日期, ID) 键集分页，翻到任意深度的开销都相同
+    try:
+        records = keyset_paginate(
+            query, RECORD_LIST_ORDER,
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=current_app.config['PAGE_SIZE'],
+            count_limit=current_app.config['PAGINATION_COUNT_LIMIT']
+        )
+    except ValueError:
+        abort(400, description='无效的分页游标')
     
     return render_template('record/index.html', records=records, 
                           stock_code=stock_code, start_date=start_date, end_date=end_date)
@@ -98,6 +123,9 @@ def create():
         
         try:
             db.session.add(record)
+            # 同一事务内更新持仓汇总
+            apply_record_delta(session['user_id'], target_id, amount, quantity, fee, 1)
+            bump_data_version(session['user_id'])
             db.session.commit()
             flash('定投记录创建成功', 'success')
             return redirect(url_for('record.index'))
@@ -155,6 +183,9 @@ def edit(record_id):
             targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
             return render_template('record/edit.html', record=record, targets=targets)
         
+        # 记录修改前的数据，用于更新持仓汇总
+        old_values = (record.target_id, record.amount, record.quantity, record.fee)
+        
         # 更新记录
         record.target_id = target_id
         record.buy_date = buy_date_obj
@@ -165,6 +196,13 @@ def edit(record_id):
         record.notes = notes
         
         try:
+            # 同一事务内从原标的扣除旧数据、向新标的累加新数据
+            old_target_id, old_amount, old_quantity, old_fee = old_values
+            apply_record_deltas([
+                (session['user_id'], old_target_id, -float(old_amount), -float(old_quantity), -float(old_fee or 0), -1),
+                (session['user_id'], target_id, amount, quantity, fee, 1)
+            ])
+            bump_data_version(session['user_id'])
             db.session.commit()
             flash('定投记录更新成功', 'success')
             return redirect(url_for('record.index'))
@@ -187,7 +225,10 @@ def delete(record_id):
     ).first_or_404()
     
     try:
+        apply_record_delta(session['user_id'], record.target_id,
+                           -float(record.amount), -float(record.quantity), -float(record.fee or 0), -1)
         db.session.delete(record)
+        bump_data_version(session['user_id'])
         db.session.commit()
         flash('定投记录删除成功', 'success')
     except Exception as e:
@@ -1,30 +1,43 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app, abort
 from app import db
-from app.models import InvestmentReminder, User, Target
-from app.utils.decorators import login_required
+from app.models import InvestmentReminder, User, Target, normalize_reminder_time
+from app.utils.decorators import login_required, metrics_access_required
+from app.delivery import delivery
+from app.cache import bump_data_version
+from app.utils.pagination import keyset_paginate
+from app.search import code_filter
 from datetime import datetime
-import requests
 
 reminder_bp = Blueprint('reminder', __name__)
 
+# 提醒列表按 (创建时间, ID) 键集分页
+REMINDER_LIST_ORDER = [InvestmentReminder.created_at, InvestmentReminder.id]
+
+def reminder_list_query(user_id, stock_code=''):
+    """提醒列表的筛选查询（查询计划检查也使用该查询）"""
+    query = InvestmentReminder.query.filter_by(user_id=user_id).join(Target)
+    
+    if stock_code:
+        query = query.filter(code_filter(Target.code, stock_code))
+    
+    return query
+
 @reminder_bp.route('/')
 @login_required
 def index():
     """定投提醒列表"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    
     # 筛选条件
     stock_code = request.args.get('stock_code', '').strip()
     
-    query = InvestmentReminder.query.filter_by(user_id=session['user_id']).join(Target)
-    
-    if stock_code:
-        query = query.filter(Target.code.like(f'%{stock_code}%'))
-    
-    reminders = query.order_by(InvestmentReminder.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        reminders = keyset_paginate(
+            reminder_list_query(session['user_id'], stock_code), REMINDER_LIST_ORDER,
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=current_app.config['PAGE_SIZE'],
+            count_limit=current_app.config['PAGINATION_COUNT_LIMIT']
+        )
+    except ValueError:
+        abort(400, description='无效的分页游标')
     
     return render_template('reminder/index.html', reminders=reminders, stock_code=stock_code)
 
@@ -53,6 +66,13 @@ def create():
             targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
             return render_template('reminder/create.html', targets=targets)
         
+        try:
+            reminder_time = normalize_reminder_time(reminder_time)
+        except ValueError:
+            flash('提醒时间格式应为HH:MM', 'error')
+            targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
+            return render_template('reminder/create.html', targets=targets)
+        
         if amount <= 0:
             flash('定投金额必须大于0', 'error')
             targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
@@ -98,6 +118,7 @@ def create():
         
         try:
             db.session.add(reminder)
+            bump_data_version(session['user_id'])
             db.session.commit()
             
             # 添加定时任务
@@ -145,6 +166,13 @@ def edit(reminder_id):
             targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
             return render_template('reminder/edit.html', reminder=reminder, targets=targets)
         
+        try:
+            reminder_time = normalize_reminder_time(reminder_time)
+        except ValueError:
+            flash('提醒时间格式应为HH:MM', 'error')
+            targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
+            return render_template('reminder/edit.html', reminder=reminder, targets=targets)
+        
         if amount <= 0:
             flash('定投金额必须大于0', 'error')
             targets = Target.query.filter_by(user_id=session['user_id'], is_active=True).all()
@@ -187,6 +215,7 @@ def edit(reminder_id):
         reminder.reminder_time = reminder_time
         
         try:
+            bump_data_version(session['user_id'])
             db.session.commit()
             
             # 更新定时任务
@@ -219,6 +248,7 @@ def delete(reminder_id):
         scheduler.remove_reminder_job(reminder_id)
         
         db.session.delete(reminder)
+        bump_data_version(session['user_id'])
         db.session.commit()
         flash('定投提醒删除成功', 'success')
     except Exception as e:
@@ -239,6 +269,7 @@ def toggle(reminder_id):
     reminder.is_active = not reminder.is_active
     
     try:
+        bump_data_version(session['user_id'])
         db.session.commit()
         
         # 更新定时任务
@@ -276,22 +307,16 @@ def test_webhook():
         }
     }
     
-    try:
-        response = requests.post(user.webhook_url, json=message, timeout=10)
-        if response.status_code == 200:
-            return jsonify({
-                'success': True,
-                'message': '测试消息发送成功！'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'发送失败，状态码：{response.status_code}'
-            })
-    except Exception as e:
+    result = delivery.send(user.webhook_url, message)
+    if result['success']:
+        return jsonify({
+            'success': True,
+            'message': '测试消息发送成功！'
+        })
+    else:
         return jsonify({
             'success': False,
-            'message': f'发送失败：{str(e)}'
+            'message': f"发送失败：{result['error']}"
         })
 
 @reminder_bp.route('/send-reminder/<int:reminder_id>', methods=['POST'])
@@ -322,24 +347,31 @@ def send_reminder(reminder_id):
         }
     }
     
-    try:
-        response = requests.post(user.webhook_url, json=message, timeout=10)
-        if response.status_code == 200:
-            return jsonify({
-                'success': True,
-                'message': '定投提醒发送成功！'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'发送失败，状态码：{response.status_code}'
-            })
-    except Exception as e:
+    result = delivery.send(user.webhook_url, message)
+    if result['success']:
+        return jsonify({
+            'success': True,
+            'message': '定投提醒发送成功！'
+        })
+    else:
         return jsonify({
             'success': False,
-            'message': f'发送失败：{str(e)}'
+            'message': f"发送失败：{result['error']}"
         })
 
+@reminder_bp.route('/scheduler-status', methods=['GET'])
+@metrics_access_required
+def scheduler_status():
+    """调度器运行统计：各调度进程的触发延迟、排队、错过执行和webhook发送情况汇总
+
+    内容为所有用户共用的全局数据，与 /metrics 相同只允许本机或携带 METRICS_TOKEN 访问。
+    """
+    from app.scheduler import scheduler
+    return jsonify({
+        'success': True,
+        'status': scheduler.status()
+    })
+
 @reminder_bp.route('/job-status/<int:reminder_id>', methods=['GET'])
 @login_required
 def get_job_status(reminder_id):
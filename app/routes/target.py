@@ -1,34 +1,66 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app, abort
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Target, InvestmentRecord
 from app.utils.decorators import login_required
+from app.positions import remove_target_positions
+from app.utils.pagination import keyset_paginate
+from app.search import code_filter, target_index
+from app.cache import bump_data_version
+from app.instruments import link_instrument
+from app.prices import parse_quotes_json, parse_quotes_csv, apply_price_updates
 from datetime import datetime
 from decimal import Decimal
 
 target_bp = Blueprint('target', __name__)
 
+# 标的列表按 (创建时间, ID) 键集分页
+TARGET_LIST_ORDER = [Target.created_at, Target.id]
+
+def target_list_query(user_id, code='', market=''):
+    """标的列表的筛选查询（查询计划检查也使用该查询）"""
+    # 有效价格需要共享行情，随列表一并关联加载
+    query = Target.query.filter_by(user_id=user_id).options(joinedload(Target.instrument))
+    
+    if code:
+        query = query.filter(code_filter(Target.code, code))
+    
+    if market:
+        query = query.filter(Target.market == market)
+    
+    return query
+
+def latest_target_query(user_id, code):
+    """按代码查找用户价格日期最新的标的"""
+    return Target.query.filter_by(
+        user_id=user_id,
+        code=code.upper()
+    ).order_by(Target.price_date.desc())
+
+def active_targets_query(user_id):
+    """用户启用中的标的，按代码排序"""
+    return Target.query.filter_by(
+        user_id=user_id,
+        is_active=True
+    ).order_by(Target.code)
+
 @target_bp.route('/')
 @login_required
 def index():
     """投资标的管理列表"""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    
     # 筛选条件
     code = request.args.get('code', '').strip()
     market = request.args.get('market', '').strip()
     
-    query = Target.query.filter_by(user_id=session['user_id'])
-    
-    if code:
-        query = query.filter(Target.code.like(f'%{code}%'))
-    
-    if market:
-        query = query.filter(Target.market == market)
-    
-    targets = query.order_by(Target.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        targets = keyset_paginate(
+            target_list_query(session['user_id'], code, market), TARGET_LIST_ORDER,
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=current_app.config['PAGE_SIZE'],
+            count_limit=current_app.config['PAGINATION_COUNT_LIMIT']
+        )
+    except ValueError:
+        abort(400, description='无效的分页游标')
     
     return render_template('target/index.html', targets=targets, code=code, market=market)
 
@@ -85,7 +117,10 @@ def create():
         
         try:
             db.session.add(target)
+            link_instrument(target)
+            bump_data_version(session['user_id'])
             db.session.commit()
+            target_index.invalidate(session['user_id'])
             flash('投资标的添加成功', 'success')
             return redirect(url_for('target.index'))
         except Exception as e:
@@ -150,7 +185,10 @@ def edit(target_id):
         target.notes = notes
         
         try:
+            link_instrument(target)
+            bump_data_version(session['user_id'])
             db.session.commit()
+            target_index.invalidate(session['user_id'])
             flash('投资标的更新成功', 'success')
             return redirect(url_for('target.index'))
         except Exception as e:
@@ -170,8 +208,11 @@ def delete(target_id):
     ).first_or_404()
     
     try:
+        remove_target_positions(target.id)
         db.session.delete(target)
+        bump_data_version(session['user_id'])
         db.session.commit()
+        target_index.invalidate(session['user_id'])
         flash('投资标的删除成功', 'success')
     except Exception as e:
         db.session.rollback()
@@ -191,7 +232,9 @@ def toggle(target_id):
     target.is_active = not target.is_active
     
     try:
+        bump_data_version(session['user_id'])
         db.session.commit()
+        target_index.invalidate(session['user_id'])
         status = '启用' if target.is_active else '禁用'
         flash(f'投资标的已{status}', 'success')
     except Exception as e:
@@ -204,18 +247,15 @@ def toggle(target_id):
 @login_required
 def get_latest(code):
     """获取标的的最新价格"""
-    latest_target = Target.query.filter_by(
-        user_id=session['user_id'],
-        code=code.upper()
-    ).order_by(Target.price_date.desc()).first()
+    latest_target = latest_target_query(session['user_id'], code).first()
     
     if latest_target:
         return jsonify({
             'success': True,
             'code': latest_target.code,
             'name': latest_target.name,
-            'price': float(latest_target.current_price),
-            'date': latest_target.price_date.strftime('%Y-%m-%d'),
+            'price': float(latest_target.effective_price),
+            'date': latest_target.effective_price_date.strftime('%Y-%m-%d'),
             'market': latest_target.market,
             'sector': latest_target.sector,
             'notes': latest_target.notes
@@ -230,16 +270,59 @@ def get_latest(code):
 @login_required
 def list_targets():
     """获取用户的标的列表（用于下拉选择）"""
-    targets = Target.query.filter_by(
-        user_id=session['user_id'],
-        is_active=True
-    ).order_by(Target.code).all()
+    targets = active_targets_query(session['user_id']).all()
     
     return jsonify({
         'success': True,
         'targets': [target.to_dict() for target in targets]
     })
 
+@target_bp.route('/autocomplete')
+@login_required
+def autocomplete():
+    """按代码或名称前缀查找标的（用于输入框自动补全）"""
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    
+    return jsonify({
+        'success': True,
+        'targets': target_index.search(session['user_id'], query, limit)
+    })
+
+@target_bp.route('/prices', methods=['POST'])
+@login_required
+def update_prices():
+    """批量更新标的价格
+
+    请求体为JSON行情列表（或 {"quotes": [...]}），也可以是CSV文本或上传的CSV文件（file字段），
+    每条行情包含代码、价格和可选的日期，所有匹配的标的在一个事务中更新。
+    """
+    try:
+        if 'file' in request.files:
+            quotes = parse_quotes_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.is_json:
+            quotes = parse_quotes_json(request.get_json())
+        else:
+            quotes = parse_quotes_csv(request.get_data(as_text=True))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'行情格式错误：{str(e)}'}), 400
+    
+    max_quotes = current_app.config['PRICE_UPDATE_MAX_QUOTES']
+    if len(quotes) > max_quotes:
+        return jsonify({'success': False, 'message': f'单次最多更新 {max_quotes} 条行情'}), 400
+    
+    try:
+        results = apply_price_updates(quotes, user_id=session['user_id'])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'更新失败：{str(e)}'}), 500
+    
+    return jsonify({
+        'success': True,
+        'updated': sum(result['updated'] for result in results),
+        'results': results
+    })
+
 @target_bp.route('/<int:target_id>/update-price', methods=['POST'])
 @login_required
 def update_price(target_id):
@@ -264,8 +347,9 @@ def update_price(target_id):
         
         # 更新价格和日期
         target.current_price = current_price
-        target.price_date = datetime.utcnow()
+        target.price_date = datetime.now()
         
+        bump_data_version(session['user_id'])
         db.session.commit()
         
         return jsonify({
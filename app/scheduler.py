@@ -6,23 +6,62 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.job import Job
+from apscheduler.util import datetime_to_utc_timestamp
 from flask import current_app
+from sqlalchemy import select, update, insert, or_, and_
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import User, InvestmentReminder
-from datetime import datetime, time
-import requests
+from app.models import User, InvestmentReminder, Target, SchedulerLease, normalize_reminder_time
+from app.delivery import delivery
+from app.outbox import outbox
+from app.scheduler_stats import scheduler_monitor
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+import time as time_module
+import threading
+import pickle
 import logging
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 分钟级批量调度任务ID
+DISPATCHER_JOB_ID = 'reminder_dispatcher'
+
+# 调度主节点租约名称，批量调度进度也记录在该租约记录上
+LEASE_NAME = 'reminder_scheduler'
+
+# 发件箱重试任务ID
+OUTBOX_JOB_ID = 'notification_outbox'
+
+# 汇总消息单条内容的字节上限（企业微信文本消息限制为2048字节）
+DIGEST_CONTENT_LIMIT = 2000
+
+# 任务执行时使用的应用实例，进程内只创建一次
+_job_app_lock = threading.Lock()
+
+def get_job_app():
+    """获取任务执行所用的Flask应用
+    
+    优先复用调度器绑定的应用实例；调度器尚未初始化时（例如任务由其他进程
+    写入作业存储）才创建一次应用，之后所有任务共享该实例及其数据库引擎。
+    """
+    if scheduler.app is not None:
+        return scheduler.app
+    
+    with _job_app_lock:
+        if scheduler.app is None:
+            from app import create_app
+            create_app()
+    return scheduler.app
+
 def send_reminder_notification(reminder_id):
     """发送定投提醒通知 - 独立函数，避免序列化问题"""
-    from app import create_app
-    app = create_app()
+    app = get_job_app()
     
     with app.app_context():
         try:
@@ -43,48 +82,252 @@ def send_reminder_notification(reminder_id):
                 logger.error(f"用户webhook未配置: {reminder.user_id}")
                 return
             
-            # 构建提醒消息
-            frequency_text = "每月" if reminder.frequency_type == 'monthly' else "每周"
-            frequency_value_text = f"{reminder.frequency_value}日" if reminder.frequency_type == 'monthly' else f"星期{reminder.frequency_value}"
-            
-            message = {
-                "msgtype": "text",
-                "text": {
-                    "content": f"【定投提醒】\n标的：{reminder.target.code} ({reminder.target.name})\n金额：¥{reminder.amount}\n频率：{frequency_text}{frequency_value_text}\n时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n请及时执行定投操作！"
-                }
-            }
+            rows = [(reminder, user.webhook_url)]
+            if app.config.get('REMINDER_DIGEST', False):
+                # 合并模式：同一用户同一时间槽的每个提醒任务都生成汇总消息并写入发件箱，
+                # 按 (用户, 时间槽) 去重，先执行的任务写入并发送，其余任务的写入被忽略；
+                # 任一任务错过执行或提醒被停用都不影响其他提醒的发送
+                now = datetime.now(scheduler.scheduler.timezone)
+                hour, minute = normalize_reminder_time(reminder.reminder_time).split(':')
+                slot = now.replace(hour=int(hour), minute=int(minute), second=0, microsecond=0)
+                rows = query_due_reminders(slot, user_id=reminder.user_id) or rows
+                items = build_delivery_items(rows, True)
+                keys = [f"digest:{reminder.user_id}:{slot.strftime('%Y%m%d%H%M')}:{index}"
+                        for index in range(len(items))]
+                if not outbox.enqueue(items, dedupe_keys=keys):
+                    logger.info(f"提醒已合并到同时间槽的汇总消息，跳过单独发送: {reminder_id}")
+                outbox.drain()
+                return
             
             # 发送通知
-            response = requests.post(user.webhook_url, json=message, timeout=10)
-            if response.status_code == 200:
-                logger.info(f"定投提醒发送成功: {reminder_id}")
-            else:
-                logger.error(f"定投提醒发送失败: {reminder_id}, 状态码: {response.status_code}")
+            deliver_reminders(build_delivery_items(rows))
                 
         except Exception as e:
             logger.error(f"发送定投提醒失败: {e}")
 
+def format_frequency(reminder):
+    """格式化提醒频率，如“每月1日”、“每周星期3”"""
+    frequency_text = "每月" if reminder.frequency_type == 'monthly' else "每周"
+    frequency_value_text = f"{reminder.frequency_value}日" if reminder.frequency_type == 'monthly' else f"星期{reminder.frequency_value}"
+    return f"{frequency_text}{frequency_value_text}"
+
+def build_reminder_message(reminder):
+    """构建定投提醒消息"""
+    return {
+        "msgtype": "text",
+        "text": {
+            "content": f"【定投提醒】\n标的：{reminder.target.code} ({reminder.target.name})\n金额：¥{reminder.amount}\n频率：{format_frequency(reminder)}\n时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n请及时执行定投操作！"
+        }
+    }
+
+def build_digest_messages(reminders):
+    """构建汇总提醒消息，列出每个标的的代码、名称和金额
+    
+    企业微信文本消息内容上限为2048字节，超出时拆分为多条。
+    """
+    header = f"【定投提醒】\n本时段共 {len(reminders)} 个定投计划：\n"
+    footer = f"\n时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n请及时执行定投操作！"
+    limit = DIGEST_CONTENT_LIMIT - len(header.encode()) - len(footer.encode())
+    
+    chunks = [[]]
+    size = 0
+    for index, reminder in enumerate(reminders, 1):
+        line = f"{index}. {reminder.target.code} ({reminder.target.name}) ¥{reminder.amount} {format_frequency(reminder)}\n"
+        line_size = len(line.encode())
+        if chunks[-1] and size + line_size > limit:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += line_size
+    
+    return [{
+        "msgtype": "text",
+        "text": {
+            "content": header + ''.join(lines) + footer
+        }
+    } for lines in chunks]
+
+def build_delivery_items(rows, digest=False):
+    """将 (提醒, webhook) 列表转换为待发送消息
+    
+    合并模式下同一用户的多个提醒合并为一条汇总消息。
+    """
+    items = []
+    groups = {}
+    for reminder, webhook_url in rows:
+        if not webhook_url:
+            logger.error(f"用户webhook未配置: {reminder.user_id}")
+            continue
+        if not digest:
+            items.append((reminder.id, webhook_url, build_reminder_message(reminder)))
+            continue
+        groups.setdefault((reminder.user_id, webhook_url), []).append(reminder)
+    
+    for (_, webhook_url), reminders in groups.items():
+        if len(reminders) == 1:
+            items.append((reminders[0].id, webhook_url, build_reminder_message(reminders[0])))
+            continue
+        label = ','.join(str(reminder.id) for reminder in reminders)
+        for message in build_digest_messages(reminders):
+            items.append((label, webhook_url, message))
+    
+    return items
+
+def deliver_reminders(items):
+    """批量发送提醒消息
+    
+    items 为 (reminder_id, webhook_url, message) 列表。启用发件箱时先持久化再立即发送，
+    失败的通知由发件箱按退避策略重试；否则直接通过共享的发送引擎并发发送。
+    """
+    if outbox.enabled:
+        outbox.enqueue(items)
+        outbox.drain()
+        return None
+    
+    results = delivery.send_many([(webhook_url, message) for _, webhook_url, message in items])
+    
+    for (reminder_id, _, _), result in zip(items, results):
+        if result['success']:
+            logger.info(f"定投提醒发送成功: {reminder_id}")
+        else:
+            logger.error(f"定投提醒发送失败: {reminder_id}, {result['error']}")
+    
+    return results
+
+def drain_outbox():
+    """定时重试发件箱中到期的通知，并清理过期记录"""
+    app = get_job_app()
+    
+    with app.app_context():
+        try:
+            outbox.drain()
+            outbox.purge()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"处理发件箱失败: {e}")
+
+def due_reminders_query(slot, user_id=None):
+    """某个时间槽（精确到分钟）到期的活跃提醒及用户webhook的查询
+    
+    按 (is_active, reminder_time, frequency_type, frequency_value) 索引一次查询完成；
+    提醒时间在写入时和迁移中统一为 HH:MM，这里按字符串精确匹配。
+    """
+    reminder_time = slot.strftime('%H:%M')
+    time_filter = InvestmentReminder.reminder_time == reminder_time
+    if reminder_time == '09:00':
+        # 未设置提醒时间的记录按默认9点处理
+        time_filter = or_(time_filter, InvestmentReminder.reminder_time.is_(None))
+    
+    query = db.session.query(InvestmentReminder, User.webhook_url)\
+        .join(User, InvestmentReminder.user_id == User.id)\
+        .options(joinedload(InvestmentReminder.target))
+    if user_id is not None:
+        query = query.filter(InvestmentReminder.user_id == user_id)
+    
+    return query.filter(
+        InvestmentReminder.is_active == True,
+        time_filter,
+        or_(
+            and_(InvestmentReminder.frequency_type == 'monthly',
+                 InvestmentReminder.frequency_value == slot.day),
+            and_(InvestmentReminder.frequency_type == 'weekly',
+                 InvestmentReminder.frequency_value == slot.isoweekday())
+        )
+    ).order_by(InvestmentReminder.user_id, InvestmentReminder.id)
+
+def query_due_reminders(slot, user_id=None):
+    """查询某个时间槽到期的所有活跃提醒及用户webhook"""
+    return due_reminders_query(slot, user_id).all()
+
+def dispatch_due_reminders():
+    """分钟级批量调度：每分钟触发一次，发送当前时间槽到期的所有提醒
+    
+    处理进度记录在数据库的租约记录中，调度延迟、进程重启或主节点切换后，
+    从上次处理完的时间槽继续补发，最多补发 SCHEDULER_DISPATCH_CATCHUP 秒内的时间槽。
+    """
+    app = get_job_app()
+    
+    with app.app_context():
+        try:
+            now = datetime.now(scheduler.scheduler.timezone).replace(second=0, microsecond=0)
+            catchup = timedelta(seconds=app.config.get('SCHEDULER_DISPATCH_CATCHUP', 3600))
+            
+            slot = now
+            last_slot = scheduler.load_dispatched_slot()
+            if last_slot is not None:
+                slot = max(last_slot + timedelta(minutes=1), now - catchup)
+            
+            while slot <= now:
+                rows = query_due_reminders(slot)
+                items = build_delivery_items(rows, app.config.get('REMINDER_DIGEST', False))
+                
+                if rows:
+                    logger.info(f"时间槽 {slot.strftime('%Y-%m-%d %H:%M')} 到期提醒 {len(rows)} 个，发送消息 {len(items)} 条")
+                deliver_reminders(items)
+                
+                if not scheduler.save_dispatched_slot(slot):
+                    # 租约已被其他进程接管，剩余时间槽由新的主节点处理
+                    logger.warning("已不是调度主节点，停止批量调度")
+                    break
+                slot += timedelta(minutes=1)
+                
+        except Exception as e:
+            logger.error(f"批量调度定投提醒失败: {e}")
+
 class ReminderScheduler:
     """定投提醒定时任务管理器"""
     
     def __init__(self, app=None):
         self.scheduler = None
+        self.jobstore = None
+        self.job_defaults = None
         self.app = app
+        self.lease = None
+        self.mode = 'jobs'
+        self.role = 'all'
         if app is not None:
             self.init_app(app)
     
+    @property
+    def is_leader(self):
+        """当前进程是否负责执行定时任务"""
+        if self.role == 'web':
+            return False
+        return self.lease is None or self.lease.is_leader
+    
+    @property
+    def dispatcher_mode(self):
+        """是否使用分钟级批量调度（不为每个提醒单独创建任务）"""
+        return self.mode == 'dispatcher'
+    
     def init_app(self, app):
         """初始化调度器"""
         self.app = app
+        self.mode = app.config.get('SCHEDULER_MODE', 'jobs')
+        self.role = app.config.get('PROCESS_ROLE', 'all')
+        
+        # 重复初始化时先停止旧的租约线程和统计线程
+        if self.lease is not None:
+            self.lease.stop()
+            self.lease = None
+        scheduler_monitor.stop(persist=False)
         
-        # 配置作业存储
+        # 配置作业存储：默认共用应用的引擎和连接池，避免两个引擎争用同一个 SQLite 文件的锁
+        jobstore_url = app.config.get('SCHEDULER_JOBSTORE_URL')
+        if jobstore_url:
+            from app.engine import create_profiled_engine
+            jobstore_engine = create_profiled_engine(jobstore_url, app.config)
+        else:
+            with app.app_context():
+                jobstore_engine = db.engine
+        self.jobstore = SQLAlchemyJobStore(engine=jobstore_engine)
         jobstores = {
-            'default': SQLAlchemyJobStore(url=app.config['SQLALCHEMY_DATABASE_URI'])
+            'default': self.jobstore
         }
         
         # 配置执行器
         executors = {
-            'default': ThreadPoolExecutor(20)
+            'default': ThreadPoolExecutor(app.config.get('SCHEDULER_MAX_WORKERS', 20))
         }
         
         # 配置作业默认参数
@@ -100,10 +343,152 @@ class ReminderScheduler:
             job_defaults=job_defaults,
             timezone=app.config.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
         )
+        # 调度器补全默认值（如 misfire_grace_time）后的作业参数，批量写入任务时使用
+        self.job_defaults = dict(self.scheduler._job_defaults)
+        
+        # 运行统计通过 /reminder/scheduler-status 和 /metrics 输出
+        from app.metrics import request_metrics
+        request_metrics.register_collector(self._collect_metrics)
+        
+        if self.role == 'web':
+            # Web进程不执行定时任务：以暂停状态启动，提醒的增删改仍写入作业存储，由调度进程执行
+            self.scheduler.start(paused=True)
+            logger.info("Web进程：定时任务由独立的调度进程执行")
+            return
+        
+        # 执行定时任务的进程记录触发延迟、排队和发送耗时等统计，定期写入数据库
+        with app.app_context():
+            stats_engine = db.engine
+        scheduler_monitor.attach(
+            self.scheduler, stats_engine,
+            max_workers=app.config.get('SCHEDULER_MAX_WORKERS', 20),
+            interval=app.config.get('SCHEDULER_STATS_INTERVAL', 15)
+        )
+        
+        if not app.config.get('SCHEDULER_LEADER_ELECTION', True):
+            # 启动调度器
+            self.scheduler.start()
+            logger.info("定时任务调度器已启动")
+            return
+        
+        # 以暂停状态启动：非主节点仍可写入作业存储，但不轮询、不执行任务
+        self.scheduler.start(paused=True)
+        
+        from app.leader import LeaderLease
+        with app.app_context():
+            engine = db.engine
+        
+        self.lease = LeaderLease(
+            engine,
+            name=LEASE_NAME,
+            ttl=app.config.get('SCHEDULER_LEASE_TTL', 10),
+            renew_interval=app.config.get('SCHEDULER_LEASE_RENEW_INTERVAL', 3),
+            on_acquired=self._on_leader_acquired,
+            on_lost=self._on_leader_lost,
+            on_renewed=self._on_leader_renewed
+        )
+        
+        # 首次获取在当前线程完成，由调用方负责同步提醒
+        if self.lease.acquire():
+            self.scheduler.resume()
+            logger.info(f"定时任务调度器已启动（主节点 {self.lease.holder_id}）")
+        else:
+            logger.info(f"定时任务调度器处于待命状态（{self.lease.holder_id}）")
+        
+        self.lease.start()
+    
+    def _on_leader_acquired(self):
+        """接管为主节点：恢复调度并同步提醒"""
+        self.scheduler.resume()
+        logger.info(f"已接管定时任务调度（主节点 {self.lease.holder_id}）")
+        with self.app.app_context():
+            self.sync_all_reminders()
+    
+    def _on_leader_lost(self):
+        """失去主节点身份：暂停调度"""
+        self.scheduler.pause()
+        logger.warning("已失去主节点身份，定时任务调度器暂停")
+    
+    def _on_leader_renewed(self):
+        """续约成功：唤醒调度器，以发现其他进程新写入作业存储的任务"""
+        self.scheduler.wakeup()
+    
+    def load_dispatched_slot(self):
+        """读取批量调度最近处理完的时间槽（调度器时区），没有记录时返回None"""
+        table = SchedulerLease.__table__
+        with db.engine.connect() as conn:
+            value = conn.execute(
+                select(table.c.dispatched_slot).where(table.c.name == LEASE_NAME)
+            ).scalar()
+        if value is None:
+            return None
+        return value.replace(tzinfo=dt_timezone.utc).astimezone(self.scheduler.timezone)
+    
+    def save_dispatched_slot(self, slot):
+        """记录批量调度处理完的时间槽
+        
+        启用主节点选举时只有租约持有者能写入，返回False表示已失去租约；
+        未启用时使用同名记录（租约立即过期，不影响之后启用选举）。
+        """
+        table = SchedulerLease.__table__
+        value = slot.astimezone(dt_timezone.utc).replace(tzinfo=None)
+        now = datetime.utcnow()
+        
+        with db.engine.begin() as conn:
+            statement = update(table).where(table.c.name == LEASE_NAME)\
+                .values(dispatched_slot=value, updated_at=now)
+            if self.lease is not None:
+                return conn.execute(statement.where(table.c.holder == self.lease.holder_id)).rowcount == 1
+            if conn.execute(statement).rowcount == 0:
+                conn.execute(insert(table).values(name=LEASE_NAME, holder='standalone', expires_at=now,
+                                                  dispatched_slot=value, updated_at=now))
+        return True
+    
+    def _trigger_fields(self, frequency_type, frequency_value, reminder_time):
+        """根据提醒频率生成cron字段，不支持的频率返回None"""
+        hour, minute = normalize_reminder_time(reminder_time).split(':')
+        
+        if frequency_type == 'monthly':
+            # 每月定投：每月指定日期的指定时间
+            fields = {'day': str(frequency_value)}
+        elif frequency_type == 'weekly':
+            # 每周定投：每周指定星期的指定时间（APScheduler中0=周一）
+            fields = {'day_of_week': str(frequency_value - 1)}
+        else:
+            return None
+        
+        fields['hour'] = str(int(hour))
+        fields['minute'] = str(int(minute))
+        return fields
+    
+    def _job_signature(self, fields, name, reminder_id):
+        """任务签名，用于判断作业存储中的任务是否需要更新"""
+        return (
+            tuple(fields.items()),
+            self.app.config.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai'),
+            name,
+            (reminder_id,),
+            self.job_defaults['misfire_grace_time'],
+            self.job_defaults['coalesce'],
+            self.job_defaults['max_instances']
+        )
+    
+    def _stored_job_signature(self, state):
+        """从作业存储中反序列化的任务状态计算签名"""
+        trigger = state['trigger']
+        if not isinstance(trigger, CronTrigger):
+            return None
         
-        # 启动调度器
-        self.scheduler.start()
-        logger.info("定时任务调度器已启动")
+        fields = tuple((f.name, str(f)) for f in trigger.fields if not f.is_default)
+        return (
+            fields,
+            str(trigger.timezone),
+            state['name'],
+            tuple(state['args']),
+            state['misfire_grace_time'],
+            state['coalesce'],
+            state['max_instances']
+        )
     
     def add_reminder_job(self, reminder):
         """添加定投提醒任务"""
@@ -111,37 +496,24 @@ class ReminderScheduler:
             logger.error("调度器未初始化")
             return False
         
+        if self.dispatcher_mode:
+            # 批量调度模式下每次触发都直接读取提醒表，无需维护单独的任务
+            return True
+        
         try:
             # 构建任务ID
             job_id = f"reminder_{reminder.id}"
             
-            # 删除已存在的任务
-            self.remove_reminder_job(reminder.id)
-            
             # 构建cron表达式
-            timezone = self.app.config.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
-            
-            if reminder.frequency_type == 'monthly':
-                # 每月定投：每月指定日期的指定时间
-                trigger = CronTrigger(
-                    day=reminder.frequency_value,
-                    hour=int(reminder.reminder_time.split(':')[0]),
-                    minute=int(reminder.reminder_time.split(':')[1]),
-                    timezone=timezone
-                )
-            elif reminder.frequency_type == 'weekly':
-                # 每周定投：每周指定星期的指定时间
-                trigger = CronTrigger(
-                    day_of_week=reminder.frequency_value - 1,  # APScheduler中0=周一
-                    hour=int(reminder.reminder_time.split(':')[0]),
-                    minute=int(reminder.reminder_time.split(':')[1]),
-                    timezone=timezone
-                )
-            else:
+            fields = self._trigger_fields(reminder.frequency_type, reminder.frequency_value, reminder.reminder_time)
+            if fields is None:
                 logger.error(f"不支持的频率类型: {reminder.frequency_type}")
                 return False
             
-            # 添加任务 - 使用独立函数而不是实例方法
+            timezone = self.app.config.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
+            trigger = CronTrigger(timezone=timezone, **fields)
+            
+            # 添加任务 - 使用独立函数而不是实例方法；已存在的任务直接覆盖
             self.scheduler.add_job(
                 func=send_reminder_notification,
                 trigger=trigger,
@@ -163,6 +535,9 @@ class ReminderScheduler:
         if not self.scheduler:
             return False
         
+        if self.dispatcher_mode:
+            return True
+        
         try:
             job_id = f"reminder_{reminder_id}"
             self.scheduler.remove_job(job_id)
@@ -177,31 +552,190 @@ class ReminderScheduler:
         return self.add_reminder_job(reminder)
     
     def sync_all_reminders(self):
-        """同步所有活跃的定投提醒"""
+        """同步所有活跃的定投提醒
+        
+        对比作业存储与提醒表，只新增、更新或删除有变化的任务，
+        并按批次在单个事务中写入作业存储。
+        """
         if not self.scheduler:
             logger.error("调度器未初始化")
             return
         
+        self._sync_outbox_job()
+        
+        if self.dispatcher_mode:
+            self._sync_dispatcher()
+            return
+        
         try:
-            # 获取所有活跃的提醒
-            active_reminders = InvestmentReminder.query.filter_by(is_active=True).all()
+            started = time_module.perf_counter()
+            timezone = self.app.config.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
+            
+            # 期望的任务：只查询需要的列，不加载ORM对象
+            rows = db.session.query(
+                InvestmentReminder.id,
+                InvestmentReminder.frequency_type,
+                InvestmentReminder.frequency_value,
+                InvestmentReminder.reminder_time,
+                Target.code
+            ).join(Target, InvestmentReminder.target_id == Target.id)\
+                .filter(InvestmentReminder.is_active == True).all()
             
-            logger.info(f"开始同步 {len(active_reminders)} 个定投提醒")
+            desired = {}
+            for reminder_id, frequency_type, frequency_value, reminder_time, code in rows:
+                # 单个提醒的配置无效时只跳过该提醒，不影响其余提醒的同步
+                try:
+                    fields = self._trigger_fields(frequency_type, frequency_value, reminder_time)
+                    if fields is None:
+                        logger.error(f"不支持的频率类型: {frequency_type}")
+                        continue
+                    trigger = CronTrigger(timezone=timezone, **fields)
+                except Exception as e:
+                    logger.error(f"定投提醒 {reminder_id} 的时间配置无效，跳过同步: {e}")
+                    continue
+                name = f"定投提醒-{code}"
+                desired[f"reminder_{reminder_id}"] = (reminder_id, trigger, name,
+                                                      self._job_signature(fields, name, reminder_id))
             
-            for reminder in active_reminders:
-                self.add_reminder_job(reminder)
+            # 作业存储中已有的任务
+            existing = self._load_stored_signatures()
             
-            logger.info("定投提醒同步完成")
+            to_remove = [job_id for job_id in existing if job_id not in desired]
+            to_write = [job_id for job_id, spec in desired.items() if existing.get(job_id) != spec[3]]
+            
+            logger.info(f"开始同步 {len(desired)} 个定投提醒：写入 {len(to_write)} 个，删除 {len(to_remove)} 个")
+            
+            batch_size = self.app.config.get('SCHEDULER_SYNC_BATCH_SIZE', 1000)
+            now = datetime.now(self.scheduler.timezone)
+            
+            for i in range(0, len(to_remove), batch_size):
+                self._write_jobs_batch(to_remove[i:i + batch_size], [])
+            
+            for i in range(0, len(to_write), batch_size):
+                batch = to_write[i:i + batch_size]
+                jobs = []
+                for job_id in batch:
+                    reminder_id, trigger, name, _ = desired[job_id]
+                    jobs.append(Job(
+                        self.scheduler,
+                        id=job_id,
+                        func=send_reminder_notification,
+                        trigger=trigger,
+                        executor='default',
+                        args=(reminder_id,),
+                        kwargs={},
+                        name=name,
+                        misfire_grace_time=self.job_defaults['misfire_grace_time'],
+                        coalesce=self.job_defaults['coalesce'],
+                        max_instances=self.job_defaults['max_instances'],
+                        next_run_time=trigger.get_next_fire_time(None, now)
+                    ))
+                self._write_jobs_batch([job_id for job_id in batch if job_id in existing], jobs)
+            
+            # 从批量调度模式切换回来时移除分钟级调度任务
+            if self.scheduler.get_job(DISPATCHER_JOB_ID):
+                self.scheduler.remove_job(DISPATCHER_JOB_ID)
+            
+            if to_write or to_remove:
+                self.scheduler.wakeup()
+            
+            logger.info(f"定投提醒同步完成，耗时 {time_module.perf_counter() - started:.2f} 秒")
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"同步定投提醒失败: {e}")
     
+    def _sync_outbox_job(self):
+        """启用发件箱时确保重试任务存在，否则移除
+        
+        逐条任务的合并模式通过发件箱去重发送汇总消息，同样需要重试任务。
+        """
+        try:
+            digest_claims = self.app.config.get('REMINDER_DIGEST', False) and not self.dispatcher_mode
+            if not outbox.enabled and not digest_claims:
+                if self.scheduler.get_job(OUTBOX_JOB_ID):
+                    self.scheduler.remove_job(OUTBOX_JOB_ID)
+                return
+            
+            self.scheduler.add_job(
+                func=drain_outbox,
+                trigger=IntervalTrigger(seconds=self.app.config.get('OUTBOX_POLL_INTERVAL', 5)),
+                id=OUTBOX_JOB_ID,
+                name="通知发件箱重试",
+                coalesce=True,
+                max_instances=1,
+                replace_existing=True
+            )
+        except Exception as e:
+            logger.error(f"同步发件箱重试任务失败: {e}")
+    
+    def _sync_dispatcher(self):
+        """批量调度模式：确保分钟级调度任务存在，并清理逐条提醒任务"""
+        try:
+            self.scheduler.add_job(
+                func=dispatch_due_reminders,
+                trigger=CronTrigger(second=0, timezone=self.scheduler.timezone),
+                id=DISPATCHER_JOB_ID,
+                name="定投提醒批量调度",
+                coalesce=True,
+                max_instances=1,
+                replace_existing=True
+            )
+            
+            stale = list(self._load_stored_signatures())
+            batch_size = self.app.config.get('SCHEDULER_SYNC_BATCH_SIZE', 1000)
+            for i in range(0, len(stale), batch_size):
+                self._write_jobs_batch(stale[i:i + batch_size], [])
+            
+            logger.info(f"批量调度任务已就绪，清理逐条提醒任务 {len(stale)} 个")
+            
+        except Exception as e:
+            logger.error(f"同步批量调度任务失败: {e}")
+    
+    def _load_stored_signatures(self):
+        """读取作业存储中所有定投提醒任务的签名"""
+        jobs_t = self.jobstore.jobs_t
+        signatures = {}
+        
+        with self.jobstore.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                select(jobs_t.c.id, jobs_t.c.job_state)
+                .where(jobs_t.c.id.like('reminder\\_%', escape='\\'))
+                .where(jobs_t.c.id != DISPATCHER_JOB_ID)
+            )
+            for job_id, job_state in result:
+                try:
+                    signatures[job_id] = self._stored_job_signature(pickle.loads(job_state))
+                except Exception as e:
+                    # 无法反序列化的任务视为需要重建
+                    logger.warning(f"无法读取任务 {job_id}: {e}")
+                    signatures[job_id] = None
+        
+        return signatures
+    
+    def _write_jobs_batch(self, delete_ids, jobs):
+        """在单个事务中删除并写入一批任务"""
+        jobs_t = self.jobstore.jobs_t
+        
+        with self.jobstore.engine.begin() as conn:
+            if delete_ids:
+                conn.execute(jobs_t.delete().where(jobs_t.c.id.in_(delete_ids)))
+            if jobs:
+                conn.execute(jobs_t.insert(), [{
+                    'id': job.id,
+                    'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+                    'job_state': pickle.dumps(job.__getstate__(), self.jobstore.pickle_protocol)
+                } for job in jobs])
+    
     def get_job_status(self, reminder_id):
         """获取任务状态"""
         if not self.scheduler:
             return None
         
         try:
+            if self.dispatcher_mode:
+                return self._dispatcher_job_status(reminder_id)
+            
             job_id = f"reminder_{reminder_id}"
             job = self.scheduler.get_job(job_id)
             if job:
@@ -216,8 +750,53 @@ class ReminderScheduler:
             logger.error(f"获取任务状态失败: {e}")
             return None
     
+    def _dispatcher_job_status(self, reminder_id):
+        """批量调度模式下根据提醒配置推算下次触发时间"""
+        if not self.scheduler.get_job(DISPATCHER_JOB_ID):
+            return None
+        
+        reminder = InvestmentReminder.query.get(reminder_id)
+        if not reminder or not reminder.is_active:
+            return None
+        
+        fields = self._trigger_fields(reminder.frequency_type, reminder.frequency_value, reminder.reminder_time)
+        if fields is None:
+            return None
+        
+        trigger = CronTrigger(timezone=self.scheduler.timezone, **fields)
+        next_run_time = trigger.get_next_fire_time(None, datetime.now(self.scheduler.timezone))
+        return {
+            'id': DISPATCHER_JOB_ID,
+            'name': f"定投提醒-{reminder.target.code}",
+            'next_run_time': next_run_time.isoformat() if next_run_time else None,
+            'trigger': str(trigger)
+        }
+    
+    def due_job_count(self):
+        """作业存储中已到计划时间尚未执行的任务数（高峰期积压）"""
+        jobs_t = self.jobstore.jobs_t
+        now = datetime_to_utc_timestamp(datetime.now(self.scheduler.timezone))
+        with self.jobstore.engine.connect() as conn:
+            return conn.execute(
+                select(db.func.count()).select_from(jobs_t).where(jobs_t.c.next_run_time <= now)
+            ).scalar()
+    
+    def status(self):
+        """汇总各调度进程的运行统计"""
+        from app.scheduler_stats import build_status
+        return build_status(db.engine, self.app.config.get('SCHEDULER_STATS_INTERVAL', 15), self.due_job_count())
+    
+    def _collect_metrics(self):
+        from app.scheduler_stats import collect_metrics
+        return collect_metrics(db.engine, self.app.config.get('SCHEDULER_STATS_INTERVAL', 15), self.due_job_count())
+    
     def shutdown(self):
         """关闭调度器"""
+        if self.lease is not None:
+            self.lease.stop()
+            self.lease = None
+        scheduler_monitor.stop()
+        
         if self.scheduler:
             self.scheduler.shutdown()
             logger.info("定时任务调度器已关闭")
@@ -0,0 +1,289 @@
+"""
+调度器运行统计模块
+通过 APScheduler 事件记录定时任务的运行情况：
+  - 触发延迟：提交到执行器时相对计划时间晚了多少秒
+  - 完成耗时：从计划时间到执行结束（含在执行器中排队和执行的时间）
+  - 提交、完成、失败、错过执行（misfire）和因并发上限跳过的次数
+  - 执行器中执行和排队的任务数，以及排队数的峰值
+执行定时任务的进程定期把统计快照写入 scheduler_stats 表（连同webhook发送耗时和成功失败次数），
+Web进程汇总各进程的快照，通过 /reminder/scheduler-status（JSON）和 /metrics 输出。
+"""
+
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+)
+from sqlalchemy import select, update, insert, delete
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from app.metrics import Histogram
+from app.delivery import delivery, LATENCY_BUCKETS as DELIVERY_LATENCY_BUCKETS
+import threading
+import socket
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 触发延迟和完成耗时（秒）的分桶上限
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+# 快照超过该时间未更新的进程视为已退出，不计入当前排队数，超过一天的快照直接删除
+STALE_INTERVALS = 3
+EXPIRE_AFTER = timedelta(days=1)
+
+EVENT_NAMES = {
+    EVENT_JOB_SUBMITTED: 'submitted',
+    EVENT_JOB_EXECUTED: 'executed',
+    EVENT_JOB_ERROR: 'error',
+    EVENT_JOB_MISSED: 'missed',
+    EVENT_JOB_MAX_INSTANCES: 'max_instances',
+}
+EVENT_MASK = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+
+def job_kind(job_id):
+    """按任务ID归类：逐条提醒、批量调度、发件箱重试"""
+    from app.scheduler import DISPATCHER_JOB_ID, OUTBOX_JOB_ID
+    if job_id == DISPATCHER_JOB_ID:
+        return 'dispatcher'
+    if job_id == OUTBOX_JOB_ID:
+        return 'outbox'
+    if job_id.startswith('reminder_'):
+        return 'reminder'
+    return 'other'
+
+class SchedulerMonitor:
+    """本进程调度器的运行统计"""
+
+    def __init__(self):
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = None
+        self.interval = 15
+        self.max_workers = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._scheduler = None
+        self.reset()
+
+    @property
+    def active(self):
+        """本进程是否在记录调度统计（Web角色不执行定时任务，不记录）"""
+        return self._scheduler is not None
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.utcnow()
+            self._counts = defaultdict(int)  # (任务类别, 事件) -> 次数
+            self._fire_lag = Histogram(LAG_BUCKETS)
+            self._completion = Histogram(LAG_BUCKETS)
+            self._inflight = 0
+            self._peak_queued = 0
+
+    def attach(self, apscheduler, engine, max_workers, holder_id=None, interval=15):
+        """监听调度器事件，并启动定期写入快照的后台线程"""
+        self.stop(persist=False)
+        self.reset()
+        self._scheduler = apscheduler
+        self.engine = engine
+        self.max_workers = max_workers
+        self.interval = interval
+        if holder_id:
+            self.holder_id = holder_id
+        apscheduler.add_listener(self._on_event, mask=EVENT_MASK)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler-stats', daemon=True)
+        self._thread.start()
+
+    def stop(self, persist=True):
+        """停止后台线程，并写入最后一次快照"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        if persist and self._scheduler is not None:
+            self.persist()
+        self._scheduler = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.persist()
+
+    def _on_event(self, event):
+        kind = job_kind(event.job_id)
+        now = datetime.now(timezone.utc)
+        labels = (('kind', kind),)
+        with self._lock:
+            self._counts[(kind, EVENT_NAMES[event.code])] += 1
+            # 执行器对提交的每个计划时间各产生一个 executed/error/missed 事件，按计划时间计数
+            if event.code == EVENT_JOB_SUBMITTED:
+                for run_time in event.scheduled_run_times:
+                    self._fire_lag.observe(labels, max(0.0, (now - run_time).total_seconds()))
+                self._inflight += len(event.scheduled_run_times)
+                self._peak_queued = max(self._peak_queued, self._inflight - self.max_workers)
+            elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+                self._completion.observe(labels, max(0.0, (now - event.scheduled_run_time).total_seconds()))
+                self._inflight -= 1
+            elif event.code == EVENT_JOB_MISSED:
+                self._inflight -= 1
+
+    def snapshot(self):
+        """当前统计快照（可序列化为JSON）"""
+        from app.scheduler import scheduler
+        with self._lock:
+            # 执行器最多同时运行 max_workers 个任务，其余在队列中等待
+            inflight = max(0, self._inflight)
+            data = {
+                'holder': self.holder_id,
+                'role': scheduler.role,
+                'mode': scheduler.mode,
+                'is_leader': scheduler.is_leader,
+                'started_at': self.started_at.isoformat(),
+                'updated_at': datetime.utcnow().isoformat(),
+                'executor': {
+                    'max_workers': self.max_workers,
+                    'running': min(inflight, self.max_workers),
+                    'queued': max(0, inflight - self.max_workers),
+                    'peak_queued': self._peak_queued,
+                },
+                'jobs': [[kind, name, count] for (kind, name), count in self._counts.items()],
+                'fire_lag': self._fire_lag.to_dict(),
+                'completion': self._completion.to_dict(),
+            }
+        data['delivery'] = delivery.stats()
+        data['delivery']['latency'] = delivery.latency_histogram()
+        return data
+
+    def persist(self):
+        """把快照写入 scheduler_stats 表"""
+        from app.models import SchedulerStats
+        table = SchedulerStats.__table__
+        now = datetime.utcnow()
+        payload = json.dumps(self.snapshot(), ensure_ascii=False)
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(
+                    update(table).where(table.c.holder == self.holder_id).values(data=payload, updated_at=now)
+                )
+                if result.rowcount == 0:
+                    conn.execute(insert(table).values(holder=self.holder_id, data=payload, updated_at=now))
+                conn.execute(delete(table).where(table.c.updated_at < now - EXPIRE_AFTER))
+        except Exception as e:
+            logger.warning(f"写入调度器统计快照失败: {e}")
+
+def load_snapshots(engine, interval):
+    """读取各进程的快照，本进程记录统计时使用实时快照，返回 [(快照, 是否仍在运行)]"""
+    from app.models import SchedulerStats
+    table = SchedulerStats.__table__
+    fresh_after = datetime.utcnow() - timedelta(seconds=interval * STALE_INTERVALS)
+    with engine.connect() as conn:
+        rows = conn.execute(select(table.c.holder, table.c.data, table.c.updated_at)).all()
+
+    snapshots = {}
+    for holder, data, updated_at in rows:
+        try:
+            snapshots[holder] = (json.loads(data), updated_at >= fresh_after)
+        except ValueError:
+            logger.warning(f"无法解析调度器统计快照: {holder}")
+    if scheduler_monitor.active:
+        snapshots[scheduler_monitor.holder_id] = (scheduler_monitor.snapshot(), True)
+    return list(snapshots.values())
+
+def aggregate(snapshots):
+    """汇总各进程的快照：次数和分布为各进程最近一天内的累计值之和，执行器排队数只计仍在运行的进程"""
+    counts = defaultdict(int)
+    fire_lag = Histogram(LAG_BUCKETS)
+    completion = Histogram(LAG_BUCKETS)
+    delivery_latency = Histogram(DELIVERY_LATENCY_BUCKETS)
+    executor = {'max_workers': 0, 'running': 0, 'queued': 0, 'peak_queued': 0}
+    webhook = {'sent': 0, 'failed': 0, 'rejected': 0, 'open_circuits': 0}
+    processes = []
+
+    for data, alive in snapshots:
+        for kind, name, count in data.get('jobs', []):
+            counts[(kind, name)] += count
+        fire_lag.merge(data.get('fire_lag'))
+        completion.merge(data.get('completion'))
+        sent = data.get('delivery', {})
+        delivery_latency.merge(sent.get('latency'))
+        for key in ('sent', 'failed', 'rejected'):
+            webhook[key] += sent.get(key, 0)
+        executor['peak_queued'] = max(executor['peak_queued'], data['executor']['peak_queued'])
+        if alive:
+            webhook['open_circuits'] += sent.get('open_circuits', 0)
+            for key in ('max_workers', 'running', 'queued'):
+                executor[key] += data['executor'][key]
+        processes.append({
+            'holder': data['holder'], 'role': data['role'], 'mode': data['mode'], 'is_leader': data['is_leader'],
+            'started_at': data['started_at'], 'updated_at': data['updated_at'], 'alive': alive,
+            'running': data['executor']['running'], 'queued': data['executor']['queued']
+        })
+
+    return {
+        'processes': processes,
+        'executor': executor,
+        'counts': counts,
+        'fire_lag': fire_lag,
+        'completion': completion,
+        'webhook': webhook,
+        'webhook_latency': delivery_latency,
+    }
+
+def build_status(engine, interval, due_jobs=None):
+    """汇总后的调度器状态（JSON）"""
+    stats = aggregate(load_snapshots(engine, interval))
+    kinds = sorted({kind for kind, _ in stats['counts']} |
+                   {dict(labels)['kind'] for labels in stats['fire_lag'].label_sets()})
+    jobs = {}
+    for kind in kinds:
+        labels = (('kind', kind),)
+        jobs[kind] = {name: stats['counts'].get((kind, name), 0) for name in EVENT_NAMES.values()}
+        jobs[kind]['fire_lag'] = stats['fire_lag'].summary(labels)
+        jobs[kind]['completion'] = stats['completion'].summary(labels)
+
+    webhook = dict(stats['webhook'])
+    webhook['latency'] = stats['webhook_latency'].summary()
+    return {
+        'processes': stats['processes'],
+        'executor': stats['executor'],
+        'due_jobs': due_jobs,
+        'jobs': jobs,
+        'webhook': webhook,
+    }
+
+def collect_metrics(engine, interval, due_jobs=None):
+    """Prometheus 指标：[(指标名, 类型, 说明, 样本)]"""
+    stats = aggregate(load_snapshots(engine, interval))
+    executor = stats['executor']
+    metrics = [
+        ('drip_scheduler_jobs_total', 'counter', '定时任务按类别和事件（submitted/executed/error/missed/max_instances）统计的次数',
+         [('drip_scheduler_jobs_total', (('kind', kind), ('event', name)), count)
+          for (kind, name), count in sorted(stats['counts'].items())]),
+        ('drip_scheduler_fire_lag_seconds', 'histogram', '定时任务提交到执行器时相对计划时间的延迟（秒）',
+         list(stats['fire_lag'].samples('drip_scheduler_fire_lag_seconds'))),
+        ('drip_scheduler_completion_seconds', 'histogram', '定时任务从计划时间到执行结束的耗时（秒）',
+         list(stats['completion'].samples('drip_scheduler_completion_seconds'))),
+        ('drip_scheduler_executor_workers', 'gauge', '执行器线程数',
+         [('drip_scheduler_executor_workers', (), executor['max_workers'])]),
+        ('drip_scheduler_executor_running', 'gauge', '执行器中正在执行的任务数',
+         [('drip_scheduler_executor_running', (), executor['running'])]),
+        ('drip_scheduler_executor_queued', 'gauge', '执行器中排队等待的任务数',
+         [('drip_scheduler_executor_queued', (), executor['queued'])]),
+        ('drip_scheduler_executor_peak_queued', 'gauge', '调度进程启动以来执行器排队任务数的峰值',
+         [('drip_scheduler_executor_peak_queued', (), executor['peak_queued'])]),
+        ('drip_scheduler_processes', 'gauge', '仍在写入统计快照的调度进程数',
+         [('drip_scheduler_processes', (), sum(process['alive'] for process in stats['processes']))]),
+        ('drip_webhook_deliveries_total', 'counter', '调度进程webhook发送结果（sent/failed/rejected）',
+         [('drip_webhook_deliveries_total', (('result', key),), stats['webhook'][key])
+          for key in ('sent', 'failed', 'rejected')]),
+        ('drip_webhook_latency_seconds', 'histogram', '调度进程webhook发送往返耗时（秒）',
+         list(stats['webhook_latency'].samples('drip_webhook_latency_seconds'))),
+    ]
+    if due_jobs is not None:
+        metrics.append(('drip_scheduler_due_jobs', 'gauge', '作业存储中已到计划时间尚未执行的任务数',
+                        [('drip_scheduler_due_jobs', (), due_jobs)]))
+    return metrics
+
+# 全局调度统计实例
+scheduler_monitor = SchedulerMonitor()
@@ -0,0 +1,158 @@
+"""
+标的代码搜索模块
+列表筛选可选用可走索引的前缀范围条件；自动补全使用按用户缓存在内存中的代码/名称前缀树
+"""
+
+from flask import current_app
+from sqlalchemy import func
+from collections import OrderedDict
+from app import db
+from app.models import Target
+import threading
+import time
+
+def prefix_upper_bound(prefix):
+    """前缀范围的上界：最后一个字符加一，如 '5103' -> '5104'"""
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+def code_filter(column, term, mode=None):
+    """标的代码筛选条件
+
+    contains 模式（默认）为 LIKE '%term%' 任意位置匹配；
+    prefix 模式转换为 code >= term AND code < 上界 的范围条件，可以使用 (user_id, code) 索引。
+    """
+    mode = mode or current_app.config.get('TARGET_CODE_SEARCH', 'contains')
+    if mode != 'prefix':
+        return column.like(f'%{term}%')
+
+    # 标的代码保存时统一转为大写
+    term = term.upper()
+    upper = prefix_upper_bound(term)
+    if upper is None:
+        return column >= term
+    return (column >= term) & (column < upper)
+
+class CodeTrie:
+    """前缀树，按前缀查找标的"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, item):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(item)
+
+    def search(self, prefix, limit):
+        """返回以 prefix 开头的条目（按键排序，最多 limit 个）"""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            results.extend(node.get(None, ()))
+            # 逆序入栈，保证按字符顺序出栈
+            stack.extend(node[char] for char in sorted((c for c in node if c is not None), reverse=True))
+        return results[:limit]
+
+class TargetSearchIndex:
+    """按用户缓存的标的前缀索引
+
+    以用户标的的数量、最大ID和最近更新时间作为签名，签名变化（新增、修改、删除标的）
+    时重建该用户的前缀树。签名最多每 refresh_interval 秒核对一次；本进程内修改标的时
+    调用 invalidate() 立即失效，其他进程的修改在核对间隔内生效。
+    """
+
+    def __init__(self, app=None):
+        self.max_users = 1000
+        self.refresh_interval = 5
+        self._entries = OrderedDict()  # user_id -> (签名, 核对时间, 代码树, 名称树)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """根据应用配置初始化"""
+        self.max_users = app.config.get('TARGET_INDEX_MAX_USERS', 1000)
+        self.refresh_interval = app.config.get('TARGET_INDEX_REFRESH_INTERVAL', 5)
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, user_id):
+        """用户的标的发生变化时丢弃其前缀树"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def search(self, user_id, query, limit=10):
+        """按代码或名称前缀查找用户的启用标的，代码匹配优先"""
+        query = query.strip()
+        if not query:
+            return []
+
+        _, _, code_trie, name_trie = self._get(user_id)
+        results = code_trie.search(query.upper(), limit)
+        if len(results) < limit:
+            seen = {item['id'] for item in results}
+            for item in name_trie.search(query.casefold(), limit):
+                if item['id'] not in seen:
+                    results.append(item)
+                    seen.add(item['id'])
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def _signature(self, user_id):
+        return tuple(db.session.query(
+            func.count(Target.id),
+            func.max(Target.id),
+            func.max(Target.updated_at)
+        ).filter(Target.user_id == user_id).one())
+
+    def _get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < self.refresh_interval:
+                self._entries.move_to_end(user_id)
+                return entry
+
+        signature = self._signature(user_id)
+        if entry is not None and entry[0] == signature:
+            entry = (signature, now) + entry[2:]
+        else:
+            entry = (signature, now) + self._build(user_id)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _build(self, user_id):
+        rows = db.session.query(Target.id, Target.code, Target.name, Target.market)\
+            .filter(Target.user_id == user_id, Target.is_active == True)\
+            .order_by(Target.code)\
+            .all()
+
+        code_trie = CodeTrie()
+        name_trie = CodeTrie()
+        for target_id, code, name, market in rows:
+            item = {'id': target_id, 'code': code, 'name': name, 'market': market}
+            code_trie.insert(code.upper(), item)
+            name_trie.insert(name.casefold(), item)
+        return code_trie, name_trie
+
+# 全局标的搜索索引实例
+target_index = TargetSearchIndex()
@@ -1,5 +1,9 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash
+from flask import session, redirect, url_for, flash, request, abort, current_app
+import hmac
+
+# 未设置 METRICS_TOKEN 时允许访问运维接口的本机地址
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
 
 def login_required(f):
     """登录验证装饰器"""
@@ -10,3 +14,17 @@ def login_required(f):
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
+
+def metrics_access_required(f):
+    """运维接口访问验证：设置了 METRICS_TOKEN 时需携带 Authorization: Bearer <token>，否则只允许本机访问"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            expected = f'Bearer {token}'.encode('utf-8')
+            if not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'), expected):
+                abort(401)
+        elif request.remote_addr not in LOCAL_ADDRESSES:
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
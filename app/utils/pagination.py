@@ -0,0 +1,143 @@
+"""
+键集分页工具
+游标编码当前页首行或末行的排序键，翻页时从该位置继续查询，开销与翻到第几页无关
+"""
+
+from sqlalchemy import and_, or_
+from datetime import datetime
+import base64
+import json
+
+def encode_cursor(*values):
+    """把排序键编码为URL安全的游标字符串"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, *types):
+    """解析游标，按 types 依次还原每个排序键
+
+    cursor 为空时返回 None；格式不正确时抛出 ValueError。
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError('无效的分页游标') from e
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('无效的分页游标')
+
+    result = []
+    for value, value_type in zip(values, types):
+        # 游标来自请求参数，类型不符（如 null、嵌套列表）同样视为格式错误
+        try:
+            if value_type is datetime:
+                result.append(datetime.fromisoformat(value))
+            else:
+                result.append(value_type(value))
+        except (TypeError, ValueError) as e:
+            raise ValueError('无效的分页游标') from e
+    return tuple(result)
+
+def parse_limit(value, default=50, maximum=200):
+    """解析每页条数，限制在 [1, maximum] 之间"""
+    try:
+        limit = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+class KeysetPage:
+    """键集分页的一页结果"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None, total_is_estimate=False):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate  # 总数超过统计上限时只给出下限
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def seek_condition(columns, values, reverse=False):
+    """构造“排在游标之后”的条件：各列降序时为 (c1, c2, ...) < (v1, v2, ...)
+
+    额外加上首列的范围条件，使数据库能直接在索引上定位起点，而不是从头逐行过滤。
+    """
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        compare = column > value if reverse else column < value
+        conditions.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], compare))
+    first, first_value = columns[0], values[0]
+    return and_(first >= first_value if reverse else first <= first_value, or_(*conditions))
+
+def keyset_query(query, order_by, after_key=None, before_key=None, per_page=20):
+    """一页的查询：排在 after_key 之后（或 before_key 之前，升序取出）的 per_page + 1 条
+
+    多取的一条用于判断是否还有下一页（或上一页）。查询计划检查也用它构造与页面相同的语句。
+    """
+    if before_key:
+        return query.filter(seek_condition(order_by, before_key, reverse=True))\
+            .order_by(*[column.asc() for column in order_by])\
+            .limit(per_page + 1)
+    if after_key:
+        query = query.filter(seek_condition(order_by, after_key))
+    return query.order_by(*[column.desc() for column in order_by])\
+        .limit(per_page + 1)
+
+def keyset_paginate(query, order_by, after=None, before=None, per_page=20, count_limit=0):
+    """对查询按 order_by 各列降序做键集分页
+
+    order_by 的最后一列必须唯一（通常为主键）；after/before 为上一次返回的游标，
+    分别表示取其后一页和前一页。count_limit 大于0时统计总数，最多数到该上限。
+    排序列不能为 NULL（已有数据由迁移补齐），否则这些行在第一页之后无法翻到。
+    游标无效时抛出 ValueError，与交易明细接口一样由调用方返回 400。
+    """
+    types = [column.type.python_type for column in order_by]
+    after_key = decode_cursor(after, *types)
+    before_key = None if after_key else decode_cursor(before, *types)
+
+    total = None
+    total_is_estimate = False
+    if count_limit:
+        total = query.order_by(None).limit(count_limit + 1).count()
+        if total > count_limit:
+            total = count_limit
+            total_is_estimate = True
+
+    rows = keyset_query(query, order_by, after_key, before_key, per_page).all()
+    if before_key:
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    def key_of(item):
+        return encode_cursor(*[getattr(item, column.key) for column in order_by])
+
+    return KeysetPage(
+        items,
+        next_cursor=key_of(items[-1]) if items and has_next else None,
+        prev_cursor=key_of(items[0]) if items and has_prev else None,
+        total=total,
+        total_is_estimate=total_is_estimate
+    )
@@ -0,0 +1,116 @@
+"""
+成本/收益分析汇总基准测试
+
+对比单个用户在大量定投记录下：
+  - 旧实现：加载全部 InvestmentRecord ORM 对象、逐条懒加载标的并调用 to_dict()，在Python中累加
+  - aggregate_records：一次关联分组查询
+  - aggregate_positions：读取增量维护的持仓汇总表，与记录数无关
+
+用法：
+    python benchmarks/bench_analysis_aggregation.py [--records 1000000] [--targets 50] [--legacy-records 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, InvestmentRecord  # noqa: E402
+from app.analytics import aggregate_positions, aggregate_records  # noqa: E402
+from app.positions import rebuild_positions  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+
+def seed(user_id, targets, records):
+    """为一个用户批量写入标的和定投记录"""
+    now = datetime.now()
+    start = now - timedelta(days=3650)
+    rng = random.Random(42)
+    with db.engine.begin() as conn:
+        conn.execute(InvestmentRecord.__table__.delete().where(InvestmentRecord.user_id == user_id))
+        conn.execute(Target.__table__.delete().where(Target.user_id == user_id))
+        conn.execute(Target.__table__.insert(), [
+            {'id': user_id * 100000 + i, 'user_id': user_id, 'code': f'{510000 + i}', 'name': f'ETF{i}',
+             'current_price': 1 + rng.random() * 5, 'price_date': now, 'is_active': True}
+            for i in range(targets)
+        ])
+        batch = 100000
+        for offset in range(0, records, batch):
+            conn.execute(InvestmentRecord.__table__.insert(), [
+                {'user_id': user_id, 'target_id': user_id * 100000 + (i % targets),
+                 'buy_date': start + timedelta(minutes=i), 'amount': 1000,
+                 'quantity': 200 + rng.random() * 100, 'price': 4, 'fee': 1, 'created_at': now}
+                for i in range(offset, min(records, offset + batch))
+            ])
+
+
+def legacy_aggregate(user_id):
+    """旧实现的汇总逻辑"""
+    records = InvestmentRecord.query.filter_by(user_id=user_id).all()
+    groups = {}
+    for record in records:
+        code = record.target.code if record.target else 'Unknown'
+        group = groups.setdefault(code, {'records': [], 'total_amount': 0, 'total_quantity': 0,
+                                         'total_fee': 0, 'trade_count': 0})
+        group['records'].append(record.to_dict())
+        group['total_amount'] += float(record.amount)
+        group['total_quantity'] += float(record.quantity)
+        group['total_fee'] += float(record.fee)
+        group['trade_count'] += 1
+    return groups
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--targets', type=int, default=50)
+    parser.add_argument('--legacy-records', type=int, default=100000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {'id': 1, 'username': 'big', 'email': 'big@example.com', 'password_hash': 'x'},
+                {'id': 2, 'username': 'legacy', 'email': 'legacy@example.com', 'password_hash': 'x'}
+            ])
+
+        seed(2, args.targets, args.legacy_records)
+        legacy_time, _ = timed(legacy_aggregate, 2)
+        db.session.expunge_all()
+        new_small, _ = timed(aggregate_records, 2)
+
+        seed(1, args.targets, args.records)
+        new_time, positions = timed(aggregate_records, 1)
+        rebuild_time, _ = timed(rebuild_positions, 1)
+        table_time, _ = timed(aggregate_positions, 1)
+
+        print(f"legacy python aggregation  {args.legacy_records:>9} records: {legacy_time:8.3f}s "
+              f"(~{legacy_time * args.records / args.legacy_records:.1f}s extrapolated to {args.records})")
+        print(f"SQL GROUP BY aggregation   {args.legacy_records:>9} records: {new_small:8.3f}s")
+        print(f"SQL GROUP BY aggregation   {args.records:>9} records: {new_time:8.3f}s "
+              f"({len(positions)} targets, {sum(p['trade_count'] for p in positions)} trades)")
+        print(f"positions table read       {args.records:>9} records: {table_time:8.3f}s "
+              f"(one-off rebuild {rebuild_time:.3f}s)")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
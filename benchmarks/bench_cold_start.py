@@ -0,0 +1,132 @@
+"""
+冷启动基准测试
+
+在新的 Python 进程中依次测量：
+  - 解释器启动
+  - 导入应用包（Flask、SQLAlchemy 和配置）
+  - create_app() 创建应用（注册蓝图、初始化各组件）
+  - 第一个请求（登录页）
+分别以启动时初始化（all 角色，建表、迁移、同步提醒）和轻量启动（web 角色，
+初始化交给 flask init-db / flask sync-reminders）运行，报告各阶段耗时的中位数，
+并与冷启动预算比较，超出预算时返回非零状态。
+
+用法：
+    python benchmarks/bench_cold_start.py [--reminders 2000] [--repeat 5] [--budget-import-ms 600] [--budget-ready-ms 1000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODES = {
+    'startup-init': {'PROCESS_ROLE': 'all', 'STARTUP_INIT': 'True'},
+    'lightweight': {'PROCESS_ROLE': 'web', 'STARTUP_INIT': 'False'},
+}
+
+# 子进程中执行：各阶段耗时以毫秒输出为一行 JSON
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/auth/login')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({{
+    'import': (imported - started) * 1000,
+    'create_app': (created - imported) * 1000,
+    'first_request': (served - created) * 1000,
+}}))
+'''
+
+
+def seed(env, reminders):
+    """建表并写入 reminders 个定投提醒（每个标的一个提醒）"""
+    script = f'''
+import sys
+sys.path.insert(0, {ROOT!r})
+from datetime import datetime
+from app import create_app, db
+from app.models import User, Target, InvestmentReminder
+app = create_app()
+now = datetime.now()
+with app.app_context(), db.engine.begin() as conn:
+    conn.execute(User.__table__.insert(), [{{'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x'}}])
+    conn.execute(Target.__table__.insert(), [
+        {{'id': i, 'user_id': 1, 'code': f'{{510000 + i}}', 'name': f'标的{{i}}', 'current_price': 1,
+          'price_date': now, 'is_active': True, 'created_at': now, 'updated_at': now}}
+        for i in range(1, {reminders} + 1)
+    ])
+    conn.execute(InvestmentReminder.__table__.insert(), [
+        {{'user_id': 1, 'target_id': i, 'amount': 1000, 'frequency_type': 'monthly', 'frequency_value': i % 28 + 1,
+          'reminder_time': '09:00', 'is_active': True, 'created_at': now, 'updated_at': now}}
+        for i in range(1, {reminders} + 1)
+    ])
+'''
+    subprocess.run([sys.executable, '-c', script], env=dict(env, **MODES['startup-init']), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure(env, mode):
+    """启动一个新进程，返回各阶段耗时（毫秒）"""
+    begin = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT)], env=dict(env, **MODES[mode]),
+                            check=True, capture_output=True, text=True)
+    total = (time.perf_counter() - begin) * 1000
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    phases['interpreter'] = total - sum(phases.values())
+    phases['total'] = total
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reminders', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-import-ms', type=float, default=600, help='导入应用包的预算')
+    parser.add_argument('--budget-ready-ms', type=float, default=1000, help='进程启动到第一个请求完成的预算（轻量启动）')
+    args = parser.parse_args()
+
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='drip_bench_'), 'bench.db')}",
+               SCHEDULER_LEADER_ELECTION='False', LOG_LEVEL='WARNING')
+    seed(env, args.reminders)
+
+    print(f"{args.reminders} reminders, median of {args.repeat} cold starts "
+          f"({datetime.now():%Y-%m-%d %H:%M})")
+    phases = ('interpreter', 'import', 'create_app', 'first_request', 'total')
+    print(f"{'mode':14s}" + ''.join(f"{name:>15s}" for name in phases))
+    medians = {}
+    for mode in MODES:
+        # 预热一次：写入 .pyc 缓存、同步提醒，使每次测量的磁盘状态相同
+        measure(env, mode)
+        runs = [measure(env, mode) for _ in range(args.repeat)]
+        medians[mode] = {name: statistics.median(run[name] for run in runs) for name in phases}
+        print(f"{mode:14s}" + ''.join(f"{medians[mode][name]:13.1f}ms" for name in phases))
+
+    lightweight = medians['lightweight']
+    checks = [
+        ('import', lightweight['import'], args.budget_import_ms),
+        ('ready (total)', lightweight['total'], args.budget_ready_ms),
+    ]
+    over = False
+    for name, value, budget in checks:
+        status = 'OK' if value <= budget else 'OVER'
+        over = over or value > budget
+        print(f"budget {name:14s} {value:8.1f}ms / {budget:.0f}ms  {status}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+定投提醒任务单次执行开销基准测试
+
+对比两种执行方式：
+  - 旧方式：每次任务触发都调用 create_app() 重建应用
+  - 新方式：复用进程内的应用实例（get_job_app）
+
+用法：
+    python benchmarks/bench_job_overhead.py [--runs N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, InvestmentReminder  # noqa: E402
+from app.scheduler import scheduler, send_reminder_notification  # noqa: E402
+
+
+def seed():
+    """写入一条提醒（用户未配置webhook，任务只走数据库路径，不发网络请求）"""
+    user = User(username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.flush()
+    target = Target(user_id=user.id, code='510300', name='沪深300ETF',
+                    current_price=4.0, price_date=datetime.now())
+    db.session.add(target)
+    db.session.flush()
+    reminder = InvestmentReminder(user_id=user.id, target_id=target.id, amount=1000,
+                                  frequency_type='monthly', frequency_value=1,
+                                  reminder_time='09:00')
+    db.session.add(reminder)
+    db.session.commit()
+    return reminder.id
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], sum(samples) / len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        reminder_id = seed()
+
+    def legacy():
+        # 模拟旧实现：每次触发都完整重建应用
+        legacy_app = create_app()
+        with legacy_app.app_context():
+            InvestmentReminder.query.get(reminder_id)
+        scheduler.shutdown()
+        scheduler.init_app(app)
+
+    def reuse():
+        send_reminder_notification(reminder_id)
+
+    legacy_median, legacy_mean = timed(legacy, args.runs)
+    reuse_median, reuse_mean = timed(reuse, args.runs)
+
+    print(f"runs={args.runs}")
+    print(f"create_app per job : median {legacy_median * 1000:8.2f} ms  mean {legacy_mean * 1000:8.2f} ms")
+    print(f"shared app handle  : median {reuse_median * 1000:8.2f} ms  mean {reuse_mean * 1000:8.2f} ms")
+    print(f"speedup            : {legacy_median / reuse_median:.1f}x")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
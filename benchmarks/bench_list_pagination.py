@@ -0,0 +1,97 @@
+"""
+列表分页基准测试
+
+对比单个用户大量定投记录时，定投记录列表翻到不同深度的耗时：
+  - OFFSET 分页：.paginate() 每页一次完整 COUNT 加 OFFSET 扫描，越往后越慢
+  - 键集分页：keyset_paginate() 从上一页末行的 (buy_date, id) 继续查询，总数最多数到上限
+
+用法：
+    python benchmarks/bench_list_pagination.py [--records 500000] [--per-page 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, InvestmentRecord  # noqa: E402
+from app.utils.pagination import keyset_paginate, encode_cursor  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+
+def seed(records):
+    """写入一个用户、10个标的和指定数量的定投记录"""
+    now = datetime.now()
+    start = now - timedelta(days=3650)
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': 1, 'username': 'big', 'email': 'big@example.com', 'password_hash': 'x'}
+        ])
+        conn.execute(Target.__table__.insert(), [
+            {'id': i + 1, 'user_id': 1, 'code': f'{510000 + i}', 'name': f'ETF{i}',
+             'current_price': 4, 'price_date': now, 'is_active': True}
+            for i in range(10)
+        ])
+        batch = 100000
+        for offset in range(0, records, batch):
+            conn.execute(InvestmentRecord.__table__.insert(), [
+                {'id': i + 1, 'user_id': 1, 'target_id': i % 10 + 1, 'buy_date': start + timedelta(minutes=i),
+                 'amount': 1000, 'quantity': 250, 'price': 4, 'fee': 1, 'created_at': now}
+                for i in range(offset, min(records, offset + batch))
+            ])
+
+
+def list_query():
+    return InvestmentRecord.query.filter_by(user_id=1).join(Target)
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+        db.session.expunge_all()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=500000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--count-limit', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        seed(args.records)
+        start = datetime.now() - timedelta(days=3650)
+
+        print(f"{'depth':>8} {'offset paginate':>16} {'keyset':>10}")
+        pages = args.records // args.per_page
+        for page in (1, 10, pages // 10, pages // 2, pages - 1):
+            # 键集分页的游标取该页前一页末行的排序键（记录按分钟递增写入，可直接算出）
+            last = args.records - (page - 1) * args.per_page
+            cursor = encode_cursor(start + timedelta(minutes=last), last + 1) if page > 1 else None
+
+            offset_time = timed(lambda: list_query().order_by(InvestmentRecord.buy_date.desc()).paginate(
+                page=page, per_page=args.per_page, error_out=False
+            ))
+            keyset_time = timed(lambda: keyset_paginate(
+                list_query(), [InvestmentRecord.buy_date, InvestmentRecord.id],
+                after=cursor, per_page=args.per_page, count_limit=args.count_limit
+            ))
+            print(f"{page:>8} {offset_time * 1000:>14.1f}ms {keyset_time * 1000:>8.1f}ms")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+列式历史价格存储基准测试
+
+对比读取多个品种多年每日价格的耗时和内存：
+  - 数据库：通过 SQLAlchemy 逐行读取 price_history 再转换为 NumPy 数组
+  - 列式存储：内存映射 {品种ID}.days / {品种ID}.close 文件，直接得到 NumPy 视图
+
+用法：
+    python benchmarks/bench_price_store.py [--instruments 200] [--years 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ['PRICE_STORE_DIR'] = os.path.join(_tmpdir, 'prices')
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+
+from app import create_app, db  # noqa: E402
+from app.models import Instrument, PriceHistory  # noqa: E402
+from app.portfolio import load_price_history  # noqa: E402
+from app.price_store import price_store  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+
+def seed(instruments, years):
+    """每个品种每天一条价格"""
+    start = date(2000, 1, 3)
+    days = years * 365
+    with db.engine.begin() as conn:
+        conn.execute(Instrument.__table__.insert(), [
+            {'id': i, 'market': '', 'code': f'{500000 + i}', 'name': f'品种{i}'}
+            for i in range(1, instruments + 1)
+        ])
+        for i in range(1, instruments + 1):
+            conn.execute(PriceHistory.__table__.insert(), [
+                {'instrument_id': i, 'date': start + timedelta(days=d), 'close': 1 + (d * i % 997) / 100}
+                for d in range(days)
+            ])
+    return days
+
+
+def measure(fn):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - begin) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--instruments', type=int, default=200)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        days = seed(args.instruments, args.years)
+        ids = set(range(1, args.instruments + 1))
+
+        begin = time.perf_counter()
+        price_store.sync_from_db()
+        sync_time = time.perf_counter() - begin
+
+        directory = price_store.directory
+        price_store.directory = None
+        db_result, db_time, db_peak = measure(lambda: load_price_history(ids))
+        price_store.directory = directory
+        price_store.read(1)  # 预热
+        store_result, store_time, store_peak = measure(lambda: load_price_history(ids))
+        _, view_time, view_peak = measure(lambda: [price_store.read(i) for i in ids])
+
+        assert (db_result[2] == store_result[2]).all()
+        print(f"{args.instruments} instruments x {days} days = {len(db_result[0])} prices (sync {sync_time:.1f}s)")
+        print(f"database rows           {db_time:8.1f}ms  peak {db_peak:7.1f}MB")
+        print(f"price store (copied)    {store_time:8.1f}ms  peak {store_peak:7.1f}MB")
+        print(f"price store (views)     {view_time:8.1f}ms  peak {view_peak:7.1f}MB")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+请求性能指标开销基准测试
+
+同一份数据分别在关闭和开启请求指标（METRICS_ENABLED）时请求主要页面，
+对比每个页面的平均耗时，并输出开启后 /metrics 统计到的每个请求的SQL语句数和SQL耗时，
+用于确认指标采集本身的开销，以及各页面是否存在随数据量增长的逐条查询。
+
+用法：
+    python benchmarks/bench_request_metrics.py [--targets 50] [--records 5000] [--requests 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+os.environ['ANALYSIS_CACHE'] = 'False'
+os.environ['METRICS_QUERY_BUDGET'] = '0'
+
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, InvestmentRecord  # noqa: E402
+from app.metrics import request_metrics  # noqa: E402
+from app.positions import rebuild_positions  # noqa: E402
+
+PAGES = ['/reminder/', '/record/', '/target/', '/analysis/cost', '/analysis/profit']
+
+
+def seed(targets, records):
+    now = datetime.now()
+    start = now - timedelta(days=3650)
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x'}
+        ])
+        conn.execute(Target.__table__.insert(), [
+            {'id': i + 1, 'user_id': 1, 'code': f'{510000 + i}', 'name': f'ETF{i}',
+             'current_price': 4, 'price_date': now, 'is_active': True, 'created_at': now, 'updated_at': now}
+            for i in range(targets)
+        ])
+        conn.execute(InvestmentRecord.__table__.insert(), [
+            {'user_id': 1, 'target_id': i % targets + 1, 'buy_date': start + timedelta(hours=i),
+             'amount': 1000, 'quantity': 250, 'price': 4, 'fee': 1, 'created_at': now, 'updated_at': now}
+            for i in range(records)
+        ])
+    rebuild_positions()
+
+
+def build_app(metrics_enabled):
+    Config.METRICS_ENABLED = metrics_enabled
+    app = create_app()
+    # 页面模板中的导航链接指向 main.py 注册的仪表板
+    app.add_url_rule('/dashboard', 'dashboard', lambda: '')
+    return app
+
+
+def run_pages(app, requests):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    timings = {}
+    for page in PAGES:
+        assert client.get(page).status_code == 200, page
+        begin = time.perf_counter()
+        for _ in range(requests):
+            client.get(page)
+        timings[page] = (time.perf_counter() - begin) * 1000 / requests
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--targets', type=int, default=50)
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    app = build_app(False)
+    with app.app_context():
+        seed(args.targets, args.records)
+    disabled = run_pages(app, args.requests)
+
+    app = build_app(True)
+    enabled = run_pages(app, args.requests)
+
+    # 从 Prometheus 文本中取出每个页面的平均SQL语句数和SQL耗时
+    text = request_metrics.render()
+    summary = {}
+    for name in ('sql_queries', 'sql_seconds'):
+        for kind in ('sum', 'count'):
+            for endpoint, value in re.findall(rf'drip_http_request_{name}_{kind}{{endpoint="([^"]+)"}} (\S+)', text):
+                summary.setdefault(endpoint, {})[f'{name}_{kind}'] = float(value)
+
+    print(f"{args.targets} targets, {args.records} records, {args.requests} requests per page")
+    print(f"{'page':18s}{'metrics off':>14s}{'metrics on':>14s}{'overhead':>10s}{'sql/req':>10s}{'sql ms/req':>12s}")
+    with app.test_request_context():
+        endpoints = {page: app.url_map.bind('localhost').match(page)[0] for page in PAGES}
+    for page in PAGES:
+        stats = summary.get(endpoints[page], {})
+        count = stats.get('sql_queries_count') or 1
+        print(f"{page:18s}{disabled[page]:12.2f}ms{enabled[page]:12.2f}ms"
+              f"{(enabled[page] / disabled[page] - 1) * 100:9.1f}%"
+              f"{stats.get('sql_queries_sum', 0) / count:10.1f}{stats.get('sql_seconds_sum', 0) * 1000 / count:12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+调度器执行器容量基准测试
+
+模拟高峰时段大量提醒在同一时刻到期：每个任务等待 --latency 秒（模拟一次webhook往返），
+分别以不同的执行器线程数（SCHEDULER_MAX_WORKERS）运行，利用调度器运行统计
+（app/scheduler_stats.py）报告触发延迟、从计划时间到完成的耗时分位数、排队峰值和全部完成所需时间，
+用于确定执行器线程数。
+
+用法：
+    python benchmarks/bench_scheduler_backlog.py [--jobs 200] [--latency 0.2] [--workers 5,20,50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ['SCHEDULER_LEADER_ELECTION'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import logging  # noqa: E402
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+from config import Config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+from app.scheduler_stats import scheduler_monitor, aggregate  # noqa: E402
+
+LATENCY = 0.2
+
+
+def simulated_send():
+    """模拟一次webhook发送"""
+    time.sleep(LATENCY)
+
+
+def run(workers, args):
+    Config.SCHEDULER_MAX_WORKERS = workers
+    create_app()
+    apscheduler = scheduler.scheduler
+    run_date = datetime.now(apscheduler.timezone) + timedelta(seconds=1)
+    for i in range(args.jobs):
+        apscheduler.add_job(simulated_send, 'date', run_date=run_date, id=f'reminder_bench_{i}',
+                            misfire_grace_time=None)
+
+    # 等待全部任务执行完成
+    deadline = time.time() + 1 + args.jobs * LATENCY + 30
+    while time.time() < deadline:
+        stats = aggregate([(scheduler_monitor.snapshot(), True)])
+        if stats['counts'].get(('reminder', 'executed'), 0) >= args.jobs:
+            break
+        time.sleep(0.05)
+    scheduler.shutdown()
+
+    labels = (('kind', 'reminder'),)
+    fire_lag = stats['fire_lag'].summary(labels)
+    completion = stats['completion'].summary(labels)
+    drained = (datetime.now(apscheduler.timezone) - run_date).total_seconds()
+    print(f"{workers:8d}{fire_lag['p95']:>12}{completion['p50']:>12}{completion['p95']:>12}"
+          f"{completion['avg']:12.2f}{stats['executor']['peak_queued']:12d}{drained:12.2f}")
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2, help='每个任务的模拟发送耗时（秒）')
+    parser.add_argument('--workers', default='5,20,50', help='逗号分隔的执行器线程数')
+    args = parser.parse_args()
+    LATENCY = args.latency
+
+    print(f"{args.jobs} jobs due at the same time, {args.latency}s per job")
+    print(f"{'workers':>8s}{'lag p95':>12s}{'done p50':>12s}{'done p95':>12s}{'done avg':>12s}"
+          f"{'peak queue':>12s}{'drain s':>12s}")
+    for workers in (int(value) for value in args.workers.split(',')):
+        run(workers, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+SQLite 并发读写基准测试
+
+模拟 Web 请求与调度器同时访问同一个数据库文件：
+  - 写线程：在一个事务中先读后写（新增定投记录并更新持仓汇总），与页面写入相同
+  - 读线程：按用户分页读取定投记录，与列表页面相同
+  - 轮询线程：每隔一段时间查询作业存储的下次运行时间，与调度器相同
+
+分别使用旧配置（回滚日志模式，作业存储单独建引擎）和当前配置（WAL、忙等待超时、共用引擎）
+运行相同时长，对比吞吐、延迟分位数和 "database is locked" 错误数。
+
+用法：
+    python benchmarks/bench_sqlite_concurrency.py [--writers 4] [--readers 8] [--seconds 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.engine import create_profiled_engine  # noqa: E402
+
+PROFILES = {
+    # 改动前：默认回滚日志，sqlite3 驱动默认等待 5 秒，调度器作业存储另建一个引擎
+    'legacy': ({'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'}, False),
+    'wal': ({'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL', 'SQLITE_BUSY_TIMEOUT': 5000,
+             'SQLITE_MMAP_SIZE': 268435456, 'SQLITE_CACHE_SIZE': -65536}, True),
+}
+
+SCHEMA = [
+    "CREATE TABLE records (id INTEGER PRIMARY KEY, user_id INTEGER, buy_date DATETIME, amount FLOAT)",
+    "CREATE INDEX ix_records_user_date ON records (user_id, buy_date)",
+    "CREATE TABLE positions (user_id INTEGER PRIMARY KEY, total FLOAT, trades INTEGER)",
+    "CREATE TABLE jobs (id VARCHAR(50) PRIMARY KEY, next_run_time FLOAT)",
+    "CREATE INDEX ix_jobs_next ON jobs (next_run_time)",
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def run(profile, args):
+    config, shared = PROFILES[profile]
+    config = dict(config, DB_POOL_SIZE=args.writers + args.readers + 2, DB_MAX_OVERFLOW=0)
+    path = os.path.join(tempfile.mkdtemp(prefix='drip_bench_'), 'bench.db')
+    url = f'sqlite:///{path}'
+
+    engine = create_profiled_engine(url, config)
+    jobstore_engine = engine if shared else create_profiled_engine(url, config)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO positions VALUES (:u, 0, 0)"), [{'u': u} for u in range(args.users)])
+        conn.execute(text("INSERT INTO jobs VALUES (:id, :t)"),
+                     [{'id': f'reminder_{i}', 't': time.time() + i} for i in range(1000)])
+        conn.execute(text("INSERT INTO records (user_id, buy_date, amount) VALUES (:u, :d, 100)"),
+                     [{'u': i % args.users, 'd': datetime.now()} for i in range(args.users * 50)])
+
+    stop = threading.Event()
+    stats = {kind: {'latencies': [], 'errors': 0} for kind in ('write', 'read', 'poll')}
+    lock = threading.Lock()
+
+    def record(kind, started, error=False):
+        with lock:
+            if error:
+                stats[kind]['errors'] += 1
+            else:
+                stats[kind]['latencies'].append(time.perf_counter() - started)
+
+    def writer(worker):
+        i = 0
+        while not stop.is_set():
+            user_id = (worker * 7919 + i) % args.users
+            i += 1
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    # 先读后写：回滚日志模式下共享锁升级为写锁时容易立即返回 locked
+                    conn.execute(text("SELECT total FROM positions WHERE user_id = :u"), {'u': user_id}).scalar()
+                    conn.execute(text("INSERT INTO records (user_id, buy_date, amount) VALUES (:u, :d, 100)"),
+                                 {'u': user_id, 'd': datetime.now()})
+                    conn.execute(text("UPDATE positions SET total = total + 100, trades = trades + 1 WHERE user_id = :u"),
+                                 {'u': user_id})
+                record('write', started)
+            except OperationalError:
+                record('write', started, error=True)
+
+    def reader(worker):
+        i = 0
+        while not stop.is_set():
+            user_id = (worker * 104729 + i) % args.users
+            i += 1
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT id, buy_date, amount FROM records WHERE user_id = :u "
+                                      "ORDER BY buy_date DESC LIMIT 20"), {'u': user_id}).all()
+                    conn.execute(text("SELECT total, trades FROM positions WHERE user_id = :u"), {'u': user_id}).all()
+                record('read', started)
+            except OperationalError:
+                record('read', started, error=True)
+
+    def poller():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with jobstore_engine.connect() as conn:
+                    conn.execute(text("SELECT id FROM jobs WHERE next_run_time <= :t ORDER BY next_run_time"),
+                                 {'t': time.time()}).all()
+                    conn.execute(text("SELECT min(next_run_time) FROM jobs")).scalar()
+                record('poll', started)
+            except OperationalError:
+                record('poll', started, error=True)
+            stop.wait(args.poll_interval)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(r,)) for r in range(args.readers)]
+    threads.append(threading.Thread(target=poller))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    if jobstore_engine is not engine:
+        jobstore_engine.dispose()
+
+    print(f"[{profile}]")
+    for kind, data in stats.items():
+        latencies = data['latencies']
+        print(f"  {kind:6s} {len(latencies) / args.seconds:9.1f} ops/s  "
+              f"p50 {percentile(latencies, 0.5):7.2f}ms  p99 {percentile(latencies, 0.99):8.2f}ms  "
+              f"locked errors {data['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--profile', choices=['all'] + list(PROFILES), default='all')
+    args = parser.parse_args()
+
+    for profile in PROFILES if args.profile == 'all' else [args.profile]:
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+定投提醒启动同步基准测试
+
+在不同提醒规模下测量 sync_all_reminders 的耗时：
+  - cold：作业存储为空，全部新增
+  - warm：无任何变化（重启场景），只读对比
+  - incremental：1% 的提醒被修改或停用
+
+另外以少量提醒测量旧实现（逐条 add_reminder_job）的单条耗时，用于估算。
+
+用法：
+    python benchmarks/bench_sync_reminders.py [--sizes 10000,100000,1000000] [--legacy-sample 1000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, InvestmentReminder  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+logging.getLogger('app.scheduler').setLevel(logging.WARNING)
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+USERS = 1000
+
+
+def reset():
+    """清空提醒和作业存储"""
+    with db.engine.begin() as conn:
+        conn.execute(InvestmentReminder.__table__.delete())
+        conn.execute(Target.__table__.delete())
+        conn.execute(User.__table__.delete())
+        conn.execute(scheduler.jobstore.jobs_t.delete())
+
+
+def seed(size):
+    """批量写入 size 条提醒，均匀分布在 USERS 个用户上"""
+    now = datetime.now()
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'username': f'u{i}', 'email': f'u{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(Target.__table__.insert(), [
+            {'id': i, 'user_id': i % USERS + 1, 'code': f'{i:06d}', 'name': f'T{i}',
+             'current_price': 1, 'price_date': now, 'is_active': True}
+            for i in range(1, size + 1)
+        ])
+        conn.execute(InvestmentReminder.__table__.insert(), [
+            {'id': i, 'user_id': i % USERS + 1, 'target_id': i, 'amount': 1000,
+             'frequency_type': 'monthly' if i % 2 else 'weekly',
+             'frequency_value': i % 28 + 1 if i % 2 else i % 7 + 1,
+             'reminder_time': f'{9 + i % 3:02d}:{i % 60:02d}', 'is_active': True}
+            for i in range(1, size + 1)
+        ])
+
+
+def mutate(size):
+    """修改1%的提醒时间，并停用另外1%的提醒"""
+    step = 100
+    with db.engine.begin() as conn:
+        table = InvestmentReminder.__table__
+        conn.execute(table.update().where(table.c.id % step == 0).values(reminder_time='20:30'))
+        conn.execute(table.update().where(table.c.id % step == 1).values(is_active=False))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--legacy-sample', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.legacy_sample:
+            reset()
+            seed(args.legacy_sample)
+            reminders = InvestmentReminder.query.all()
+            elapsed = timed(lambda: [scheduler.add_reminder_job(r) for r in reminders])
+            per_job = elapsed / len(reminders)
+            print(f"legacy add_reminder_job: {per_job * 1000:.2f} ms/reminder")
+
+        print(f"{'size':>10} {'cold':>10} {'warm':>10} {'incremental':>12} {'legacy est.':>12}")
+        for size in [int(x) for x in args.sizes.split(',')]:
+            reset()
+            seed(size)
+            cold = timed(scheduler.sync_all_reminders)
+            warm = timed(scheduler.sync_all_reminders)
+            mutate(size)
+            incremental = timed(scheduler.sync_all_reminders)
+            legacy = f"{per_job * size:10.1f}s" if args.legacy_sample else '-'
+            print(f"{size:>10} {cold:9.2f}s {warm:9.2f}s {incremental:11.2f}s {legacy:>12}")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
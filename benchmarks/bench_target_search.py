@@ -0,0 +1,85 @@
+"""
+标的代码搜索基准测试
+
+对比大量标的时按代码筛选的耗时：
+  - LIKE '%code%'：前导通配符无法使用索引，逐行扫描
+  - 前缀范围条件：code >= p AND code < 上界，使用 (user_id, code) 索引
+  - 自动补全前缀树：签名未变化时直接在内存中查找
+
+用法：
+    python benchmarks/bench_target_search.py [--users 50] [--targets 5000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target  # noqa: E402
+from app.search import code_filter, target_index  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+
+def seed(users, targets):
+    """每个用户写入 targets 个标的"""
+    now = datetime.now()
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': u, 'username': f'u{u}', 'email': f'u{u}@example.com', 'password_hash': 'x'}
+            for u in range(1, users + 1)
+        ])
+        for u in range(1, users + 1):
+            conn.execute(Target.__table__.insert(), [
+                {'user_id': u, 'code': f'{100000 + i * 7:06d}', 'name': f'标的{i}', 'current_price': 1,
+                 'price_date': now, 'is_active': True, 'created_at': now, 'updated_at': now}
+                for i in range(targets)
+            ])
+
+
+def timed(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--targets', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        seed(args.users, args.targets)
+        user_id = args.users // 2
+        term = '1234'
+
+        def search(mode):
+            return db.session.query(Target.id)\
+                .filter(Target.user_id == user_id, code_filter(Target.code, term, mode=mode))\
+                .limit(20).all()
+
+        like_time = timed(lambda: search('contains'))
+        prefix_time = timed(lambda: search('prefix'))
+        target_index.search(user_id, term, 10)
+        trie_time = timed(lambda: target_index.search(user_id, term, 10))
+
+        print(f"LIKE '%{term}%'         {like_time:8.3f}ms")
+        print(f"prefix range            {prefix_time:8.3f}ms")
+        print(f"autocomplete trie       {trie_time:8.3f}ms (signature re-checked every TARGET_INDEX_REFRESH_INTERVAL seconds)")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+组合市值曲线基准测试
+
+构造一个用户多年的每周定投记录和每个标的的每日历史价格，
+测量 build_value_curve 读取历史价格并用 NumPy 逐日计算市值和成本曲线的耗时。
+
+用法：
+    python benchmarks/bench_value_curve.py [--targets 20] [--years 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_tmpdir = tempfile.mkdtemp(prefix='drip_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault('SCHEDULER_LEADER_ELECTION', 'False')
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Target, Instrument, InvestmentRecord, PriceHistory  # noqa: E402
+from app.portfolio import build_value_curve  # noqa: E402
+from app.scheduler import scheduler  # noqa: E402
+
+
+def seed(targets, years):
+    """每个标的每天一条历史价格，每周一笔定投"""
+    start = datetime(2000, 1, 3)
+    days = years * 365
+    now = datetime.now()
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x'}
+        ])
+        conn.execute(Instrument.__table__.insert(), [
+            {'id': t, 'market': '', 'code': f'{510000 + t}', 'name': f'标的{t}'}
+            for t in range(1, targets + 1)
+        ])
+        conn.execute(Target.__table__.insert(), [
+            {'id': t, 'user_id': 1, 'instrument_id': t, 'code': f'{510000 + t}', 'name': f'标的{t}',
+             'current_price': 1, 'price_date': start, 'is_active': True, 'created_at': now, 'updated_at': now}
+            for t in range(1, targets + 1)
+        ])
+        for t in range(1, targets + 1):
+            conn.execute(PriceHistory.__table__.insert(), [
+                {'instrument_id': t, 'date': (start + timedelta(days=d)).date(), 'close': 1 + (d % 400) / 100}
+                for d in range(days)
+            ])
+            conn.execute(InvestmentRecord.__table__.insert(), [
+                {'user_id': 1, 'target_id': t, 'buy_date': start + timedelta(days=d), 'amount': 1000,
+                 'quantity': 500, 'price': 2, 'fee': 1, 'created_at': now, 'updated_at': now}
+                for d in range(0, days, 7)
+            ])
+    return start, days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--targets', type=int, default=20)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        start, days = seed(args.targets, args.years)
+        end = (start + timedelta(days=days - 1)).date()
+
+        timings = []
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            curve = build_value_curve(1, end=end)
+            timings.append((time.perf_counter() - begin) * 1000)
+            db.session.rollback()
+
+        print(f"{args.targets} targets x {days} days of prices, {args.targets * len(range(0, days, 7))} records")
+        print(f"curve points            {len(curve['dates'])}")
+        print(f"build_value_curve       best {min(timings):8.1f}ms  avg {sum(timings) / len(timings):8.1f}ms")
+
+    scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Webhook发送吞吐基准测试
+
+启动本地模拟webhook服务（每个请求固定延迟，另有一个始终超时的"死"地址），
+对比逐条阻塞 requests.post 与共享发送引擎 delivery.send_many 的吞吐（条/秒）。
+
+用法：
+    python benchmarks/bench_webhook_delivery.py [--messages 500] [--latency 0.05] [--dead 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.delivery import WebhookDelivery  # noqa: E402
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """模拟企业微信机器人：/ok 正常返回，/dead 一直挂起直到客户端超时"""
+    protocol_version = 'HTTP/1.1'
+    latency = 0.05
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.startswith('/dead'):
+            time.sleep(30)
+            return
+        time.sleep(self.latency)
+        body = json.dumps({'errcode': 0, 'errmsg': 'ok'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BenchConfig:
+    """只包含发送引擎所需配置的轻量应用对象"""
+
+    def __init__(self, **config):
+        self.config = config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--dead', type=int, default=20, help='发往无响应地址的消息数')
+    parser.add_argument('--timeout', type=float, default=2)
+    args = parser.parse_args()
+
+    StandInHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    message = {'msgtype': 'text', 'text': {'content': 'bench'}}
+    urls = [f"{base}/ok?key={i % 200}" for i in range(args.messages)]
+    urls += [f"{base}/dead?key=dead" for _ in range(args.dead)]
+
+    # 旧实现：逐条阻塞发送，不复用连接
+    sample = urls[:min(len(urls), 100)] if args.dead == 0 else urls[:50] + urls[-2:]
+    start = time.perf_counter()
+    for url in sample:
+        try:
+            requests.post(url, json=message, timeout=args.timeout)
+        except requests.RequestException:
+            pass
+    legacy_elapsed = time.perf_counter() - start
+    legacy_rate = len(sample) / legacy_elapsed
+
+    # 新实现：连接池 + 并发 + 限速 + 熔断
+    engine = WebhookDelivery(BenchConfig(
+        WEBHOOK_MAX_CONCURRENCY=50,
+        WEBHOOK_POOL_SIZE=50,
+        WEBHOOK_CONNECT_TIMEOUT=args.timeout,
+        WEBHOOK_READ_TIMEOUT=args.timeout,
+        WEBHOOK_HOST_RATE=0,
+        WEBHOOK_HOST_BURST=1,
+        WEBHOOK_BREAKER_THRESHOLD=3,
+        WEBHOOK_BREAKER_COOLDOWN=60
+    ))
+    start = time.perf_counter()
+    results = engine.send_many([(url, message) for url in urls])
+    engine_elapsed = time.perf_counter() - start
+    engine_rate = len(urls) / engine_elapsed
+
+    stats = engine.stats()
+    print(f"messages={len(urls)} (dead={args.dead}) server latency={args.latency * 1000:.0f}ms")
+    print(f"sequential requests.post : {legacy_rate:8.1f} sends/s  (sample of {len(sample)})")
+    print(f"pooled delivery engine   : {engine_rate:8.1f} sends/s")
+    print(f"ok={sum(r['success'] for r in results)} failed={stats['failed']} "
+          f"rejected_by_breaker={stats['rejected']} avg_latency={stats['avg_latency'] * 1000:.1f}ms")
+
+    engine.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
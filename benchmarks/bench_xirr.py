@@ -0,0 +1,84 @@
+"""
+年化收益率（XIRR）求解基准测试
+
+随机生成多个标的的定投现金流（每周一笔投入，最后一笔为当前市值），
+对比逐个标的标量牛顿迭代与补齐为矩阵后向量化求解的耗时，并校验两者结果一致。
+
+用法：
+    python benchmarks/bench_xirr.py [--targets 1000] [--flows 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.returns import pad_cash_flows, xirr  # noqa: E402
+
+
+def generate(targets, flows, seed=0):
+    """每个标的 flows-1 笔每周投入，最后一笔为估值日市值"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2015-01-05')
+    groups = np.repeat(np.arange(targets), flows)
+    offsets = np.tile(np.arange(flows) * 7, targets)
+    days = start + offsets
+    amounts = -rng.uniform(500, 1500, size=targets * flows)
+    invested = -amounts.reshape(targets, flows)[:, :-1].sum(axis=1)
+    # 期末市值为总投入的 0.6 ~ 2 倍
+    amounts.reshape(targets, flows)[:, -1] = invested * rng.uniform(0.6, 2.0, size=targets)
+    return groups, days, amounts
+
+
+def scalar_xirr(times, amounts, guess=0.1, tol=1e-9):
+    """逐行标量牛顿迭代（对照，没有二分法兜底，发散时返回 nan）"""
+    rate = guess
+    for _ in range(100):
+        if not -1 < rate < 1e6:
+            return float('nan')
+        npv = sum(a * (1 + rate) ** -t for t, a in zip(times, amounts))
+        derivative = sum(-t * a * (1 + rate) ** (-t - 1) for t, a in zip(times, amounts))
+        step = npv / derivative
+        rate -= step
+        if abs(step) <= tol * max(1.0, abs(rate)):
+            return rate
+    return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--flows', type=int, default=500)
+    parser.add_argument('--scalar-sample', type=int, default=20, help='标量对照只计算前 N 个标的')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    groups, days, amounts = generate(args.targets, args.flows)
+
+    timings = []
+    for _ in range(args.repeat):
+        begin = time.perf_counter()
+        times, flows = pad_cash_flows(groups, days, amounts)
+        rates = xirr(times, flows)
+        timings.append((time.perf_counter() - begin) * 1000)
+
+    sample = min(args.scalar_sample, args.targets)
+    begin = time.perf_counter()
+    expected = [scalar_xirr(times[i], flows[i]) for i in range(sample)]
+    scalar_time = (time.perf_counter() - begin) * 1000 / sample * args.targets
+
+    expected = np.array(expected)
+    converged = np.isfinite(expected)
+    assert np.allclose(rates[:sample][converged], expected[converged], rtol=1e-6), '向量化结果与标量对照不一致'
+    print(f"{args.targets} targets x {args.flows} flows, solved {np.isfinite(rates).sum()} "
+          f"(scalar newton diverged on {(~converged).sum()} of {sample} sampled)")
+    print(f"scalar newton (estimated) {scalar_time:10.1f}ms")
+    print(f"vectorized xirr           {min(timings):10.1f}ms best, {sum(timings) / len(timings):.1f}ms avg")
+
+
+if __name__ == '__main__':
+    main()
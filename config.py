@@ -21,15 +21,101 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite 连接参数：WAL 模式下读写互不阻塞，写入冲突时等待 busy_timeout 毫秒而不是立即报错
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'  # WAL 下 NORMAL 只在检查点时同步磁盘
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # 毫秒
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))  # 内存映射读取的字节数，0 为关闭
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE') or -65536)  # 页缓存，负数表示 KiB
+    
+    # 连接池配置
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 30)  # 等待空闲连接的秒数
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or -1)  # 连接最长使用秒数，-1 为不回收
+    
+    # 调度器作业存储数据库，未设置时与应用共用同一个引擎和连接池
+    SCHEDULER_JOBSTORE_URL = os.environ.get('SCHEDULER_JOBSTORE_URL') or None
+    
     # 服务器配置
     HOST = os.environ.get('HOST') or '127.0.0.1'
     PORT = int(os.environ.get('PORT') or 5006)
     
+    # 进程角色：all 为Web服务和定时任务在同一进程；web 只处理HTTP请求；scheduler 只执行定时任务
+    PROCESS_ROLE = (os.environ.get('PROCESS_ROLE') or 'all').lower()
+    
+    # 启动时是否创建表、执行迁移并同步提醒；web/scheduler 角色默认关闭，部署时执行 flask init-db 和 flask sync-reminders
+    STARTUP_INIT = (os.environ.get('STARTUP_INIT') or str(PROCESS_ROLE == 'all')).lower() == 'true'
+    
+    # 生产环境Web服务（gunicorn）配置
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS') or 2)
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 4)
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT') or 30)
+    WEB_PRELOAD = os.environ.get('WEB_PRELOAD', 'True').lower() == 'true'  # 主进程加载应用后再fork工作进程
+    
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     
     # 定时任务配置
     SCHEDULER_TIMEZONE = os.environ.get('SCHEDULER_TIMEZONE') or 'Asia/Shanghai'
+    SCHEDULER_SYNC_BATCH_SIZE = int(os.environ.get('SCHEDULER_SYNC_BATCH_SIZE') or 1000)
+    SCHEDULER_MAX_WORKERS = int(os.environ.get('SCHEDULER_MAX_WORKERS') or 20)  # 执行定时任务的线程数
+    SCHEDULER_STATS_INTERVAL = int(os.environ.get('SCHEDULER_STATS_INTERVAL') or 15)  # 运行统计写入数据库的间隔（秒）
+    # 调度模式：jobs 为每个提醒一个cron任务；dispatcher 为每分钟批量查询到期提醒
+    SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE') or 'jobs'
+    SCHEDULER_DISPATCH_CATCHUP = int(os.environ.get('SCHEDULER_DISPATCH_CATCHUP') or 3600)  # 批量调度中断后最多补发多少秒内的时间槽
+    # 合并模式：同一用户同一时间槽的多个提醒合并为一条汇总消息
+    REMINDER_DIGEST = os.environ.get('REMINDER_DIGEST', 'False').lower() == 'true'
+    
+    # 多进程部署时通过数据库租约选举唯一的调度主节点
+    SCHEDULER_LEADER_ELECTION = os.environ.get('SCHEDULER_LEADER_ELECTION', 'True').lower() == 'true'
+    SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL') or 10)
+    SCHEDULER_LEASE_RENEW_INTERVAL = int(os.environ.get('SCHEDULER_LEASE_RENEW_INTERVAL') or 3)
+    
+    # Webhook发送配置
+    WEBHOOK_MAX_CONCURRENCY = int(os.environ.get('WEBHOOK_MAX_CONCURRENCY') or 50)  # 全局并发上限
+    WEBHOOK_POOL_SIZE = int(os.environ.get('WEBHOOK_POOL_SIZE') or 10)  # 每个主机保持的长连接数
+    WEBHOOK_CONNECT_TIMEOUT = float(os.environ.get('WEBHOOK_CONNECT_TIMEOUT') or 3)
+    WEBHOOK_READ_TIMEOUT = float(os.environ.get('WEBHOOK_READ_TIMEOUT') or 10)
+    WEBHOOK_HOST_RATE = float(os.environ.get('WEBHOOK_HOST_RATE') or 100)  # 每个主机每秒请求数，0为不限速
+    WEBHOOK_HOST_BURST = int(os.environ.get('WEBHOOK_HOST_BURST') or 100)
+    WEBHOOK_BREAKER_THRESHOLD = int(os.environ.get('WEBHOOK_BREAKER_THRESHOLD') or 5)  # 连续失败多少次后熔断
+    WEBHOOK_BREAKER_COOLDOWN = int(os.environ.get('WEBHOOK_BREAKER_COOLDOWN') or 60)  # 熔断冷却时间（秒）
+    
+    # 通知发件箱：通知先持久化再发送，失败后按指数退避重试
+    NOTIFICATION_OUTBOX = os.environ.get('NOTIFICATION_OUTBOX', 'True').lower() == 'true'
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 100)
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 8)
+    OUTBOX_BACKOFF_BASE = int(os.environ.get('OUTBOX_BACKOFF_BASE') or 5)  # 首次重试等待秒数
+    OUTBOX_BACKOFF_MAX = int(os.environ.get('OUTBOX_BACKOFF_MAX') or 3600)  # 最长重试间隔（秒）
+    OUTBOX_POLL_INTERVAL = int(os.environ.get('OUTBOX_POLL_INTERVAL') or 5)  # 重试任务轮询间隔（秒）
+    OUTBOX_RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS') or 30)  # 已发送记录保留天数
+    
+    # 列表分页：每页条数，以及统计总数时最多数到的条数（0 表示不统计）
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE') or 20)
+    PAGINATION_COUNT_LIMIT = int(os.environ.get('PAGINATION_COUNT_LIMIT') or 1000)
+    
+    # 标的代码筛选：contains（任意位置匹配）/ prefix（前缀匹配，可使用索引，数据量大时开启）
+    TARGET_CODE_SEARCH = os.environ.get('TARGET_CODE_SEARCH') or 'contains'
+    TARGET_INDEX_MAX_USERS = int(os.environ.get('TARGET_INDEX_MAX_USERS') or 1000)  # 自动补全前缀树最多缓存的用户数
+    TARGET_INDEX_REFRESH_INTERVAL = int(os.environ.get('TARGET_INDEX_REFRESH_INTERVAL') or 5)  # 核对标的是否变化的间隔（秒）
+    
+    # 分析结果缓存：按用户数据版本失效；设置缓存目录后多个进程共享磁盘缓存
+    ANALYSIS_CACHE = os.environ.get('ANALYSIS_CACHE', 'True').lower() == 'true'
+    ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE') or 1024)  # 内存中最多缓存的结果数
+    ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR') or None
+    
+    # 批量价格更新接口单次最多接受的行情条数
+    PRICE_UPDATE_MAX_QUOTES = int(os.environ.get('PRICE_UPDATE_MAX_QUOTES') or 10000)
+    
+    # 内存映射列式历史价格存储目录，未设置时历史价格只从数据库读取
+    PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR') or None
+    
+    # 请求性能指标（Prometheus 格式，/metrics）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_QUERY_BUDGET = int(os.environ.get('METRICS_QUERY_BUDGET', 30))  # 单个请求SQL语句数超过该值时输出警告，0为不检查
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None  # 设置后访问 /metrics 需携带 Authorization: Bearer <token>，未设置时只允许本机访问
+    METRICS_SNAPSHOT_INTERVAL = int(os.environ.get('METRICS_SNAPSHOT_INTERVAL', 15))  # 各工作进程写入指标快照的间隔（秒），0为只输出当前进程
     
     # 调试模式
     DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
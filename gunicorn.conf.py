@@ -0,0 +1,32 @@
+"""
+gunicorn 配置
+监听地址和工作进程参数读取 config.Config（即 .env / 环境变量），用法：
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+os.environ.setdefault('PROCESS_ROLE', 'web')
+
+from config import Config  # noqa: E402
+
+bind = f'{Config.HOST}:{Config.PORT}'
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+timeout = Config.WEB_TIMEOUT
+# 预加载时数据库迁移、持仓初始化只在主进程执行一次，工作进程fork后共享已加载的代码
+preload_app = Config.WEB_PRELOAD
+
+accesslog = '-'
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
+
+
+def post_fork(server, worker):
+    """预加载时主进程已建立数据库连接，fork后的工作进程丢弃继承的连接池，各自重新建立连接"""
+    if not preload_app:
+        return
+    from wsgi import app
+    from app import db
+    with app.app_context():
+        db.engine.dispose(close=False)
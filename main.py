@@ -1,3 +1,25 @@
+import argparse
+import os
+import sys
+
+PROCESS_ROLES = ('all', 'web', 'scheduler')
+
+def parse_args():
+    """命令行参数：--role 选择进程角色，未指定时读取环境变量 PROCESS_ROLE"""
+    parser = argparse.ArgumentParser(description='定投管理工具')
+    parser.add_argument('--role', choices=PROCESS_ROLES, default=None,
+                        help='all：开发服务器并执行定时任务；web：gunicorn 生产服务；scheduler：只执行定时任务')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    # 角色需在加载配置之前写入环境变量
+    _args = parse_args()
+    if _args.role:
+        os.environ['PROCESS_ROLE'] = _args.role
+    if (os.environ.get('PROCESS_ROLE') or 'all').lower() == 'web':
+        # 生产环境的Web进程交给 gunicorn，由其按 gunicorn.conf.py 加载 wsgi:app
+        os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'])
+
 from flask import Flask, render_template, redirect, url_for, session
 from app import create_app
 from app.models import db
@@ -17,33 +39,42 @@ def dashboard():
     """仪表板"""
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
-    
-    from app.models import InvestmentReminder, InvestmentRecord
-    
-    # 获取用户数据统计
-    reminders_count = InvestmentReminder.query.filter_by(user_id=session['user_id']).count()
-    records_count = InvestmentRecord.query.filter_by(user_id=session['user_id']).count()
-    
-    # 获取最近的定投记录
-    recent_records = InvestmentRecord.query.filter_by(user_id=session['user_id'])\
-        .order_by(InvestmentRecord.buy_date.desc()).limit(5).all()
-    
-    # 获取活跃的定投提醒
-    active_reminders = InvestmentReminder.query.filter_by(
-        user_id=session['user_id'], 
-        is_active=True
-    ).limit(5).all()
-    
-    return render_template('dashboard.html',
-                         reminders_count=reminders_count,
-                         records_count=records_count,
-                         recent_records=recent_records,
-                         active_reminders=active_reminders)
+
+    from app.analytics import build_dashboard_summary
+    from app.cache import analysis_cache
+
+    # 汇总数据一次查询取出，数据未变化时直接使用缓存
+    user_id = session['user_id']
+    summary = analysis_cache.get_or_compute(user_id, 'dashboard', lambda: build_dashboard_summary(user_id))
+
+    return render_template('dashboard.html', **summary)
+
+def run_scheduler():
+    """调度进程：不提供HTTP服务，只执行定时任务，收到 SIGTERM/SIGINT 后关闭调度器退出"""
+    import signal
+    import threading
+    import logging
+    from app.scheduler import scheduler
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    # Web进程写入作业存储的新任务不会通知本进程，按固定间隔唤醒调度器重新读取作业存储
+    interval = app.config.get('SCHEDULER_LEASE_RENEW_INTERVAL', 3)
+    logging.getLogger(__name__).info("调度进程已启动")
+    while not stop.wait(interval):
+        if scheduler.is_leader:
+            scheduler.scheduler.wakeup()
+    scheduler.shutdown()
 
 if __name__ == '__main__':
-    # 使用配置文件中的HOST和PORT
-    app.run(
-        host=Config.HOST,
-        port=Config.PORT,
-        debug=Config.DEBUG
-    )
\ No newline at end of file
+    if app.config['PROCESS_ROLE'] == 'scheduler':
+        run_scheduler()
+    else:
+        # 使用配置文件中的HOST和PORT
+        app.run(
+            host=Config.HOST,
+            port=Config.PORT,
+            debug=Config.DEBUG
+        )
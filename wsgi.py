@@ -0,0 +1,10 @@
+"""
+生产环境WSGI入口
+gunicorn 加载 wsgi:app，进程角色默认为 web：只处理HTTP请求，定时任务由调度进程执行
+"""
+
+import os
+
+os.environ.setdefault('PROCESS_ROLE', 'web')
+
+from main import app  # noqa: E402